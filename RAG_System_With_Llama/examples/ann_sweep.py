@@ -0,0 +1,76 @@
+import sys
+import os
+import argparse
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+
+import numpy as np
+from rag.ann_index import run_sweep
+
+
+def corpus_vectors(directory: str, model_name: str, batch_size: int) -> np.ndarray:
+    """Chunk and embed every supported file under a directory."""
+    from rag.document_processor import DocumentProcessor
+    from rag.embedding_models import BucketedEmbeddings
+
+    processor = DocumentProcessor()
+    texts = [chunk.page_content for chunk in processor.process_directory(directory)["chunks"]]
+    print(f"Embedding {len(texts)} chunks with {model_name}")
+    return BucketedEmbeddings(model_name, batch_size=batch_size).encode(texts)
+
+
+def parse_ints(value: str) -> list:
+    return [int(v) for v in value.split(",") if v]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep ANN index parameters and report recall@k against latency")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--data-dir", help="Directory of documents to chunk and embed")
+    source.add_argument("--synthetic", type=int, metavar="N", help="Use N random vectors instead of a corpus")
+    parser.add_argument("--dim", type=int, default=384, help="Dimension of synthetic vectors")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="Embedding model for --data-dir")
+    parser.add_argument("--batch-size", type=int, default=64, help="Embedding batch size")
+    parser.add_argument("--queries", type=int, default=200, help="Number of held-out query vectors")
+    parser.add_argument("-k", type=int, default=10, help="Results per query")
+    parser.add_argument("--nlist", type=int, default=None, help="IVF centroids (default 4 * sqrt(N))")
+    parser.add_argument("--nprobe", type=parse_ints, default=[1, 4, 8, 16, 32], help="Comma-separated IVF nprobe values")
+    parser.add_argument("--hnsw-m", type=parse_ints, default=[16], help="Comma-separated HNSW M values")
+    parser.add_argument("--ef-search", type=parse_ints, default=[10, 50, 100], help="Comma-separated HNSW ef_search values")
+    parser.add_argument("--ef-construction", type=int, default=100, help="HNSW ef_construction")
+    parser.add_argument("--skip-hnsw", action="store_true", help="Do not build Chroma HNSW indexes")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        rng = np.random.RandomState(0)
+        # Clustered data, closer to real embeddings than uniform noise
+        centers = rng.randn(64, args.dim).astype(np.float32)
+        vectors = centers[rng.randint(0, 64, args.synthetic + args.queries)] + 0.5 * rng.randn(args.synthetic + args.queries, args.dim).astype(np.float32)
+    else:
+        vectors = corpus_vectors(args.data_dir, args.model, args.batch_size)
+
+    # Hold out the query vectors so no query matches itself exactly
+    rng = np.random.RandomState(1)
+    order = rng.permutation(len(vectors))
+    num_queries = min(args.queries, len(vectors) // 10 or 1)
+    queries, corpus = vectors[order[:num_queries]], vectors[order[num_queries:]]
+
+    configs = [{"type": "flat"}]
+    configs += [{"type": "ivf", "nlist": args.nlist, "nprobe": nprobe} for nprobe in args.nprobe]
+    if not args.skip_hnsw:
+        configs += [
+            {"type": "hnsw", "space": "l2", "M": m, "ef_construction": args.ef_construction, "ef_search": ef}
+            for m in args.hnsw_m for ef in args.ef_search
+        ]
+
+    print(f"Sweeping {len(configs)} configurations over {len(corpus)} vectors with {num_queries} queries\n")
+    results = run_sweep(corpus, queries, configs, k=args.k)
+
+    recall_key = f"recall@{min(args.k, len(corpus))}"
+    print(f"{'index':<44} {recall_key:>10} {'p50 ms':>8} {'p99 ms':>8} {'build s':>8}")
+    for result in results:
+        params = ", ".join(f"{key}={value}" for key, value in result.items()
+                           if key not in ("type", recall_key, "p50_ms", "p99_ms", "build_s") and value is not None)
+        label = f"{result['type']} ({params})" if params else result["type"]
+        print(f"{label:<44} {result[recall_key]:>10.3f} {result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['build_s']:>8.2f}")
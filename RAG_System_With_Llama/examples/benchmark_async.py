@@ -0,0 +1,71 @@
+import sys
+import os
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+
+import numpy as np
+from main import OllamaRAGSystem
+
+
+async def run_concurrent(rag: OllamaRAGSystem, queries: list, concurrency: int) -> list:
+    """Run every query through aquery with at most concurrency in flight, returning per-query latencies."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(query: str) -> float:
+        async with semaphore:
+            start = time.perf_counter()
+            await rag.aquery(query)
+            return time.perf_counter() - start
+
+    try:
+        return await asyncio.gather(*(one(query) for query in queries))
+    finally:
+        await rag.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare sequential query() with concurrent aquery() throughput")
+    parser.add_argument("--data-dir", default=os.path.join(project_root, "data"), help="Documents to index")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="Embedding model")
+    parser.add_argument("--ollama-model", default="llama3.2:1b", help="Ollama model")
+    parser.add_argument("--ollama-url", default="http://localhost:11434", help="Ollama server URL")
+    parser.add_argument("--queries", type=int, default=200, help="Number of concurrent queries")
+    parser.add_argument("--concurrency", type=int, default=200, help="Maximum queries in flight")
+    parser.add_argument("--sequential", type=int, default=5, help="Number of blocking queries for the baseline")
+    args = parser.parse_args()
+
+    persist_dir = tempfile.mkdtemp(prefix="async_bench_")
+    try:
+        rag = OllamaRAGSystem(
+            data_dir=args.data_dir,
+            embedding_model=args.model,
+            persist_dir=persist_dir,
+            ollama_model=args.ollama_model,
+            ollama_url=args.ollama_url,
+            vector_backend="numpy",
+            pdf_cache_dir=None,
+            embedding_cache_dir=None,
+            query_cache_size=0
+        )
+        queries = [f"What does the document say about topic {i}?" for i in range(args.queries)]
+
+        start = time.perf_counter()
+        for query in queries[:args.sequential]:
+            rag.direct_query(query)
+        sequential_qps = args.sequential / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        latencies = asyncio.run(run_concurrent(rag, queries, args.concurrency))
+        concurrent_qps = len(queries) / (time.perf_counter() - start)
+
+        print(f"Sequential: {sequential_qps:.2f} queries/s")
+        print(f"Concurrent ({args.concurrency} in flight): {concurrent_qps:.2f} queries/s, "
+              f"p50 {1000 * np.percentile(latencies, 50):.0f} ms, p99 {1000 * np.percentile(latencies, 99):.0f} ms")
+    finally:
+        shutil.rmtree(persist_dir, ignore_errors=True)
@@ -0,0 +1,74 @@
+import sys
+import os
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+
+from langchain.schema import Document
+from rag.embeddings import EmbeddingManager
+
+
+def make_chunks(count: int, seed: int = 0) -> list:
+    """Build chunks with a wide spread of lengths, like a real mixed corpus."""
+    rng = random.Random(seed)
+    vocabulary = ["retrieval", "augmented", "generation", "vector", "embedding", "model", "the", "a",
+                  "of", "document", "chunk", "query", "language", "context", "system", "index"]
+    return [
+        Document(page_content=" ".join(rng.choices(vocabulary, k=rng.choice([5, 10, 20, 40]))), metadata={"chunk": i})
+        for i in range(count)
+    ]
+
+
+def ingest(args, cache_dir: str, chunks: list, use_bulk: bool) -> float:
+    """Add chunks in many small calls, with or without a bulk() block."""
+    persist_dir = tempfile.mkdtemp(prefix="bulk_bench_")
+    try:
+        # The embedding cache is warm, so the timing measures the writes rather than the model
+        manager = EmbeddingManager(model_name=args.model, persist_directory=persist_dir,
+                                   cache_dir=cache_dir, backend=args.backend)
+        manager.create_vectorstore(chunks[:1], ids=["seed"])
+        calls = [chunks[i:i + args.call_size] for i in range(0, len(chunks), args.call_size)]
+
+        start = time.perf_counter()
+        if use_bulk:
+            with manager.bulk(batch_size=args.batch_size):
+                for call in calls:
+                    manager.add_documents(call)
+        else:
+            for call in calls:
+                manager.add_documents(call)
+        return time.perf_counter() - start
+    finally:
+        shutil.rmtree(persist_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare per-call adds with bulk() writes")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="Embedding model")
+    parser.add_argument("--backend", default="chroma", choices=["chroma", "numpy"], help="Vector store backend")
+    parser.add_argument("--chunks", type=int, default=20000, help="Number of chunks to ingest")
+    parser.add_argument("--call-size", type=int, default=50, help="Chunks per add_documents call")
+    parser.add_argument("--batch-size", type=int, default=4096, help="Chunks per write inside bulk()")
+    args = parser.parse_args()
+
+    chunks = make_chunks(args.chunks)
+    cache_dir = tempfile.mkdtemp(prefix="bulk_bench_cache_")
+    try:
+        # Warm the embedding cache once
+        warm_dir = tempfile.mkdtemp(prefix="bulk_bench_warm_")
+        EmbeddingManager(model_name=args.model, persist_directory=warm_dir, cache_dir=cache_dir,
+                         backend=args.backend).embeddings.embed_documents([c.page_content for c in chunks])
+        shutil.rmtree(warm_dir, ignore_errors=True)
+
+        per_call = ingest(args, cache_dir, chunks, use_bulk=False)
+        bulk = ingest(args, cache_dir, chunks, use_bulk=True)
+        print(f"\n{args.chunks} chunks in calls of {args.call_size} ({args.backend})")
+        print(f"{'per-call add + persist':<28} {args.chunks / per_call:10.1f} chunks/s")
+        print(f"{'bulk() single persist':<28} {args.chunks / bulk:10.1f} chunks/s ({per_call / bulk:.1f}x)")
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
@@ -0,0 +1,44 @@
+import sys
+import os
+import time
+import random
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+
+from rag.embedding_models import BucketedEmbeddings, MultiProcessEmbeddings
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+NUM_CHUNKS = 4000
+
+
+def make_chunks(count: int, seed: int = 0) -> list:
+    """Build chunks with a wide spread of lengths, like a real mixed corpus."""
+    rng = random.Random(seed)
+    vocabulary = ["retrieval", "augmented", "generation", "vector", "embedding", "model", "the", "a",
+                  "of", "document", "chunk", "query", "language", "context", "system", "index"]
+    return [" ".join(rng.choices(vocabulary, k=rng.choice([5, 10, 20, 40, 80, 120]))) for _ in range(count)]
+
+
+def throughput(embeddings, texts: list) -> float:
+    embeddings.embed_documents(texts[:256])  # warm up every worker
+    start = time.perf_counter()
+    embeddings.embed_documents(texts)
+    return len(texts) / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    texts = make_chunks(NUM_CHUNKS)
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    print(f"Embedding {len(texts)} chunks with {MODEL_NAME} on {cores} cores\n")
+
+    baseline = throughput(BucketedEmbeddings(MODEL_NAME, device="cpu"), texts)
+    print(f"{'single process':<16} {baseline:8.1f} chunks/s")
+
+    num_workers = 2
+    while num_workers <= cores:
+        with MultiProcessEmbeddings(MODEL_NAME, num_workers=num_workers) as embeddings:
+            result = throughput(embeddings, texts)
+        print(f"{num_workers:>2} workers       {result:8.1f} chunks/s  "
+              f"{result / baseline:5.2f}x  ({result / baseline / num_workers:.0%} of linear)")
+        num_workers *= 2
@@ -0,0 +1,50 @@
+import sys
+import os
+import time
+import random
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+
+from langchain.embeddings import HuggingFaceEmbeddings
+from rag.embedding_models import BucketedEmbeddings
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+NUM_CHUNKS = 2000
+
+
+def make_chunks(count: int, seed: int = 0) -> list:
+    """Build chunks with a wide spread of lengths, like a real mixed corpus."""
+    rng = random.Random(seed)
+    vocabulary = ["retrieval", "augmented", "generation", "vector", "embedding", "model", "the", "a",
+                  "of", "document", "chunk", "query", "language", "context", "system", "index"]
+    return [" ".join(rng.choices(vocabulary, k=rng.choice([5, 10, 20, 40, 80, 120]))) for _ in range(count)]
+
+
+def benchmark(name: str, embed, texts: list) -> float:
+    embed(texts[:32])  # warm up
+    start = time.perf_counter()
+    embed(texts)
+    elapsed = time.perf_counter() - start
+    chunks_per_sec = len(texts) / elapsed
+    print(f"{name:<44} {chunks_per_sec:8.1f} chunks/s")
+    return chunks_per_sec
+
+
+texts = make_chunks(NUM_CHUNKS)
+print(f"Embedding {len(texts)} mixed-length chunks with {MODEL_NAME} on CPU\n")
+
+# Before: LangChain defaults, fed in ingestion-sized calls as the streaming path does
+baseline_model = HuggingFaceEmbeddings(model_name=MODEL_NAME, model_kwargs={"device": "cpu"})
+baseline = benchmark(
+    "HuggingFaceEmbeddings (calls of 32, default)",
+    lambda batch: [baseline_model.embed_documents(batch[i:i + 32]) for i in range(0, len(batch), 32)],
+    texts
+)
+
+for batch_size in (16, 32, 64, 128):
+    unsorted = BucketedEmbeddings(MODEL_NAME, batch_size=batch_size, sort_by_length=False, device="cpu")
+    benchmark(f"Unsorted batches of {batch_size}", unsorted.embed_documents, texts)
+    bucketed = BucketedEmbeddings(MODEL_NAME, batch_size=batch_size, device="cpu")
+    throughput = benchmark(f"Length-bucketed batches of {batch_size}", bucketed.embed_documents, texts)
+    print(f"{'':<44} {throughput / baseline:8.2f}x vs baseline")
@@ -0,0 +1,50 @@
+import sys
+import os
+import time
+import argparse
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+
+import numpy as np
+from rag.numpy_store import NumpyVectorStore
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure filtered search latency as filters get more selective")
+    parser.add_argument("--vectors", type=int, default=100000, help="Number of stored vectors")
+    parser.add_argument("--dim", type=int, default=384, help="Vector dimension")
+    parser.add_argument("--sources", type=int, default=1000, help="Number of distinct sources")
+    parser.add_argument("--queries", type=int, default=20, help="Timed queries per filter")
+    parser.add_argument("-k", type=int, default=10, help="Results per query")
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(0)
+    vectors = rng.randn(args.vectors, args.dim).astype(np.float32)
+    metadatas = [
+        {"source": f"docs/{i % 10}/file{i % args.sources}.txt", "modified": i % 365}
+        for i in range(args.vectors)
+    ]
+    store = NumpyVectorStore()
+    store.add_vectors(vectors, [f"chunk {i}" for i in range(args.vectors)], metadatas)
+
+    filters = [
+        ("none", None),
+        ("50% (date range)", {"modified": {"$lt": 182}}),
+        ("10% (folder prefix)", {"source": {"$prefix": "docs/3/"}}),
+        ("1% (10 sources)", {"source": {"$in": [f"docs/{i % 10}/file{i}.txt" for i in range(args.sources // 100)]}}),
+        ("0.1% (one source)", {"source": "docs/7/file7.txt"}),
+        ("~0 (source and date)", {"$and": [{"source": "docs/7/file7.txt"}, {"modified": {"$lt": 30}}]}),
+    ]
+    queries = rng.randn(args.queries, args.dim).astype(np.float32)
+    store.similarity_search_by_vector(queries[0], k=args.k, filter=filters[-1][1])  # build the metadata index
+
+    print(f"{'filter':<24} {'rows':>8} {'p50 ms':>8}")
+    for label, where in filters:
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            store.similarity_search_by_vector(query, k=args.k, filter=where)
+            latencies.append(1000 * (time.perf_counter() - start))
+        rows = args.vectors if where is None else len(store.get(where=where, include=[])["ids"])
+        print(f"{label:<24} {rows:>8} {np.median(latencies):>8.2f}")
@@ -0,0 +1,53 @@
+import sys
+import os
+import time
+import argparse
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+
+import numpy as np
+from rag.bm25 import BM25Index
+
+BUDGET_MS = 50.0
+
+
+def zipf_texts(words: np.ndarray, probabilities: np.ndarray, count: int, rng: np.random.RandomState) -> list:
+    """Random chunk texts whose word frequencies follow a Zipf distribution."""
+    lengths = rng.randint(20, 80, count)
+    tokens = words[rng.choice(len(words), size=int(lengths.sum()), p=probabilities)]
+    return [" ".join(chunk) for chunk in np.split(tokens, np.cumsum(lengths)[:-1])]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure BM25 keyword search latency at scale")
+    parser.add_argument("--chunks", type=int, default=1_000_000, help="Number of indexed chunks")
+    parser.add_argument("--vocabulary", type=int, default=50000, help="Number of distinct terms")
+    parser.add_argument("--queries", type=int, default=200, help="Number of timed queries")
+    parser.add_argument("-k", type=int, default=20, help="Results per query (hybrid_search fetch_k)")
+    parser.add_argument("--batch-size", type=int, default=10000, help="Chunks per add call")
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(0)
+    words = np.array([f"term{i}" for i in range(args.vocabulary)])
+    probabilities = 1.0 / np.arange(1, args.vocabulary + 1)
+    probabilities /= probabilities.sum()
+
+    index = BM25Index()
+    start = time.perf_counter()
+    for first in range(0, args.chunks, args.batch_size):
+        count = min(args.batch_size, args.chunks - first)
+        index.add([f"chunk-{first + i}" for i in range(count)], zipf_texts(words, probabilities, count, rng))
+    index.merge()
+    print(f"Indexed {args.chunks} chunks in {time.perf_counter() - start:.1f}s: {index.stats()}")
+
+    queries = [" ".join(words[rng.choice(args.vocabulary, size=rng.randint(3, 8), p=probabilities)]) for _ in range(args.queries)]
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, k=args.k)
+        latencies.append(1000 * (time.perf_counter() - start))
+
+    p50, p99 = np.percentile(latencies, 50), np.percentile(latencies, 99)
+    print(f"Keyword search p50 {p50:.2f} ms, p99 {p99:.2f} ms")
+    print(f"Budget {BUDGET_MS} ms: {'met' if p99 <= BUDGET_MS else 'NOT met'}")
@@ -0,0 +1,39 @@
+import sys
+import os
+import time
+import argparse
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+
+import numpy as np
+from rag.mmr import maximal_marginal_relevance
+
+
+def timed_ms(select, query: np.ndarray, candidates: np.ndarray, k: int, lambda_mult: float, repeats: int):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        selected = select(query, candidates, lambda_mult=lambda_mult, k=k)
+    return selected, 1000 * (time.perf_counter() - start) / repeats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare vectorized MMR with LangChain's reference selection")
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dimension")
+    parser.add_argument("--fetch-k", type=int, nargs="+", default=[20, 100, 300, 1000], help="Candidate counts")
+    parser.add_argument("-k", type=int, default=10, help="Documents to select")
+    parser.add_argument("--lambda-mult", type=float, default=0.3, help="MMR lambda")
+    parser.add_argument("--repeats", type=int, default=20, help="Timed repetitions per size")
+    args = parser.parse_args()
+
+    from langchain_community.vectorstores.utils import maximal_marginal_relevance as reference
+
+    rng = np.random.RandomState(0)
+    centers = rng.randn(16, args.dim).astype(np.float32)
+    print(f"{'fetch_k':>8} {'reference ms':>13} {'vectorized ms':>14} {'speedup':>8} {'same':>5}")
+    for fetch_k in args.fetch_k:
+        candidates = centers[rng.randint(0, 16, fetch_k)] + 0.5 * rng.randn(fetch_k, args.dim).astype(np.float32)
+        query = rng.randn(args.dim).astype(np.float32)
+        expected, reference_ms = timed_ms(reference, query, candidates, args.k, args.lambda_mult, args.repeats)
+        selected, vectorized_ms = timed_ms(maximal_marginal_relevance, query, candidates, args.k, args.lambda_mult, args.repeats)
+        print(f"{fetch_k:>8} {reference_ms:>13.2f} {vectorized_ms:>14.3f} {reference_ms / vectorized_ms:>7.1f}x {str(selected == expected):>5}")
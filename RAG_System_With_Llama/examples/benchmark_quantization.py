@@ -0,0 +1,119 @@
+import sys
+import os
+import json
+import time
+import shutil
+import argparse
+import resource
+import subprocess
+import tempfile
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+
+import numpy as np
+
+
+def rss_mb() -> dict:
+    """
+    Current resident memory split into private (anon) and memory-mapped file pages.
+
+    Mapped file pages can be dropped by the kernel under memory pressure and
+    reread from disk; private pages cannot. Outside Linux only the peak total
+    is available, reported as anon.
+    """
+    try:
+        with open("/proc/self/status", "r") as f:
+            fields = dict(line.split(":", 1) for line in f)
+        return {name: int(fields[key].split()[0]) / 1024 for name, key in (("anon", "RssAnon"), ("file", "RssFile"))}
+    except (OSError, KeyError):
+        # ru_maxrss is in kilobytes on Linux
+        return {"anon": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, "file": 0.0}
+
+
+def make_store(directory: str, num_vectors: int, dim: int, num_queries: int) -> None:
+    """Write a persisted NumPy store of clustered unit vectors, and queries near them."""
+    from rag.numpy_store import NumpyVectorStore
+
+    rng = np.random.RandomState(0)
+    centers = rng.randn(256, dim).astype(np.float32)
+    store = NumpyVectorStore(persist_directory=directory)
+    for start in range(0, num_vectors, 65536):
+        count = min(65536, num_vectors - start)
+        vectors = centers[rng.randint(len(centers), size=count)] + 0.5 * rng.randn(count, dim).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        store.add_vectors(
+            vectors,
+            [f"chunk {i}" for i in range(start, start + count)],
+            ids=[f"id-{i}" for i in range(start, start + count)]
+        )
+    store.persist()
+
+    queries = centers[rng.randint(len(centers), size=num_queries)] + 0.5 * rng.randn(num_queries, dim).astype(np.float32)
+    np.save(os.path.join(directory, "queries.npy"), queries)
+
+
+def search(mode: str, directory: str, k: int) -> None:
+    """Open the store and answer every query in this process, printing hits, latency and RSS as JSON."""
+    from rag.embeddings import EmbeddingManager
+
+    queries = np.load(os.path.join(directory, "queries.npy"))
+    baseline = rss_mb()
+    manager = EmbeddingManager(
+        persist_directory=directory,
+        backend="numpy",
+        keyword_index=False,
+        quantization=None if mode == "float" else mode
+    )
+    manager.load_vectorstore()
+
+    if mode == "float":
+        run = lambda query: manager.vectorstore.similarity_search_by_vector_with_score(query, k=k)
+    else:
+        # The search path Retriever takes when OllamaRAGSystem(quantization=...) is set
+        manager.quantized_search_by_vector(queries[0], k=k)
+        run = lambda query: manager.quantized_search_by_vector(query, k=k)
+
+    hits = []
+    start = time.perf_counter()
+    for query in queries:
+        hits.append([doc.page_content for doc, _ in run(query)])
+    latency = (time.perf_counter() - start) / len(queries)
+    rss = {name: value - baseline[name] for name, value in rss_mb().items()}
+    print(json.dumps({"hits": hits, "latency_ms": 1000 * latency, "rss_mb": rss}))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall@k and resident memory of quantized search next to float search")
+    parser.add_argument("--vectors", type=int, default=200000, help="Number of stored vectors")
+    parser.add_argument("--dim", type=int, default=384, help="Vector dimension")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("-k", type=int, default=10, help="Results per query")
+    parser.add_argument("--run", nargs=2, metavar=("MODE", "STORE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        search(*args.run, k=args.k)
+        sys.exit(0)
+
+    workdir = tempfile.mkdtemp()
+    try:
+        directory = os.path.join(workdir, "store")
+        make_store(directory, args.vectors, args.dim, args.queries)
+        float_mb = args.vectors * args.dim * 4 / 2 ** 20
+        print(f"{args.vectors} vectors x {args.dim} dims ({float_mb:.0f} MB as float32), k={args.k}\n")
+        print(f"{'search':>8} {'recall@k':>9} {'ms/query':>9} {'anon MB':>8} {'mapped MB':>10}")
+
+        exact = None
+        for mode in ("float", "int8", "binary"):
+            # Each mode gets its own process so resident memory is not shared between them
+            command = [sys.executable, __file__, "-k", str(args.k), "--run", mode, directory]
+            subprocess.run(command, capture_output=True, check=True)  # builds and persists the codes
+            output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            exact = exact or result["hits"]
+            recall = np.mean([len(set(found) & set(truth)) / len(truth) for found, truth in zip(result["hits"], exact)])
+            rss = result["rss_mb"]
+            print(f"{mode:>8} {recall:>9.3f} {result['latency_ms']:>9.2f} {rss['anon']:>8.1f} {rss['file']:>10.1f}")
+    finally:
+        shutil.rmtree(workdir)
@@ -0,0 +1,42 @@
+import sys
+import os
+import argparse
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+
+import numpy as np
+from rag.document_processor import DocumentProcessor
+from rag.embedding_models import BucketedEmbeddings
+from rag.reduction import evaluate_projections
+
+
+def parse_ints(value: str) -> list:
+    return [int(v) for v in value.split(",") if v]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report recall loss, speedup and memory saved by reduced embeddings")
+    parser.add_argument("--data-dir", default=os.path.join(project_root, "data"), help="Documents to chunk and embed")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="Embedding model")
+    parser.add_argument("--chunk-size", type=int, default=250, help="Chunk size in characters")
+    parser.add_argument("--queries", type=int, default=200, help="Number of held-out chunks used as queries")
+    parser.add_argument("--dims", type=parse_ints, default=[32, 64, 128, 192, 256], help="Comma-separated target dimensions")
+    parser.add_argument("-k", type=int, default=10, help="Results per query")
+    args = parser.parse_args()
+
+    texts = [chunk.page_content for chunk in DocumentProcessor(chunk_size=args.chunk_size).process_directory(args.data_dir)["chunks"]]
+    vectors = BucketedEmbeddings(args.model).encode(texts)
+
+    # Hold out the query chunks so no query matches itself exactly
+    order = np.random.RandomState(0).permutation(len(vectors))
+    num_queries = min(args.queries, len(vectors) // 10 or 1)
+    queries, corpus = vectors[order[:num_queries]], vectors[order[num_queries:]]
+    print(f"{len(corpus)} chunks, {num_queries} queries, {vectors.shape[1]} dimensions\n")
+
+    results = evaluate_projections(corpus, queries, dims=args.dims, k=args.k)
+    recall_key = f"recall@{min(args.k, len(corpus))}"
+    print(f"{'method':<10} {'dim':>5} {recall_key:>10} {'p50 ms':>8} {'speedup':>8} {'MB':>8} {'saved':>7}")
+    for result in results:
+        print(f"{result['method']:<10} {result['dim']:>5} {result[recall_key]:>10.3f} {result['p50_ms']:>8.3f} "
+              f"{result['speedup']:>7.1f}x {result['bytes'] / 2**20:>8.2f} {result['memory_saved']:>7.0%}")
@@ -0,0 +1,101 @@
+import sys
+import os
+import time
+import shutil
+import argparse
+import tempfile
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+
+import numpy as np
+from rag.document_processor import DocumentProcessor
+from rag.embeddings import EmbeddingManager
+from rag.reranker import CrossEncoderReranker
+from rag.retriever import Retriever
+
+
+def parse_ints(value: str) -> list:
+    return [int(v) for v in value.split(",") if v]
+
+
+def parse_budgets(value: str) -> list:
+    return [None if v == "none" else float(v) for v in value.split(",") if v]
+
+
+def span_queries(chunks: list, count: int, words: int, seed: int) -> list:
+    """Contiguous word spans of random chunks as queries, each with its source chunk as the answer."""
+    rng = np.random.RandomState(seed)
+    queries = []
+    for row in rng.permutation(len(chunks)):
+        tokens = chunks[row].page_content.split()
+        if len(tokens) > words:
+            start = rng.randint(0, len(tokens) - words)
+            queries.append((" ".join(tokens[start:start + words]), row))
+        if len(queries) == count:
+            break
+    return queries
+
+
+def evaluate(retriever: Retriever, queries: list, k: int) -> dict:
+    """Hit rate and MRR at k, with the median and p99 retrieval latency."""
+    hits, reciprocal_ranks, latencies = 0, 0.0, []
+    for query, answer in queries:
+        start = time.perf_counter()
+        documents = retriever.retrieve(query)
+        latencies.append(1000 * (time.perf_counter() - start))
+        rows = [document.metadata["row"] for document in documents[:k]]
+        if answer in rows:
+            hits += 1
+            reciprocal_ranks += 1.0 / (rows.index(answer) + 1)
+    return {
+        f"hit@{k}": hits / len(queries),
+        f"mrr@{k}": reciprocal_ranks / len(queries),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99))
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report the latency and quality trade-off of cross-encoder reranking")
+    parser.add_argument("--data-dir", default=os.path.join(project_root, "data"), help="Documents to chunk and index")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="Embedding model")
+    parser.add_argument("--rerank-model", default="cross-encoder/ms-marco-MiniLM-L-6-v2", help="Cross-encoder model")
+    parser.add_argument("--queries", type=int, default=100, help="Number of span queries")
+    parser.add_argument("--query-words", type=int, default=8, help="Words per span query")
+    parser.add_argument("-k", type=int, default=2, help="Documents kept per query (the RAG system's top_k)")
+    parser.add_argument("--fetch-k", type=parse_ints, default=[10, 20, 50], help="Comma-separated first-stage candidate counts")
+    parser.add_argument("--budget-ms", type=parse_budgets, default=[None, 50.0, 20.0], help="Comma-separated budgets ('none' for no limit)")
+    args = parser.parse_args()
+
+    chunks = DocumentProcessor().process_directory(args.data_dir)["chunks"]
+    for row, chunk in enumerate(chunks):
+        chunk.metadata["row"] = row
+    queries = span_queries(chunks, args.queries, args.query_words, seed=0)
+
+    persist_dir = tempfile.mkdtemp(prefix="rerank_bench_")
+    try:
+        manager = EmbeddingManager(model_name=args.model, persist_directory=persist_dir, backend="numpy", keyword_index=False)
+        manager.create_vectorstore(chunks)
+        vectorstore = manager.get_vectorstore()
+        print(f"{len(chunks)} chunks, {len(queries)} queries\n")
+
+        rows = [("vector only", "-", "-", evaluate(Retriever(vectorstore, top_k=args.k), queries, args.k))]
+        for fetch_k in args.fetch_k:
+            for budget_ms in args.budget_ms:
+                # A fresh score cache per setting, so every query pays for its scoring
+                reranker = CrossEncoderReranker(args.rerank_model, budget_ms=budget_ms, cache_size=0)
+                retriever = Retriever(vectorstore, top_k=args.k, reranker=reranker, rerank_fetch_k=fetch_k)
+                retriever.retrieve(queries[0][0])  # load the model and measure the per-pair cost
+                result = evaluate(retriever, queries, args.k)
+                result["truncated"] = reranker.truncated_queries / max(reranker.queries, 1)
+                rows.append(("reranked", fetch_k, "none" if budget_ms is None else budget_ms, result))
+
+        hit_key, mrr_key = f"hit@{args.k}", f"mrr@{args.k}"
+        print(f"{'stage':<12} {'fetch_k':>8} {'budget':>7} {hit_key:>7} {mrr_key:>7} {'p50 ms':>8} {'p99 ms':>8} {'truncated':>10}")
+        for stage, fetch_k, budget_ms, result in rows:
+            truncated = f"{result['truncated']:.0%}" if "truncated" in result else "-"
+            print(f"{stage:<12} {fetch_k:>8} {budget_ms:>7} {result[hit_key]:>7.3f} {result[mrr_key]:>7.3f} "
+                  f"{result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} {truncated:>10}")
+    finally:
+        shutil.rmtree(persist_dir, ignore_errors=True)
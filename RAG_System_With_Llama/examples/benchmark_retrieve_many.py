@@ -0,0 +1,60 @@
+import sys
+import os
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+
+from langchain.schema import Document
+from rag.embeddings import EmbeddingManager
+from rag.retriever import Retriever
+
+VOCABULARY = ["retrieval", "augmented", "generation", "vector", "embedding", "model", "the", "a",
+              "of", "document", "chunk", "query", "language", "context", "system", "index"]
+
+
+def make_texts(count: int, lengths: list, seed: int) -> list:
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(VOCABULARY, k=rng.choice(lengths))) for _ in range(count)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare per-query retrieval with retrieve_many")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="Embedding model")
+    parser.add_argument("--backend", default="numpy", choices=["chroma", "numpy"], help="Vector store backend")
+    parser.add_argument("--chunks", type=int, default=20000, help="Number of stored chunks")
+    parser.add_argument("--queries", type=int, default=256, help="Number of queries in the batch")
+    parser.add_argument("-k", type=int, default=5, help="Results per query")
+    args = parser.parse_args()
+
+    persist_dir = tempfile.mkdtemp(prefix="retrieve_many_bench_")
+    try:
+        manager = EmbeddingManager(model_name=args.model, persist_directory=persist_dir, backend=args.backend)
+        chunks = [Document(page_content=text) for text in make_texts(args.chunks, [20, 40, 80], seed=0)]
+        manager.create_vectorstore(chunks)
+        retriever = Retriever(manager.get_vectorstore(), top_k=args.k)
+        queries = make_texts(args.queries, [4, 8, 12], seed=1)
+        retriever.retrieve_many(queries[:8])  # warm up
+
+        start = time.perf_counter()
+        one_by_one = [retriever.retrieve_with_scores(query) for query in queries]
+        per_query = (time.perf_counter() - start) / len(queries)
+
+        start = time.perf_counter()
+        batched = retriever.retrieve_many(queries, k=args.k, with_scores=True)
+        per_query_batched = (time.perf_counter() - start) / len(queries)
+
+        same = sum(
+            [doc.page_content for doc, _ in a] == [doc.page_content for doc, _ in b]
+            for a, b in zip(one_by_one, batched)
+        )
+        print(f"\n{len(queries)} queries against {args.chunks} chunks ({args.backend}), k={args.k}")
+        print(f"{'retrieve_with_scores loop':<28} {1000 * per_query:8.2f} ms/query")
+        print(f"{'retrieve_many':<28} {1000 * per_query_batched:8.2f} ms/query ({per_query / per_query_batched:.1f}x)")
+        print(f"Identical results for {same}/{len(queries)} queries")
+    finally:
+        shutil.rmtree(persist_dir, ignore_errors=True)
@@ -0,0 +1,80 @@
+import sys
+import os
+import time
+import tempfile
+import argparse
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+
+import numpy as np
+from rag.numpy_store import NumpyVectorStore
+from rag.sharded_store import ShardedVectorStore
+
+
+def hits(results):
+    return [[(doc.page_content, distance) for doc, distance in query_results] for query_results in results]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check sharded search against one store and measure throughput per shard count")
+    parser.add_argument("--vectors", type=int, default=200000, help="Number of stored vectors")
+    parser.add_argument("--dim", type=int, default=384, help="Vector dimension")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8], help="Shard counts to compare")
+    parser.add_argument("--workers", type=int, default=None, help="Search processes (default: one per core up to the shard count)")
+    parser.add_argument("--queries", type=int, default=256, help="Queries per timed batch")
+    parser.add_argument("-k", type=int, default=10, help="Results per query")
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(0)
+    vectors = rng.randn(args.vectors, args.dim).astype(np.float32)
+    # Exact duplicates, so distance ties have to be broken the same way
+    vectors[1::97] = vectors[0]
+    texts = [f"chunk {i}" for i in range(args.vectors)]
+    metadatas = [{"source": f"file{i % 100}.txt"} for i in range(args.vectors)]
+    ids = [f"id-{i}" for i in range(args.vectors)]
+    queries = rng.randn(args.queries, args.dim).astype(np.float32)
+    queries[0] = vectors[0]
+    where = {"source": {"$in": ["file3.txt", "file42.txt"]}}
+
+    single = NumpyVectorStore()
+    single.add_vectors(vectors, texts, metadatas, ids)
+    # Replacing and deleting chunks reorders rows, which ties must follow
+    single.add_vectors(vectors[:50], texts[:50], metadatas[:50], ids[:50])
+    single.delete(ids[100:150])
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'shards':>6} {'identical':>9} {'batch q/s':>10} {'single q/s':>10}")
+        for num_shards in args.shards:
+            path = os.path.join(directory, f"shards-{num_shards}")
+            store = ShardedVectorStore(persist_directory=path, num_shards=num_shards, num_workers=args.workers)
+            store.add_vectors(vectors, texts, metadatas, ids)
+            store.add_vectors(vectors[:50], texts[:50], metadatas[:50], ids[:50])
+            store.delete(ids[100:150])
+            store.persist()
+
+            expected = single.batch_similarity_search_by_vectors_with_score(queries, k=args.k)
+            identical = all([
+                hits(store.batch_similarity_search_by_vectors_with_score(queries, k=args.k)) == hits(expected),
+                hits([store.similarity_search_by_vector_with_score(q, k=args.k) for q in queries[:8]])
+                == hits([single.similarity_search_by_vector_with_score(q, k=args.k) for q in queries[:8]]),
+                hits([store.similarity_search_by_vector_with_score(q, k=args.k, filter=where) for q in queries[:8]])
+                == hits([single.similarity_search_by_vector_with_score(q, k=args.k, filter=where) for q in queries[:8]]),
+                [d.page_content for d in store.max_marginal_relevance_search_by_vector(queries[1], k=4, fetch_k=20)]
+                == [d.page_content for d in single.max_marginal_relevance_search_by_vector(queries[1], k=4, fetch_k=20)],
+                store.get(include=[])["ids"] == single.get(include=[])["ids"],
+            ])
+
+            start = time.perf_counter()
+            store.batch_similarity_search_by_vectors_with_score(queries, k=args.k)
+            batch_qps = len(queries) / (time.perf_counter() - start)
+            start = time.perf_counter()
+            for query in queries[:32]:
+                store.similarity_search_by_vector_with_score(query, k=args.k)
+            single_qps = 32 / (time.perf_counter() - start)
+            print(f"{num_shards:>6} {str(identical):>9} {batch_qps:>10.0f} {single_qps:>10.0f}")
+            store.close()
+
+        start = time.perf_counter()
+        single.batch_similarity_search_by_vectors_with_score(queries, k=args.k)
+        print(f"unsharded store: {len(queries) / (time.perf_counter() - start):.0f} batch q/s")
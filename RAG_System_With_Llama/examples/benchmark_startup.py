@@ -0,0 +1,77 @@
+import sys
+import os
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+
+# Each measurement runs in a fresh interpreter so imports and model loading start cold
+PROBE = r"""
+import sys, time, json, warnings
+warnings.filterwarnings("ignore")
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+from main import OllamaRAGSystem
+imported = time.perf_counter()
+rag = OllamaRAGSystem(
+    data_dir={data_dir!r},
+    embedding_model={model!r},
+    persist_dir={persist_dir!r},
+    embedding_cache_dir=None,
+    pdf_cache_dir=None,
+    vector_backend={backend!r},
+    read_only=True
+)
+if {eager!r}:
+    rag.embedding_manager.model.model
+opened = time.perf_counter()
+stats = rag.stats()
+stats_done = time.perf_counter()
+torch_loaded = "torch" in sys.modules
+rag.retriever.retrieve("What is retrieval augmented generation?")
+first_query = time.perf_counter()
+print(json.dumps({{
+    "import_s": imported - start,
+    "open_s": opened - imported,
+    "stats_s": stats_done - opened,
+    "first_query_s": first_query - start,
+    "documents": stats["documents"],
+    "torch_before_query": torch_loaded
+}}))
+"""
+
+
+def run_probe(eager: bool, args, persist_dir: str) -> dict:
+    code = PROBE.format(root=project_root, data_dir=args.data_dir, model=args.model,
+                        persist_dir=persist_dir, backend=args.backend, eager=eager)
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure import time and time-to-first-query of the RAG system")
+    parser.add_argument("--data-dir", default=os.path.join(project_root, "data"), help="Documents to index")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="Embedding model")
+    parser.add_argument("--backend", default="numpy", choices=["chroma", "numpy"], help="Vector store backend")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per mode (the median is reported)")
+    args = parser.parse_args()
+
+    from main import OllamaRAGSystem
+
+    persist_dir = tempfile.mkdtemp(prefix="startup_bench_")
+    try:
+        OllamaRAGSystem(data_dir=args.data_dir, embedding_model=args.model, persist_dir=persist_dir,
+                        embedding_cache_dir=None, pdf_cache_dir=None, vector_backend=args.backend)
+
+        print(f"\n{'mode':<20} {'import s':>9} {'open s':>8} {'stats s':>8} {'first query s':>14} {'torch loaded':>13}")
+        for label, eager in (("eager model load", True), ("lazy model load", False)):
+            runs = sorted((run_probe(eager, args, persist_dir) for _ in range(args.runs)), key=lambda r: r["first_query_s"])
+            result = runs[len(runs) // 2]
+            print(f"{label:<20} {result['import_s']:>9.2f} {result['open_s']:>8.2f} {result['stats_s']:>8.3f} "
+                  f"{result['first_query_s']:>14.2f} {str(result['torch_before_query']):>13}")
+    finally:
+        shutil.rmtree(persist_dir, ignore_errors=True)
@@ -0,0 +1,82 @@
+import sys
+import os
+import json
+import random
+import shutil
+import argparse
+import resource
+import subprocess
+import tempfile
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+
+
+def make_corpus(directory: str, num_files: int, words_per_file: int, seed: int = 0) -> None:
+    """Write synthetic text files of random vocabulary words."""
+    rng = random.Random(seed)
+    vocabulary = ["retrieval", "augmented", "generation", "vector", "embedding", "model", "the", "a",
+                  "of", "document", "chunk", "query", "language", "context", "system", "index"]
+    os.makedirs(directory, exist_ok=True)
+    for i in range(num_files):
+        with open(os.path.join(directory, f"doc{i:05d}.txt"), "w", encoding="utf-8") as f:
+            f.write(" ".join(rng.choices(vocabulary, k=words_per_file)))
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def ingest(mode: str, corpus: str, store: str, model: str, backend: str) -> None:
+    """Index the corpus in this process and print peak RSS as JSON."""
+    from rag.document_processor import DocumentProcessor
+    from rag.embeddings import EmbeddingManager
+
+    processor = DocumentProcessor(chunk_size=500, chunk_overlap=50)
+    manager = EmbeddingManager(model_name=model, persist_directory=store, backend=backend, keyword_index=False)
+    manager.model.embed_query("warm up")
+    baseline = peak_rss_mb()
+
+    if mode == "streaming":
+        count = manager.create_vectorstore_from_batches(processor.iter_chunks(corpus, batch_size=256))
+    else:
+        chunks = processor.process_documents(corpus)
+        manager.create_vectorstore(chunks)
+        count = len(chunks)
+    print(json.dumps({"chunks": count, "baseline_mb": baseline, "peak_mb": peak_rss_mb()}))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Peak memory of streaming vs all-at-once ingestion as the corpus grows")
+    parser.add_argument("--files", type=int, nargs="+", default=[500, 1000, 2000], help="Corpus sizes in files")
+    parser.add_argument("--words", type=int, default=2000, help="Words per file")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="Embedding model")
+    parser.add_argument("--backend", default="numpy", help="Vector store backend")
+    parser.add_argument("--run", nargs=3, metavar=("MODE", "CORPUS", "STORE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        ingest(*args.run, model=args.model, backend=args.backend)
+        sys.exit(0)
+
+    print(f"Peak RSS above the loaded model ({args.backend} backend; its stored vectors and texts grow with the corpus)\n")
+    print(f"{'files':>6} {'chunks':>7} {'all at once MB':>15} {'streaming MB':>13}")
+    workdir = tempfile.mkdtemp()
+    try:
+        for num_files in args.files:
+            corpus = os.path.join(workdir, f"corpus-{num_files}")
+            make_corpus(corpus, num_files, args.words)
+            growth = {}
+            for mode in ("all", "streaming"):
+                store = os.path.join(workdir, f"store-{num_files}-{mode}")
+                # Each run gets its own process so peak RSS is not shared between them
+                output = subprocess.run(
+                    [sys.executable, __file__, "--model", args.model, "--backend", args.backend, "--run", mode, corpus, store],
+                    capture_output=True, text=True, check=True
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                growth[mode] = result["peak_mb"] - result["baseline_mb"]
+            print(f"{num_files:>6} {result['chunks']:>7} {growth['all']:>15.1f} {growth['streaming']:>13.1f}")
+    finally:
+        shutil.rmtree(workdir)
@@ -0,0 +1,54 @@
+import sys
+import os
+import shutil
+import argparse
+import tempfile
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+
+from main import OllamaRAGSystem
+
+TEXT = (
+    "The lighthouse keeper logs the weather every evening at six. Entries record wind speed, "
+    "visibility and the state of the lamp, and are kept in a ledger next to the stairs."
+)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Remove the file that owns a deduplicated chunk, sync, and retrieve its copy")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="Embedding model")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        data_dir = os.path.join(workdir, "data")
+        os.makedirs(data_dir)
+        for name in ("a.txt", "b.txt"):
+            with open(os.path.join(data_dir, name), "w", encoding="utf-8") as f:
+                f.write(TEXT)
+
+        rag = OllamaRAGSystem(
+            data_dir=data_dir,
+            persist_dir=os.path.join(workdir, "store"),
+            embedding_model=args.model,
+            vector_backend="numpy",
+            dedup_threshold=0.85,
+            pdf_cache_dir=None,
+            embedding_cache_dir=None,
+            query_cache_size=0
+        )
+        for path, entry in sorted(rag.manifest.entries.items()):
+            print(f"{os.path.basename(path)}: {len(entry['chunk_ids'])} chunk IDs")
+
+        # a.txt owns the stored chunk; b.txt's identical copy was dropped as a duplicate
+        os.remove(os.path.join(data_dir, "a.txt"))
+        result = rag.sync_documents()
+        print(f"re-ingested: {[os.path.basename(path) for path in result['reindexed']]}")
+
+        documents = rag.retriever.retrieve("When does the lighthouse keeper log the weather?")
+        print(f"retrieved sources: {[os.path.basename(doc.metadata['source']) for doc in documents]}")
+        assert documents and all(doc.metadata["source"].endswith("b.txt") for doc in documents)
+        print("b.txt content is still retrievable after its duplicate's owner was removed")
+    finally:
+        shutil.rmtree(workdir)
@@ -0,0 +1,52 @@
+import sys
+import os
+import json
+import argparse
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+
+from rag.answer_cache import evaluate_answer_cache
+from rag.embedding_models import BucketedEmbeddings
+
+# Paraphrases share a label; near misses such as RAM vs RAG must not share an answer
+SAMPLE_QUERIES = [
+    ("What is RAG?", "rag"),
+    ("What does retrieval augmented generation mean?", "rag"),
+    ("Explain RAG to me", "rag"),
+    ("What is RAM?", "ram"),
+    ("How are documents split into chunks?", "chunking"),
+    ("How does the system chunk documents?", "chunking"),
+    ("What chunk size should I use?", "chunk_size"),
+    ("Which model generates the answers?", "llm"),
+    ("What LLM does this use?", "llm"),
+    ("Which model creates the embeddings?", "embedding_model"),
+    ("what is rag", "rag"),
+    ("How is the chunk size chosen?", "chunk_size"),
+]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Answer cache hit and false match rates per similarity threshold")
+    parser.add_argument("--queries", help="JSON lines file of {\"query\": ..., \"label\": ...} in asking order (default: a small sample)")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="Embedding model")
+    parser.add_argument("--thresholds", default="0.8,0.85,0.9,0.95,0.98", help="Comma-separated cosine thresholds")
+    args = parser.parse_args()
+
+    if args.queries:
+        with open(args.queries, "r", encoding="utf-8") as f:
+            labelled = [(row["query"], row["label"]) for row in map(json.loads, f) if row]
+    else:
+        labelled = SAMPLE_QUERIES
+
+    embeddings = BucketedEmbeddings(args.model).embed_documents([query for query, _ in labelled])
+    thresholds = [float(value) for value in args.thresholds.split(",") if value]
+    results = evaluate_answer_cache(embeddings, [label for _, label in labelled], thresholds)
+
+    print(f"{len(labelled)} queries, {len(set(label for _, label in labelled))} distinct answers\n")
+    print(f"{'threshold':>9} {'hit rate':>9} {'ideal':>7} {'false':>6} {'false/hit':>10}")
+    for row in results:
+        print(
+            f"{row['threshold']:>9.2f} {row['hit_rate']:>9.1%} {row['possible_hit_rate']:>7.1%} "
+            f"{row['false_matches']:>6} {row['false_match_rate']:>10.1%}"
+        )
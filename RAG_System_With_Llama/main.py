@@ -2,9 +2,19 @@
 from rag.document_processor import DocumentProcessor
 from rag.embeddings import EmbeddingManager
 from rag.retriever import Retriever
-from rag.generator import OllamaGenerator
+from rag.reranker import CrossEncoderReranker
+from rag.manifest import IndexManifest
+from rag.dedup import ChunkDeduplicator
+from rag.answer_cache import SemanticAnswerCache, evaluate_answer_cache
+from rag.embedding_models import embed_queries
+from rag.metadata_index import normalize_filter
 import os
-from typing import Optional
+import json
+import time
+import asyncio
+import functools
+from typing import Optional, List, Dict, Any, Hashable, Sequence, Tuple
+from langchain.schema import Document
  
 class OllamaRAGSystem:
     """Complete RAG System using Llama 3.2 1B via Ollama."""
@@ -17,49 +27,391 @@ class OllamaRAGSystem:
         embedding_model: str = "all-MiniLM-L6-v2",
         persist_dir: Optional[str] = "vectorstore",
         ollama_model: str = "llama3.2:1b",
-        top_k: int = 2
+        ollama_url: str = "http://localhost:11434",
+        top_k: int = 2,
+        dedup_threshold: Optional[float] = None,
+        pdf_cache_dir: Optional[str] = "pdf_cache",
+        embedding_cache_dir: Optional[str] = "embedding_cache",
+        vector_backend: str = "chroma",
+        index_params: Optional[Dict[str, Any]] = None,
+        num_shards: int = 1,
+        read_only: bool = False,
+        reduce_dim: Optional[int] = None,
+        quantization: Optional[str] = None,
+        query_cache_size: int = 1024,
+        rerank_model: Optional[str] = None,
+        rerank_fetch_k: int = 20,
+        rerank_budget_ms: Optional[float] = None,
+        answer_cache_size: int = 0,
+        answer_cache_threshold: float = 0.95
     ):
-        """Initialize the RAG System with all components."""
+        """
+        Initialize the RAG System with all components.
+        
+        Args:
+            ollama_url: URL of the Ollama server
+            dedup_threshold: Similarity above which chunks are dropped as near-duplicates
+                before embedding; only chunks ingested in the same call are compared
+                (None to disable deduplication)
+            pdf_cache_dir: Directory caching extracted PDF page text across rebuilds (None to disable)
+            embedding_cache_dir: Directory caching chunk embeddings across rebuilds (None to disable)
+            vector_backend: Vector store backend, "chroma" or "numpy"
+            index_params: ANN index parameters passed to the vector store backend
+            num_shards: Split the vector store into this many hash-partitioned
+                shards, searched in parallel worker processes (1 for one store)
+            read_only: Open an existing vector store without indexing anything
+            reduce_dim: Store PCA-reduced vectors with this many dimensions (None for full vectors)
+            quantization: "int8" or "binary" to retrieve through compact codes,
+                rescoring candidates with memory-mapped float vectors (None for
+                the vector store's own search)
+            query_cache_size: Entries in the query embedding and retrieval result
+                caches, invalidated when the index changes (0 to disable)
+            rerank_model: Cross-encoder that reranks rerank_fetch_k first-stage
+                candidates down to top_k (None to disable reranking)
+            rerank_fetch_k: First-stage candidates scored by the reranker
+            rerank_budget_ms: Per-query reranking budget; fewer candidates are
+                scored when it would be exceeded (None for no limit)
+            answer_cache_size: Generated answers kept for reuse by queries whose
+                embedding is close to a cached one, persisted next to the store
+                and dropped when the index changes (0 to disable)
+            answer_cache_threshold: Minimum cosine similarity for a cached answer to be reused
+        
+        The embedding model and the Ollama client are created on first use, so
+        constructing the system only opens the persisted store.
+        """
         # Initialize document processor
         self.processor = DocumentProcessor(
             chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap
+            chunk_overlap=chunk_overlap,
+            pdf_cache_dir=pdf_cache_dir
         )
         
         # Initialize embedding manager
         self.embedding_manager = EmbeddingManager(
             model_name=embedding_model,
-            persist_directory=persist_dir
+            persist_directory=persist_dir,
+            cache_dir=embedding_cache_dir,
+            backend=vector_backend,
+            index_params=index_params,
+            num_shards=num_shards,
+            read_only=read_only,
+            reduce_dim=reduce_dim,
+            quantization=quantization
         )
         
+        # Optional dedup stage between splitting and embedding
+        self.deduplicator = ChunkDeduplicator(threshold=dedup_threshold) if dedup_threshold else None
+        
+        self.data_dir = data_dir
+        self.manifest = IndexManifest(persist_dir)
+        
         # Load or create vector store
         if persist_dir and os.path.exists(persist_dir):
             success = self.embedding_manager.load_vectorstore()
+            if not success and read_only:
+                raise ValueError(f"No vector store to open read-only in {persist_dir}")
             if not success:
                 self._create_new_vectorstore(data_dir)
+        elif read_only:
+            raise ValueError(f"No vector store to open read-only in {persist_dir}")
         else:
             self._create_new_vectorstore(data_dir)
         
         # Initialize retriever
         self.vectorstore = self.embedding_manager.get_vectorstore()
-        self.retriever = Retriever(self.vectorstore, top_k=top_k)
+        self.retriever = Retriever(
+            self.vectorstore,
+            top_k=top_k,
+            cache_size=query_cache_size,
+            index_version=lambda: self.embedding_manager.index_version,
+            keyword_index=self.embedding_manager.keyword_index,
+            reranker=CrossEncoderReranker(rerank_model, budget_ms=rerank_budget_ms) if rerank_model else None,
+            rerank_fetch_k=rerank_fetch_k,
+            quantized_search=self.embedding_manager.quantized_search_by_vector if quantization else None
+        )
+        
+        # Answers to earlier queries, reused for rephrasings of the same question
+        self.answer_cache = None
+        if answer_cache_size:
+            self.answer_cache = SemanticAnswerCache(
+                None if read_only else persist_dir,
+                max_entries=answer_cache_size,
+                threshold=answer_cache_threshold
+            )
+        self._fingerprint = None
         
-        # Initialize Ollama generator
-        self.generator = OllamaGenerator(model_name=ollama_model)
+        # Ollama generator, created on the first query
+        self.ollama_model = ollama_model
+        self.ollama_url = ollama_url
+        self._generator = None
         
         print("Ollama RAG system initialized successfully!")
 
+    @property
+    def generator(self):
+        """Ollama generator, importing the LLM client on first access."""
+        if self._generator is None:
+            from rag.generator import OllamaGenerator
+            self._generator = OllamaGenerator(model_name=self.ollama_model, base_url=self.ollama_url)
+        return self._generator
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Describe the indexed corpus without loading the embedding model.
+        
+        Returns:
+            Dictionary with vector store statistics, the number of indexed files,
+            query and answer cache hit rates and reranker statistics
+        """
+        return {
+            **self.embedding_manager.stats(),
+            "files": len(self.manifest.entries),
+            "query_cache": self.retriever.cache_stats(),
+            "answer_cache": self.answer_cache.stats() if self.answer_cache is not None else None,
+            "reranker": self.retriever.reranker.stats() if self.retriever.reranker else None
+        }
+
+    def _index_fingerprint(self) -> str:
+        """Manifest fingerprint of the indexed files, recomputed only after the index changes."""
+        version = self.embedding_manager.index_version
+        if self._fingerprint is None or self._fingerprint[0] != version:
+            self._fingerprint = (version, self.manifest.fingerprint())
+        return self._fingerprint[1]
+
+    def _answer_scope(
+        self,
+        with_sources: bool,
+        use_mmr: bool,
+        use_hybrid: bool,
+        filter: Optional[Dict[str, Any]]
+    ) -> str:
+        """Settings a cached answer must share with a query to be reused for it."""
+        return json.dumps({
+            "model": self.ollama_model,
+            "top_k": self.retriever.top_k,
+            "reranker": self.retriever.reranker.model_name if self.retriever.reranker else None,
+            "with_sources": with_sources,
+            "use_mmr": use_mmr,
+            "use_hybrid": use_hybrid,
+            "filter": normalize_filter(filter)
+        }, sort_keys=True, default=str)
+
+    @staticmethod
+    def _cached_answer(query: str, cached: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer for a query from a cache hit, naming the cached query it came from."""
+        return {**cached, "query": query, "cached_query": cached["query"]}
+
+    def evaluate_answer_cache(
+        self,
+        labelled_queries: List[Tuple[str, Hashable]],
+        thresholds: Sequence[float] = (0.85, 0.9, 0.95, 0.98)
+    ) -> List[Dict[str, Any]]:
+        """
+        Measure answer cache hit and false match rates on labelled queries, without generating.
+        
+        Args:
+            labelled_queries: (query, label) pairs in the order they are asked;
+                queries that should get the same answer share a label
+            thresholds: Cosine similarity thresholds to compare
+            
+        Returns:
+            Per threshold the hit rate, false matches and false match rate
+            (see rag.answer_cache.evaluate_answer_cache)
+        """
+        embeddings = embed_queries(self.vectorstore.embeddings, [query for query, _ in labelled_queries])
+        return evaluate_answer_cache(embeddings, [label for _, label in labelled_queries], thresholds)
+
     def _create_new_vectorstore(self, data_dir: str):
         """Process documents and create a new vector store."""
-        chunks = self.processor.process_documents(data_dir)
-        self.embedding_manager.create_vectorstore(chunks)
+        file_paths = self.processor.find_files(data_dir)
+        hashes = {path: IndexManifest.file_hash(path) for path in file_paths}
+        result = self.processor.process_files(file_paths)
+        
+        self.manifest.reset()
+        processed = [path for path in file_paths if path not in result["failures"]]
+        chunks, ids = self._assign_chunk_ids(self._deduplicate(result["chunks"]), processed, hashes)
+        self.embedding_manager.create_vectorstore(chunks, ids=ids)
+        self.manifest.save()
+
+    def _deduplicate(self, chunks: List[Any]) -> List[Any]:
+        """Drop duplicate chunks if deduplication is enabled."""
+        if self.deduplicator is None or not chunks:
+            return chunks
+        return self.deduplicator.deduplicate(chunks)["chunks"]
+
+    def _assign_chunk_ids(self, chunks: List[Any], file_paths: List[str], hashes: Dict[str, str]):
+        """
+        Give chunks deterministic IDs and record their files in the manifest.
+        
+        A chunk kept by deduplication is also listed under every file whose
+        copy was dropped, so those files still account for it when its own
+        file is changed or removed.
+        
+        Args:
+            chunks: Chunks of the processed files
+            file_paths: Files that were processed successfully (recorded even if all their chunks were dropped)
+            hashes: Content hash of each processed file
+            
+        Returns:
+            Tuple of (chunks, ids) in matching order
+        """
+        chunks_by_file = {path: [] for path in file_paths}
+        for chunk in chunks:
+            chunks_by_file[chunk.metadata['source']].append(chunk)
+        
+        ordered_chunks, ids = [], []
+        file_ids = {}
+        shared_ids = {path: [] for path in file_paths}
+        for file_path, file_chunks in chunks_by_file.items():
+            file_ids[file_path] = IndexManifest.chunk_ids(file_path, hashes[file_path], len(file_chunks))
+            for chunk, chunk_id in zip(file_chunks, file_ids[file_path]):
+                for source in json.loads(chunk.metadata.get('duplicate_sources', '[]')):
+                    if source in shared_ids:
+                        shared_ids[source].append(chunk_id)
+            ordered_chunks.extend(file_chunks)
+            ids.extend(file_ids[file_path])
+        
+        for file_path in file_paths:
+            self.manifest.set_file(file_path, hashes[file_path], file_ids[file_path] + shared_ids[file_path])
+        
+        return ordered_chunks, ids
+
+    def _files_sharing_chunks(self, stale_files: List[str]) -> List[str]:
+        """
+        Indexed files that share deduplicated chunks with stale files, directly or through other files.
+        
+        Their shared chunks and duplicate_sources metadata are rebuilt by
+        re-ingesting them together with the stale files. Files no longer on
+        disk are left out and keep their chunk IDs.
+        
+        Args:
+            stale_files: Files whose chunks are about to be deleted
+            
+        Returns:
+            Paths of the other files to re-ingest
+        """
+        files_by_id = {}
+        for path, entry in self.manifest.entries.items():
+            for chunk_id in entry["chunk_ids"]:
+                files_by_id.setdefault(chunk_id, []).append(path)
+        
+        seen = {os.path.normpath(path) for path in stale_files}
+        frontier = list(seen)
+        sharing = []
+        while frontier:
+            path = frontier.pop()
+            for chunk_id in self.manifest.get_chunk_ids(path):
+                for other in files_by_id.get(chunk_id, []):
+                    if other not in seen and os.path.exists(other):
+                        seen.add(other)
+                        frontier.append(other)
+                        sharing.append(other)
+        return sharing
+
+    def sync_documents(
+        self,
+        directory: Optional[str] = None,
+        recursive: bool = False,
+        include: Optional[List[str]] = None,
+        exclude: Optional[List[str]] = None,
+        delete_removed: bool = True,
+        num_workers: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Bring the vector store in line with the files in a directory.
+        
+        Only new or changed files are chunked and embedded. Vectors of changed
+        files are replaced, and with delete_removed the vectors of indexed files
+        that no longer appear in the directory listing are deleted. Files that
+        share deduplicated chunks with a changed or removed file are
+        re-ingested with it, so content they still hold is never deleted.
+        
+        Args:
+            directory: Directory to sync (defaults to the data directory)
+            recursive: Whether to descend into subdirectories
+            include: Glob patterns a file must match (None to include all)
+            exclude: Glob patterns of files to skip
+            delete_removed: Whether to delete vectors of files missing from the directory
+            num_workers: Number of worker processes for loading and splitting
+            
+        Returns:
+            Dictionary with the added, changed, removed, re-ingested and failed files
+        """
+        directory = directory or self.data_dir
+        if not self.manifest.exists() and not self.manifest.entries:
+            print("Warning: no index manifest found, vectors added before it existed are not tracked")
+        
+        file_paths = self.processor.find_files(directory, recursive=recursive, include=include, exclude=exclude)
+        scope = self.manifest.files_under(directory, recursive=recursive)
+        changes = self.manifest.diff(file_paths, scope=scope)
+        
+        stale_files = changes["changed"] + (changes["removed"] if delete_removed else [])
+        reindexed = self._files_sharing_chunks(stale_files)
+        hashes = dict(changes["hashes"])
+        hashes.update({path: IndexManifest.file_hash(path) for path in reindexed})
+        stale_files += reindexed
+        to_process = changes["added"] + changes["changed"] + reindexed
+        
+        # Apply deletions and additions together so a failure leaves the store and manifest as they were
+        entries = dict(self.manifest.entries)
+        try:
+            with self.embedding_manager.bulk():
+                stale_ids = {chunk_id for path in stale_files for chunk_id in self.manifest.get_chunk_ids(path)}
+                for path in stale_files:
+                    self.manifest.remove_file(path)
+                # A chunk still listed by a remaining file is that file's only copy of the content
+                for entry in self.manifest.entries.values():
+                    stale_ids.difference_update(entry["chunk_ids"])
+                self.embedding_manager.delete_documents(sorted(stale_ids))
+                
+                result = self.processor.process_files(to_process, num_workers=num_workers)
+                processed = [path for path in to_process if path not in result["failures"]]
+                chunks, ids = self._assign_chunk_ids(self._deduplicate(result["chunks"]), processed, hashes)
+                self.embedding_manager.add_documents(chunks, ids=ids)
+        except BaseException:
+            self.manifest.entries = entries
+            raise
+        self.manifest.save()
+        
+        print(
+            f"Synced {directory}: {len(changes['added'])} added, {len(changes['changed'])} changed, "
+            f"{len(changes['removed']) if delete_removed else 0} removed, {len(changes['unchanged'])} unchanged"
+            + (f" ({len(reindexed)} re-ingested for shared chunks)" if reindexed else "")
+        )
+        return {
+            "added": changes["added"],
+            "changed": changes["changed"],
+            "removed": changes["removed"] if delete_removed else [],
+            "reindexed": reindexed,
+            "failures": result["failures"]
+        }
 
     def add_documents(self, directory: str):
-        """Add new documents to the system."""
-        chunks = self.processor.process_documents(directory)
-        self.embedding_manager.add_documents(chunks)
+        """Add new or changed documents to the system, skipping files already indexed."""
+        return self.sync_documents(directory, delete_removed=False)
 
-    def query(self, query: str, with_sources: bool = False, use_mmr: bool = False):
+    def _retrieve_documents(
+        self,
+        query: str,
+        use_mmr: bool = False,
+        use_hybrid: bool = False,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        """Retrieve context documents with the requested strategy."""
+        if use_mmr:
+            return self.retriever.retrieve_with_mmr(query, filter=filter)
+        elif use_hybrid:
+            return self.retriever.hybrid_search(query, filter=filter)
+        return self.retriever.retrieve(query, filter=filter)
+
+    def query(
+        self,
+        query: str,
+        with_sources: bool = False,
+        use_mmr: bool = False,
+        use_hybrid: bool = False,
+        filter: Optional[Dict[str, Any]] = None
+    ):
         """
         Process a query through the RAG pipeline.
         
@@ -67,38 +419,117 @@ class OllamaRAGSystem:
             query: User query
             with_sources: Whether to include source citations
             use_mmr: Whether to use MMR for diverse retrieval
+            use_hybrid: Whether to fuse BM25 keyword and vector search
+            filter: Optional metadata filter scoping retrieval, e.g.
+                {"source": {"$in": [...]}} or {"modified": {"$gte": date}}
             
         Returns:
-            Generated response with metadata
+            Generated response with metadata; answers served from the answer
+            cache also carry the "cached_query" they were generated for and its "similarity"
         """
+        if self.answer_cache is not None:
+            embedding = self.retriever.embed_query(query)
+            scope = self._answer_scope(with_sources, use_mmr, use_hybrid, filter)
+            version = self._index_fingerprint()
+            cached = self.answer_cache.lookup(embedding, scope, version)
+            if cached is not None:
+                return self._cached_answer(query, cached)
+            start = time.perf_counter()
+        
         # Retrieve relevant documents
-        if use_mmr:
-            documents = self.retriever.retrieve_with_mmr(query)
-        else:
-            documents = self.retriever.retrieve(query)
+        documents = self._retrieve_documents(query, use_mmr, use_hybrid, filter)
         
         # Generate response
         if with_sources:
-            return self.generator.generate_response_with_sources(query, documents)
+            result = self.generator.generate_response_with_sources(query, documents)
         else:
-            return self.generator.generate_response(query, documents)
+            result = self.generator.generate_response(query, documents)
+        
+        if self.answer_cache is not None:
+            self.answer_cache.put(query, embedding, scope, version, result, time.perf_counter() - start)
+        return result
 
-    def direct_query(self, query: str, use_mmr: bool = False):
+    async def aquery(
+        self,
+        query: str,
+        with_sources: bool = False,
+        use_mmr: bool = False,
+        use_hybrid: bool = False,
+        filter: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Process a query through the RAG pipeline without blocking the event loop.
+        
+        Retrieval (query embedding, search, reranking) runs in the event loop's
+        default thread pool and generation uses a non-blocking HTTP client, so
+        one process can keep many queries in flight while Ollama works.
+        
+        Args:
+            query: User query
+            with_sources: Whether to include source citations
+            use_mmr: Whether to use MMR for diverse retrieval
+            use_hybrid: Whether to fuse BM25 keyword and vector search
+            filter: Optional metadata filter scoping retrieval
+            
+        Returns:
+            Generated response with metadata, marked like query's when served from the answer cache
+        """
+        loop = asyncio.get_running_loop()
+        if self.answer_cache is not None:
+            embedding = await loop.run_in_executor(None, self.retriever.embed_query, query)
+            scope = self._answer_scope(with_sources, use_mmr, use_hybrid, filter)
+            version = self._index_fingerprint()
+            cached = self.answer_cache.lookup(embedding, scope, version)
+            if cached is not None:
+                return self._cached_answer(query, cached)
+            start = time.perf_counter()
+        
+        documents = await loop.run_in_executor(
+            None, functools.partial(self._retrieve_documents, query, use_mmr, use_hybrid, filter)
+        )
+        result = await self.generator.agenerate(query, documents, with_sources=with_sources)
+        
+        if self.answer_cache is not None:
+            # Every save_every answers the put persists the cache to disk, so it stays off the event loop
+            await loop.run_in_executor(
+                None, functools.partial(self.answer_cache.put, query, embedding, scope, version, result, time.perf_counter() - start)
+            )
+        return result
+
+    def close(self):
+        """Persist outstanding cached answers and shut down the embedding and search worker processes."""
+        if self.answer_cache is not None:
+            self.answer_cache.close()
+        self.embedding_manager.close()
+
+    async def aclose(self):
+        """Release the async Ollama client, persist cached answers and stop worker processes; call before the event loop closes."""
+        if self._generator is not None:
+            await self._generator.aclose()
+        self.close()
+
+    def direct_query(
+        self,
+        query: str,
+        use_mmr: bool = False,
+        use_hybrid: bool = False,
+        filter: Optional[Dict[str, Any]] = None
+    ):
         """
         Process a query using direct Ollama API call.
         
         Args:
             query: User query
             use_mmr: Whether to use MMR for diverse retrieval
+            use_hybrid: Whether to fuse BM25 keyword and vector search
+            filter: Optional metadata filter scoping retrieval, e.g.
+                {"source": {"$in": [...]}} or {"modified": {"$gte": date}}
             
         Returns:
             Generated response with metadata
         """
         # Retrieve relevant documents
-        if use_mmr:
-            documents = self.retriever.retrieve_with_mmr(query)
-        else:
-            documents = self.retriever.retrieve(query)
+        documents = self._retrieve_documents(query, use_mmr, use_hybrid, filter)
         
         # Format the context
         context = self.generator.format_documents(documents)
@@ -128,4 +559,6 @@ if __name__ == "__main__":
 
     # Print the response
     print(f"\nQuery: {query}")
-    print(f"\nResponse:\n{result['response']}")
\ No newline at end of file
+    print(f"\nResponse:\n{result['response']}")
+
+    rag.close()
\ No newline at end of file
@@ -0,0 +1,308 @@
+# rag/ann_index.py
+import os
+import time
+import math
+from typing import List, Dict, Any, Optional
+import numpy as np
+
+# Chroma collection metadata keys for its HNSW parameters
+HNSW_METADATA_KEYS = {
+    "space": "hnsw:space",
+    "M": "hnsw:M",
+    "ef_construction": "hnsw:construction_ef",
+    "ef_search": "hnsw:search_ef",
+}
+
+
+def hnsw_collection_metadata(index_params: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Translate HNSW index parameters into Chroma collection metadata.
+
+    Args:
+        index_params: Dictionary with any of space, M, ef_construction, ef_search
+
+    Returns:
+        Chroma collection metadata, or None to keep Chroma's defaults
+    """
+    if not index_params:
+        return None
+    unknown = set(index_params) - set(HNSW_METADATA_KEYS) - {"type"}
+    if unknown:
+        raise ValueError(f"Unknown HNSW parameters: {sorted(unknown)}")
+    return {HNSW_METADATA_KEYS[key]: value for key, value in index_params.items() if key in HNSW_METADATA_KEYS}
+
+
+class IVFIndex:
+    """
+    Inverted-file index: k-means centroids with one list of rows per centroid.
+
+    A query scans only the rows of its nprobe nearest centroids, trading
+    recall for speed. Row assignments are kept aligned with the owning
+    store's rows so documents can be added and deleted without retraining.
+    """
+
+    def __init__(
+        self,
+        nlist: Optional[int] = None,
+        nprobe: int = 8,
+        train_size: int = 65536,
+        iterations: int = 10,
+        min_rows: int = 1024,
+        seed: int = 0
+    ):
+        """
+        Initialize the IVFIndex.
+
+        Args:
+            nlist: Number of centroids (None for 4 * sqrt(rows))
+            nprobe: Number of nearest centroids scanned per query
+            train_size: Maximum number of rows sampled to train the centroids
+            iterations: Number of k-means iterations
+            min_rows: Below this many rows searches stay exact
+            seed: Random seed for sampling and initialization
+        """
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_size = train_size
+        self.iterations = iterations
+        self.min_rows = min_rows
+        self.seed = seed
+
+        self.centroids: Optional[np.ndarray] = None
+        self.assignments = np.zeros(0, dtype=np.int32)
+        self.trained_rows = 0
+        self._order = None
+        self._offsets = None
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def _assign(self, vectors: np.ndarray, block_size: int = 65536) -> np.ndarray:
+        """Nearest centroid of every vector."""
+        centroid_norms = np.einsum("ij,ij->i", self.centroids, self.centroids)
+        assignments = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), block_size):
+            block = np.asarray(vectors[start:start + block_size], dtype=np.float32)
+            assignments[start:start + len(block)] = np.argmin(centroid_norms[None, :] - 2.0 * block @ self.centroids.T, axis=1)
+        return assignments
+
+    def train(self, vectors: np.ndarray) -> None:
+        """
+        Fit the centroids with k-means and assign every row.
+
+        Args:
+            vectors: Matrix of all stored vectors
+        """
+        rng = np.random.RandomState(self.seed)
+        num_rows = len(vectors)
+        nlist = min(self.nlist or max(1, int(4 * math.sqrt(num_rows))), num_rows)
+
+        sample_rows = np.sort(rng.choice(num_rows, size=min(self.train_size, num_rows), replace=False))
+        sample = np.asarray(vectors[sample_rows], dtype=np.float32)
+        self.centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+
+        for _ in range(self.iterations):
+            labels = self._assign(sample)
+            counts = np.bincount(labels, minlength=nlist)
+            empty = counts == 0
+            # Sum the members of each non-empty cluster in one sorted pass
+            order = np.argsort(labels, kind="stable")
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[~empty]
+            sums = np.add.reduceat(sample[order], starts, axis=0)
+            self.centroids[~empty] = sums / counts[~empty, None]
+            # Re-seed empty clusters with random sample points
+            if empty.any():
+                self.centroids[empty] = sample[rng.choice(len(sample), size=int(empty.sum()), replace=False)]
+
+        self.assignments = self._assign(vectors)
+        self.trained_rows = num_rows
+        self._order = None
+
+    def add(self, vectors: np.ndarray, total_rows: int) -> None:
+        """
+        Assign newly appended rows to the nearest existing centroids.
+
+        The centroids are trained once the store reaches min_rows and are not
+        refit as it grows; call train to refit them.
+
+        Args:
+            vectors: Matrix of all stored vectors, new rows last
+            total_rows: Number of rows including the new ones
+        """
+        if not self.is_trained:
+            if total_rows >= self.min_rows:
+                self.train(vectors[:total_rows])
+            return
+
+        new_rows = np.asarray(vectors[len(self.assignments):total_rows])
+        self.assignments = np.concatenate([self.assignments, self._assign(new_rows)])
+        self._order = None
+
+    def keep(self, rows: np.ndarray) -> None:
+        """
+        Drop deleted rows, keeping assignments aligned with the store.
+
+        Args:
+            rows: Indices of the rows that remain, in order
+        """
+        if self.is_trained:
+            self.assignments = self.assignments[rows]
+            self._order = None
+
+    def candidates(self, query: np.ndarray, nprobe: Optional[int] = None) -> np.ndarray:
+        """
+        Rows in the inverted lists of the centroids nearest to a query.
+
+        Args:
+            query: Query vector
+            nprobe: Number of lists to scan (None for the index default)
+
+        Returns:
+            Array of row indices
+        """
+        if self._order is None:
+            self._order = np.argsort(self.assignments, kind="stable")
+            self._offsets = np.concatenate([[0], np.cumsum(np.bincount(self.assignments, minlength=len(self.centroids)))])
+
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        distances = np.einsum("ij,ij->i", self.centroids, self.centroids) - 2.0 * self.centroids @ query
+        probe = np.argpartition(distances, nprobe - 1)[:nprobe]
+        return np.concatenate([self._order[self._offsets[c]:self._offsets[c + 1]] for c in probe])
+
+    def save(self, path: str) -> None:
+        """
+        Persist the centroids and assignments.
+
+        Args:
+            path: Path of the .npz file to write
+        """
+        if self.is_trained:
+            np.savez(path, centroids=self.centroids, assignments=self.assignments, trained_rows=self.trained_rows)
+
+    def load(self, path: str, num_rows: int) -> bool:
+        """
+        Load persisted centroids and assignments if they match the store.
+
+        Args:
+            path: Path of the .npz file
+            num_rows: Number of rows in the store
+
+        Returns:
+            True if the index was loaded
+        """
+        if not os.path.exists(path):
+            return False
+        data = np.load(path)
+        if len(data["assignments"]) != num_rows:
+            return False
+        self.centroids = data["centroids"]
+        self.assignments = data["assignments"]
+        self.trained_rows = int(data["trained_rows"])
+        self._order = None
+        return True
+
+
+def _exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Exact nearest rows by squared L2 distance for each query."""
+    distances = np.einsum("ij,ij->i", vectors, vectors)[None, :] - 2.0 * queries @ vectors.T
+    return np.argpartition(distances, k - 1, axis=1)[:, :k]
+
+
+def _latency_report(latencies: List[float]) -> Dict[str, float]:
+    return {
+        "p50_ms": 1000 * float(np.percentile(latencies, 50)),
+        "p99_ms": 1000 * float(np.percentile(latencies, 99)),
+    }
+
+
+def run_sweep(vectors: np.ndarray, queries: np.ndarray, configs: List[Dict[str, Any]], k: int = 10) -> List[Dict[str, Any]]:
+    """
+    Build each index configuration and measure recall@k against exact search.
+
+    Configurations are dictionaries with "type" set to "flat", "ivf" (nlist,
+    nprobe) or "hnsw" (M, ef_construction, ef_search; requires chromadb).
+    IVF configurations with the same nlist share one trained index, so their
+    build_s is the time of that single build.
+
+    Args:
+        vectors: Matrix of corpus embeddings
+        queries: Matrix of query embeddings
+        configs: Index configurations to evaluate
+        k: Number of results per query
+
+    Returns:
+        One result dictionary per configuration with recall, p50/p99 latency and build time
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    k = min(k, len(vectors))
+    exact = [set(row.tolist()) for row in _exact_top_k(vectors, queries, k)]
+    norms = np.einsum("ij,ij->i", vectors, vectors)
+    results = []
+    # Trained IVF indexes and their build times by nlist; nprobe only affects search
+    ivf_indexes: Dict[Optional[int], IVFIndex] = {}
+    ivf_build_times: Dict[Optional[int], float] = {}
+
+    for config in configs:
+        index_type = config.get("type", "flat")
+        latencies, found = [], []
+        start = time.perf_counter()
+
+        if index_type == "flat":
+            build_time = 0.0
+            for query in queries:
+                t = time.perf_counter()
+                distances = norms - 2.0 * vectors @ query
+                found.append(set(np.argpartition(distances, k - 1)[:k].tolist()))
+                latencies.append(time.perf_counter() - t)
+
+        elif index_type == "ivf":
+            nlist = config.get("nlist")
+            if nlist not in ivf_indexes:
+                ivf_indexes[nlist] = IVFIndex(nlist=nlist, min_rows=0)
+                ivf_indexes[nlist].train(vectors)
+                ivf_build_times[nlist] = time.perf_counter() - start
+            index = ivf_indexes[nlist]
+            nprobe = config.get("nprobe", 8)
+            build_time = ivf_build_times[nlist]
+            for query in queries:
+                t = time.perf_counter()
+                rows = index.candidates(query, nprobe)
+                distances = norms[rows] - 2.0 * vectors[rows] @ query
+                top = min(k, len(rows))
+                found.append(set(rows[np.argpartition(distances, top - 1)[:top]].tolist()))
+                latencies.append(time.perf_counter() - t)
+
+        elif index_type == "hnsw":
+            import chromadb
+            client = chromadb.Client()
+            name = f"sweep_{len(results)}"
+            params = {key: value for key, value in config.items() if key != "type"}
+            collection = client.create_collection(name, metadata=hnsw_collection_metadata(params))
+            ids = [str(i) for i in range(len(vectors))]
+            for batch_start in range(0, len(vectors), 5000):
+                collection.add(
+                    ids=ids[batch_start:batch_start + 5000],
+                    embeddings=vectors[batch_start:batch_start + 5000].tolist()
+                )
+            build_time = time.perf_counter() - start
+            for query in queries:
+                t = time.perf_counter()
+                result = collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])
+                found.append({int(i) for i in result["ids"][0]})
+                latencies.append(time.perf_counter() - t)
+            client.delete_collection(name)
+
+        else:
+            raise ValueError(f"Unsupported index type: {index_type}")
+
+        recall = float(np.mean([len(f & e) / len(e) for f, e in zip(found, exact)]))
+        results.append({
+            **config,
+            f"recall@{k}": recall,
+            **_latency_report(latencies),
+            "build_s": build_time
+        })
+
+    return results
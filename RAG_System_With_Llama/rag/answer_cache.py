@@ -0,0 +1,306 @@
+# rag/answer_cache.py
+import os
+import json
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Hashable, Sequence, Tuple
+import numpy as np
+from langchain.schema import Document
+from rag.mmr import _unit_rows
+
+
+class SemanticAnswerCache:
+    """
+    Generated answers keyed by query embedding, reused for rephrased questions.
+
+    A lookup returns the most similar cached query's answer if its cosine
+    similarity reaches the threshold. Only entries with the same scope (the
+    model and retrieval settings that shaped the answer) can match, and every
+    entry belongs to one index version: when the version moves the cache is
+    emptied, so answers never outlive the documents they were generated from.
+    Entries are evicted least recently used first and persisted as
+    answer_cache.json with their unit-length query embeddings in
+    answer_cache.npy, rewritten every save_every new answers, on clear and
+    on close rather than after each one.
+    """
+
+    FILENAME = "answer_cache.json"
+    VECTORS_FILE = "answer_cache.npy"
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_entries: int = 1024,
+        threshold: float = 0.95,
+        save_every: int = 32
+    ):
+        """
+        Initialize the SemanticAnswerCache, loading persisted entries if present.
+
+        Args:
+            directory: Directory to persist the cache in (None for in-memory)
+            max_entries: Maximum number of answers before the least recently used is evicted
+            threshold: Minimum cosine similarity between queries for a cached answer to be reused
+            save_every: New answers between saves; answers since the last save are
+                written by flush or close
+        """
+        self.directory = directory
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.save_every = save_every
+        self.version: Optional[Hashable] = None
+
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._vectors: Dict[int, np.ndarray] = {}
+        self._next_key = 0
+        # Answers put since the entries were last written
+        self._unsaved = 0
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        # Matrix of the cached query embeddings, rebuilt on the first lookup after a change
+        self._matrix: Optional[Tuple[List[int], np.ndarray, np.ndarray]] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+
+        self.load()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def load(self) -> None:
+        """Load persisted entries, keeping the most recently used if max_entries has shrunk."""
+        if not self.directory or not os.path.exists(self._path(self.FILENAME)):
+            return
+
+        with open(self._path(self.FILENAME), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        vectors = np.load(self._path(self.VECTORS_FILE))
+        self.version = data["index_version"]
+        for entry, vector in list(zip(data["entries"], vectors))[-self.max_entries:]:
+            self._entries[self._next_key] = entry
+            self._vectors[self._next_key] = vector
+            self._next_key += 1
+        self._matrix = None
+
+    def save(self) -> None:
+        """Write the entries to disk atomically, least recently used first."""
+        if not self.directory:
+            return
+
+        # Snapshot and write under one save lock so a later snapshot is never overwritten by an earlier one
+        with self._save_lock:
+            with self._lock:
+                entries = list(self._entries.values())
+                vectors = np.asarray([self._vectors[key] for key in self._entries], dtype=np.float32)
+                version = self.version
+                self._unsaved = 0
+
+            os.makedirs(self.directory, exist_ok=True)
+            vectors_path = self._path(self.VECTORS_FILE)
+            path = self._path(self.FILENAME)
+            with open(vectors_path + ".tmp", "wb") as f:
+                np.save(f, vectors)
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump({"index_version": version, "entries": entries}, f, separators=(",", ":"), default=str)
+            os.replace(vectors_path + ".tmp", vectors_path)
+            os.replace(path + ".tmp", path)
+
+    def _check_version(self, version: Hashable) -> None:
+        """Drop every entry once the index has changed (call with the lock held)."""
+        if version != self.version:
+            self._entries.clear()
+            self._vectors.clear()
+            self._matrix = None
+            self.version = version
+
+    def _nearest(self, embedding: np.ndarray, scope: str) -> Tuple[Optional[int], float]:
+        """Most similar cached query in a scope, as (key, cosine similarity) (call with the lock held)."""
+        if not self._entries:
+            return None, -1.0
+        if self._matrix is None:
+            keys = list(self._entries)
+            self._matrix = (
+                keys,
+                np.asarray([self._vectors[key] for key in keys], dtype=np.float32),
+                np.asarray([self._entries[key]["scope"] for key in keys], dtype=object)
+            )
+        keys, matrix, scopes = self._matrix
+        similarities = matrix @ embedding
+        similarities[scopes != scope] = -np.inf
+        best = int(np.argmax(similarities))
+        return keys[best], float(similarities[best])
+
+    def lookup(self, embedding: Sequence[float], scope: str, version: Hashable) -> Optional[Dict[str, Any]]:
+        """
+        Find the cached answer to the most similar query, counting a hit or a miss.
+
+        Args:
+            embedding: Query embedding
+            scope: Settings the answer must have been generated under
+            version: Current index version
+
+        Returns:
+            Dictionary with the cached "query", "response", "model", its
+            "context_documents" and the "similarity", or None on a miss
+        """
+        embedding = _unit_rows(np.asarray(embedding, dtype=np.float32).reshape(-1))
+        with self._lock:
+            self._check_version(version)
+            key, similarity = self._nearest(embedding, scope)
+            if key is None or similarity < self.threshold:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            entry = self._entries[key]
+            self.hits += 1
+            self.saved_seconds += entry["cost"]
+
+        return {
+            "query": entry["query"],
+            "response": entry["response"],
+            "context_documents": [
+                Document(page_content=document["page_content"], metadata=dict(document["metadata"]))
+                for document in entry["documents"]
+            ],
+            "model": entry["model"],
+            "similarity": similarity
+        }
+
+    def put(
+        self,
+        query: str,
+        embedding: Sequence[float],
+        scope: str,
+        version: Hashable,
+        result: Dict[str, Any],
+        cost: float = 0.0
+    ) -> None:
+        """
+        Cache a generated answer, persisting the cache every save_every answers.
+
+        Args:
+            query: Query text
+            embedding: Query embedding
+            scope: Settings the answer was generated under
+            version: Index version the answer was generated from
+            result: Generator result with "response", "context_documents" and "model"
+            cost: Seconds the answer took, credited to later hits
+        """
+        entry = {
+            "query": query,
+            "scope": scope,
+            "response": result["response"],
+            "documents": [
+                {"page_content": document.page_content, "metadata": document.metadata}
+                for document in result["context_documents"]
+            ],
+            "model": result["model"],
+            "cost": cost
+        }
+        with self._lock:
+            # An answer generated from an index that has changed since would be stale on arrival
+            if version != self.version:
+                return
+            self._entries[self._next_key] = entry
+            self._vectors[self._next_key] = _unit_rows(np.asarray(embedding, dtype=np.float32).reshape(-1))
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                key, _ = self._entries.popitem(last=False)
+                del self._vectors[key]
+                self.evictions += 1
+            self._matrix = None
+            self._unsaved += 1
+            due = self._unsaved >= self.save_every
+        if due:
+            self.save()
+
+    def clear(self) -> None:
+        """Drop every entry, keeping the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._vectors.clear()
+            self._matrix = None
+        self.save()
+
+    def flush(self) -> None:
+        """Persist answers put since the last save."""
+        if self._unsaved:
+            self.save()
+
+    def close(self) -> None:
+        """Persist outstanding answers; call before exiting."""
+        self.flush()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with hits, misses, hit rate, evictions, entry count,
+            the similarity threshold and the generation time saved
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "threshold": self.threshold,
+            "saved_ms": 1000 * self.saved_seconds
+        }
+
+
+def evaluate_answer_cache(
+    embeddings: np.ndarray,
+    labels: Sequence[Hashable],
+    thresholds: Sequence[float] = (0.85, 0.9, 0.95, 0.98)
+) -> List[Dict[str, Any]]:
+    """
+    Replay a labelled query stream through an empty cache at several thresholds.
+
+    Queries with the same label should share an answer. Each query is matched
+    against the queries stored so far; a match at or above the threshold is a
+    hit, and a false match when the labels differ, otherwise the query is
+    stored as the cache would after generating its answer.
+
+    Args:
+        embeddings: Matrix of query embeddings, in stream order
+        labels: Answer label of each query
+        thresholds: Cosine similarity thresholds to evaluate
+
+    Returns:
+        Per threshold a dictionary with the hit rate, false matches, the
+        share of hits that were false and the hit rate an ideal cache would reach
+    """
+    unit = _unit_rows(np.asarray(embeddings, dtype=np.float32))
+    labels = list(labels)
+    similarities = unit @ unit.T
+    possible = len(labels) - len(set(labels))
+
+    results = []
+    for threshold in thresholds:
+        stored: List[int] = []
+        hits = false_matches = 0
+        for i, label in enumerate(labels):
+            if stored:
+                best = stored[int(np.argmax(similarities[i, stored]))]
+                if similarities[i, best] >= threshold:
+                    hits += 1
+                    false_matches += labels[best] != label
+                    continue
+            stored.append(i)
+        results.append({
+            "threshold": threshold,
+            "hit_rate": hits / len(labels) if labels else 0.0,
+            "false_matches": false_matches,
+            "false_match_rate": false_matches / hits if hits else 0.0,
+            "possible_hit_rate": possible / len(labels) if labels else 0.0
+        })
+    return results
@@ -0,0 +1,384 @@
+# rag/bm25.py
+import os
+import re
+import json
+import math
+import itertools
+from typing import List, Dict, Any, Optional, Tuple, Iterable
+import numpy as np
+from rag.numpy_store import rowwise_top_k
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase word tokens.
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        List of tokens
+    """
+    return _TOKEN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Persisted BM25 inverted index over chunk texts, keyed by vector store ID.
+
+    Postings live in a CSR layout (per-term offsets into slot, term
+    frequency and precomputed BM25 term-weight arrays) that is memory-mapped
+    on load, so a query term costs one multiply and one scatter-add over its
+    postings. New chunks go into small sorted batches that are searched
+    alongside the CSR arrays and merged into them on save. Deleted chunks are
+    masked out and dropped once they make up a quarter of the slots; until
+    then they still count towards document frequencies.
+
+    save writes a snapshot under a new generation number and switches to it
+    by replacing index.json, so readers see either the old or the new
+    snapshot. persist only appends the adds and deletes made since the last
+    snapshot to that generation's log, which load replays.
+    """
+
+    DIRECTORY = "bm25"
+    MAX_PENDING_BATCHES = 32
+    ARRAYS = ("offsets", "slots", "tfs", "weights", "lengths", "alive")
+
+    def __init__(self, directory: Optional[str] = None, k1: float = 1.5, b: float = 0.75):
+        """
+        Initialize the BM25Index, loading persisted data if present.
+
+        Args:
+            directory: Directory to persist the index in (None for in-memory)
+            k1: Term frequency saturation parameter
+            b: Document length normalization parameter
+        """
+        self.directory = directory
+        self.k1 = k1
+        self.b = b
+        self.generation = 0
+        self.reset()
+        if directory and os.path.exists(os.path.join(directory, "index.json")):
+            self.load()
+
+    def reset(self) -> None:
+        """Remove every chunk from the index (in memory only until save)."""
+        self.vocabulary: Dict[str, int] = {}
+        self.ids: List[Optional[str]] = []
+        self.slot_of: Dict[str, int] = {}
+        self.lengths = np.zeros(0, dtype=np.int32)
+        self.alive = np.zeros(0, dtype=bool)
+        self.total_length = 0
+        self.num_alive = 0
+        # Merged postings: term t owns slots[offsets[t]:offsets[t + 1]]
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.slots = np.zeros(0, dtype=np.int32)
+        self.tfs = np.zeros(0, dtype=np.uint16)
+        self.weights = np.zeros(0, dtype=np.float32)
+        # Unmerged postings, one (terms, slots, tfs) triple per add, sorted by term
+        self.pending: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        # Changes not yet in the log, and whether only a full snapshot can persist the index
+        self._unlogged: List[Dict[str, Any]] = []
+        self._logged_chunks = 0
+        self._needs_snapshot = True
+
+    def __len__(self) -> int:
+        return self.num_alive
+
+    def _grow(self, size: int) -> None:
+        """Make room for size slots in the per-slot arrays."""
+        if size > len(self.lengths):
+            capacity = max(size, 2 * len(self.lengths), 1024)
+            self.lengths = np.concatenate([self.lengths, np.zeros(capacity - len(self.lengths), dtype=np.int32)])
+            self.alive = np.concatenate([self.alive, np.zeros(capacity - len(self.alive), dtype=bool)])
+
+    def add(self, ids: List[str], texts: List[str]) -> None:
+        """
+        Index chunks, replacing any already indexed under the same ID.
+
+        Args:
+            ids: Vector store IDs of the chunks
+            texts: Texts of the chunks
+        """
+        if not ids:
+            return
+        # The last occurrence of a repeated ID wins, as in the vector stores
+        latest = {doc_id: i for i, doc_id in enumerate(ids)}
+        if len(latest) < len(ids):
+            ids, texts = [ids[i] for i in latest.values()], [texts[i] for i in latest.values()]
+        self._unlogged.append({"add": ids, "texts": texts})
+        self._remove([doc_id for doc_id in ids if doc_id in self.slot_of])
+
+        tokens = [tokenize(text) for text in texts]
+        lengths = np.fromiter((len(t) for t in tokens), dtype=np.int32, count=len(tokens))
+        first_slot = len(self.ids)
+        self._grow(first_slot + len(ids))
+        self.lengths[first_slot:first_slot + len(ids)] = lengths
+        self.alive[first_slot:first_slot + len(ids)] = True
+        for offset, doc_id in enumerate(ids):
+            self.slot_of[doc_id] = first_slot + offset
+        self.ids.extend(ids)
+        self.total_length += int(lengths.sum())
+        self.num_alive += len(ids)
+
+        vocabulary = self.vocabulary
+        term_ids = np.fromiter(
+            (vocabulary.setdefault(token, len(vocabulary)) for token in itertools.chain.from_iterable(tokens)),
+            dtype=np.int64,
+            count=int(lengths.sum())
+        )
+        if not len(term_ids):
+            return
+
+        # One posting per distinct (term, slot) pair, counted in a single sort
+        slots = np.repeat(np.arange(first_slot, first_slot + len(ids), dtype=np.int64), lengths)
+        keys, counts = np.unique(term_ids * len(self.ids) + slots, return_counts=True)
+        self.pending.append((
+            (keys // len(self.ids)).astype(np.int64),
+            (keys % len(self.ids)).astype(np.int32),
+            np.minimum(counts, np.iinfo(np.uint16).max).astype(np.uint16)
+        ))
+        if len(self.pending) > self.MAX_PENDING_BATCHES:
+            self.merge()
+
+    def delete(self, ids: List[str]) -> None:
+        """
+        Remove chunks from the index.
+
+        Args:
+            ids: Vector store IDs of the chunks
+        """
+        ids = [doc_id for doc_id in ids if doc_id in self.slot_of]
+        if ids:
+            self._unlogged.append({"delete": ids})
+            self._remove(ids)
+
+    def _remove(self, ids: List[str]) -> None:
+        """Mask out the slots of indexed chunks."""
+        for doc_id in ids:
+            slot = self.slot_of.pop(doc_id, None)
+            if slot is None:
+                continue
+            self.alive[slot] = False
+            self.ids[slot] = None
+            self.total_length -= int(self.lengths[slot])
+            self.num_alive -= 1
+
+    def _term_weights(self, slots: np.ndarray, tfs: np.ndarray) -> np.ndarray:
+        """BM25 term-frequency component of postings, before multiplying by idf."""
+        average_length = self.total_length / max(self.num_alive, 1)
+        tf = tfs.astype(np.float32)
+        norm = self.k1 * (1.0 - self.b + self.b * self.lengths[slots] / max(average_length, 1e-9))
+        return (tf * (self.k1 + 1.0) / (tf + norm)).astype(np.float32)
+
+    def _postings(self, term_id: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """(slots, term weights) blocks of a term across merged and pending postings."""
+        blocks = []
+        if term_id + 1 < len(self.offsets):
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            if end > start:
+                blocks.append((self.slots[start:end], self.weights[start:end]))
+        for terms, slots, tfs in self.pending:
+            start, end = np.searchsorted(terms, [term_id, term_id + 1])
+            if end > start:
+                blocks.append((slots[start:end], self._term_weights(slots[start:end], tfs[start:end])))
+        return blocks
+
+    def search(self, query: str, k: int = 4, ids: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Rank chunks against a query with BM25.
+
+        Args:
+            query: Query text
+            k: Number of results
+            ids: Optional IDs of the only chunks that may be returned
+
+        Returns:
+            List of (chunk ID, BM25 score) tuples, best first
+        """
+        if not self.num_alive:
+            return []
+
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term in dict.fromkeys(tokenize(query)):
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            blocks = self._postings(term_id)
+            df = min(sum(len(slots) for slots, _ in blocks), self.num_alive)
+            if not df:
+                continue
+            idf = np.float32(math.log(1.0 + (self.num_alive - df + 0.5) / (df + 0.5)))
+            for slots, weights in blocks:
+                # Every slot appears at most once per term, so plain fancy-index addition is exact
+                scores[slots] += idf * weights
+
+        scores *= self.alive[:len(scores)]
+        if ids is not None:
+            allowed = np.zeros(len(scores), dtype=bool)
+            allowed[[self.slot_of[doc_id] for doc_id in ids if doc_id in self.slot_of]] = True
+            scores *= allowed
+        top = rowwise_top_k(-scores[None, :], min(k, len(scores)))[0]
+        top = top[scores[top] > 0]
+        top = top[np.lexsort((top, -scores[top]))]
+        return [(self.ids[slot], float(scores[slot])) for slot in top]
+
+    def merge(self, compact: Optional[bool] = None) -> None:
+        """
+        Fold pending postings into the CSR arrays.
+
+        Args:
+            compact: Whether to drop deleted slots (None to compact once a quarter of slots are deleted)
+        """
+        num_slots = len(self.ids)
+        if compact is None:
+            compact = num_slots > 0 and (num_slots - self.num_alive) * 4 >= num_slots
+        if not self.pending and not compact:
+            return
+
+        counts = np.diff(self.offsets)
+        terms = [np.repeat(np.arange(len(counts), dtype=np.int64), counts)] + [p[0] for p in self.pending]
+        slots = [np.asarray(self.slots)] + [p[1] for p in self.pending]
+        tfs = [np.asarray(self.tfs)] + [p[2] for p in self.pending]
+        terms, slots, tfs = np.concatenate(terms), np.concatenate(slots), np.concatenate(tfs)
+
+        if compact:
+            keep = self.alive[slots]
+            terms, slots, tfs = terms[keep], slots[keep], tfs[keep]
+            live = self.alive[:num_slots]
+            remap = np.cumsum(live, dtype=np.int64) - 1
+            slots = remap[slots].astype(np.int32)
+            self.ids = [doc_id for doc_id in self.ids if doc_id is not None]
+            self.slot_of = {doc_id: slot for slot, doc_id in enumerate(self.ids)}
+            self.lengths = self.lengths[:num_slots][live]
+            self.alive = np.ones(len(self.ids), dtype=bool)
+
+        # Stable sort keeps each term's slots in ascending order
+        order = np.argsort(terms, kind="stable")
+        self.slots = slots[order].astype(np.int32)
+        self.tfs = tfs[order]
+        # Length normalization uses the average chunk length as of this merge
+        self.weights = self._term_weights(self.slots, self.tfs)
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(terms, minlength=len(self.vocabulary)))]).astype(np.int64)
+        self.pending = []
+
+    def _path(self, name: str, generation: int) -> str:
+        """File of a snapshot array or log in a generation (generation 0 predates numbering)."""
+        stem, extension = name.rsplit(".", 1)
+        return os.path.join(self.directory, f"{stem}.{generation}.{extension}" if generation else name)
+
+    def save(self) -> None:
+        """Merge pending postings and write a new snapshot of the index to its directory."""
+        self.merge()
+        if not self.directory:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        generation = self.generation + 1
+        num_slots = len(self.ids)
+        arrays = {
+            "offsets": self.offsets,
+            "slots": np.asarray(self.slots),
+            "tfs": np.asarray(self.tfs),
+            "weights": np.asarray(self.weights),
+            "lengths": self.lengths[:num_slots],
+            "alive": self.alive[:num_slots],
+        }
+        # New generations never overwrite files the current index.json names
+        for name, array in arrays.items():
+            with open(self._path(name + ".npy", generation), "wb") as f:
+                np.save(f, array)
+        with open(os.path.join(self.directory, "index.json.tmp"), "w", encoding="utf-8") as f:
+            json.dump({
+                "generation": generation,
+                "ids": self.ids,
+                "terms": list(self.vocabulary),
+                "total_length": self.total_length
+            }, f, separators=(",", ":"))
+        os.replace(os.path.join(self.directory, "index.json.tmp"), os.path.join(self.directory, "index.json"))
+
+        self.generation = generation
+        self._unlogged = []
+        self._logged_chunks = 0
+        self._needs_snapshot = False
+        current = {os.path.basename(self._path(name + ".npy", generation)) for name in self.ARRAYS} | {"index.json"}
+        for name in os.listdir(self.directory):
+            # Memory maps of removed files stay readable until they are closed
+            if name not in current and (name.split(".", 1)[0] in self.ARRAYS or name.startswith("log.")):
+                os.remove(os.path.join(self.directory, name))
+
+    def persist(self) -> None:
+        """
+        Persist the changes since the last snapshot.
+
+        Adds and deletes are appended to the current generation's log, so the
+        cost is proportional to the change rather than to the index. A full
+        snapshot is written instead when none exists yet, after reset, or once
+        the log holds as many chunks as half the index.
+        """
+        if not self.directory or not (self._unlogged or self._needs_snapshot):
+            return
+        logged = sum(len(change.get("add", change.get("delete"))) for change in self._unlogged)
+        if self._needs_snapshot or 2 * (self._logged_chunks + logged) > max(self.num_alive, 1024):
+            self.save()
+            return
+
+        with open(self._path("log.jsonl", self.generation), "a", encoding="utf-8") as f:
+            for change in self._unlogged:
+                f.write(json.dumps(change, separators=(",", ":")) + "\n")
+        self._unlogged = []
+        self._logged_chunks += logged
+
+    def load(self) -> None:
+        """Load the persisted snapshot, memory-mapping the postings, and replay its log."""
+        with open(os.path.join(self.directory, "index.json"), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.reset()
+        self.generation = data.get("generation", 0)
+        self.ids = data["ids"]
+        self.slot_of = {doc_id: slot for slot, doc_id in enumerate(self.ids) if doc_id is not None}
+        self.vocabulary = {term: term_id for term_id, term in enumerate(data["terms"])}
+        self.total_length = data["total_length"]
+        self.offsets = np.load(self._path("offsets.npy", self.generation))
+        self.slots = np.load(self._path("slots.npy", self.generation), mmap_mode="r")
+        self.tfs = np.load(self._path("tfs.npy", self.generation), mmap_mode="r")
+        self.weights = np.load(self._path("weights.npy", self.generation), mmap_mode="r")
+        self.lengths = np.load(self._path("lengths.npy", self.generation))
+        self.alive = np.load(self._path("alive.npy", self.generation))
+        self.num_alive = int(self.alive.sum())
+        # Snapshots written before generation numbering have no log to append to
+        self._needs_snapshot = self.generation == 0
+
+        log_path = self._path("log.jsonl", self.generation)
+        if self.generation and os.path.exists(log_path):
+            with open(log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        change = json.loads(line)
+                    except ValueError:
+                        # A line cut short by a crash mid-append ends the log; the next persist rewrites it
+                        self._needs_snapshot = True
+                        break
+                    if "add" in change:
+                        self.add(change["add"], change["texts"])
+                        self._logged_chunks += len(change["add"])
+                    else:
+                        self.delete(change["delete"])
+                        self._logged_chunks += len(change["delete"])
+            self._unlogged = []
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get index statistics.
+
+        Returns:
+            Dictionary with chunk, term, posting and pending batch counts
+        """
+        return {
+            "chunks": self.num_alive,
+            "terms": len(self.vocabulary),
+            "postings": int(len(self.slots) + sum(len(p[1]) for p in self.pending)),
+            "pending_batches": len(self.pending),
+        }
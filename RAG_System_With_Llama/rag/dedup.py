@@ -0,0 +1,152 @@
+# rag/dedup.py
+import json
+import zlib
+import hashlib
+from typing import List, Dict, Any, Tuple
+import numpy as np
+from langchain.schema import Document
+
+# Mersenne prime used for the MinHash permutations (a * x + b fits in 64 bits)
+_MERSENNE_PRIME = (1 << 31) - 1
+
+
+class ChunkDeduplicator:
+    """Class for removing exact and near-duplicate chunks before they are embedded."""
+
+    def __init__(self, threshold: float = 0.85, num_perm: int = 128, shingle_size: int = 3, seed: int = 1):
+        """
+        Initialize the ChunkDeduplicator.
+
+        Args:
+            threshold: Estimated Jaccard similarity above which two chunks are near-duplicates
+            num_perm: Number of MinHash permutations
+            shingle_size: Number of words per shingle
+            seed: Seed for the MinHash permutations
+        """
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, _MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+        self.bands, self.rows = self._choose_bands(threshold, num_perm)
+
+    @staticmethod
+    def _choose_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+        """Pick the LSH band layout whose detection threshold is closest to the target."""
+        layouts = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+        return min(layouts, key=lambda layout: abs((1 / layout[0]) ** (1 / layout[1]) - threshold))
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """
+        Normalize text for exact duplicate detection.
+
+        Args:
+            text: Chunk text
+
+        Returns:
+            Lowercased text with whitespace collapsed
+        """
+        return " ".join(text.lower().split())
+
+    def minhash(self, text: str) -> np.ndarray:
+        """
+        Compute the MinHash signature of a chunk's word shingles.
+
+        Args:
+            text: Normalized chunk text
+
+        Returns:
+            Array of num_perm minimum hash values
+        """
+        words = text.split()
+        if len(words) <= self.shingle_size:
+            shingles = {text}
+        else:
+            shingles = {" ".join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        hashes %= _MERSENNE_PRIME
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME
+        return permuted.min(axis=0)
+
+    def deduplicate(self, chunks: List[Document]) -> Dict[str, Any]:
+        """
+        Drop exact and near-duplicate chunks, keeping the first occurrence.
+
+        Kept chunks record every other source that shared them in the
+        "duplicate_sources" metadata field (a JSON list, since vector stores
+        only accept scalar metadata) and their copy count in "duplicate_count".
+
+        Args:
+            chunks: Document chunks in ingestion order
+
+        Returns:
+            Dictionary with the kept chunks and counts of what was removed
+        """
+        kept = []
+        signatures = []
+        exact_index = {}
+        buckets = {}
+        provenance = {}
+        removed_exact = removed_near = removed_chars = 0
+
+        for chunk in chunks:
+            text = self.normalize(chunk.page_content)
+            digest = hashlib.sha1(text.encode("utf-8")).digest()
+            source = chunk.metadata.get('source', '')
+
+            match = exact_index.get(digest)
+            if match is not None:
+                removed_exact += 1
+            else:
+                signature = self.minhash(text)
+                keys = [
+                    (band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                    for band in range(self.bands)
+                ]
+                candidates = sorted({i for key in keys for i in buckets.get(key, ())})
+                for i in candidates:
+                    if np.mean(signatures[i] == signature) >= self.threshold:
+                        match = i
+                        break
+
+                if match is not None:
+                    removed_near += 1
+                else:
+                    match = len(kept)
+                    kept.append(chunk)
+                    signatures.append(signature)
+                    provenance[match] = []
+                    exact_index[digest] = match
+                    for key in keys:
+                        buckets.setdefault(key, []).append(match)
+                    continue
+
+            removed_chars += len(chunk.page_content)
+            provenance[match].append(source)
+
+        results = []
+        for i, chunk in enumerate(kept):
+            if provenance[i]:
+                metadata = dict(chunk.metadata)
+                sources = sorted(set(provenance[i]) - {metadata.get('source', '')})
+                metadata['duplicate_sources'] = json.dumps(sources)
+                metadata['duplicate_count'] = len(provenance[i])
+                chunk = Document(page_content=chunk.page_content, metadata=metadata)
+            results.append(chunk)
+
+        removed = removed_exact + removed_near
+        print(
+            f"Deduplicated {len(chunks)} chunks: removed {removed_exact} exact and "
+            f"{removed_near} near duplicates ({removed_chars} characters)"
+        )
+        return {
+            "chunks": results,
+            "removed_exact": removed_exact,
+            "removed_near": removed_near,
+            "removed_chars": removed_chars,
+            "removed_fraction": removed / len(chunks) if chunks else 0.0
+        }
@@ -1,28 +1,274 @@
 # rag/document_processor.py
 import os
-from typing import List, Dict, Any, Optional
-from langchain.document_loaders import PyPDFLoader, TextLoader
+import io
+import mmap
+import codecs
+import locale
+import fnmatch
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple, Iterator
+from langchain.document_loaders import TextLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain.schema import Document
+from rag.pdf_extractor import PDFExtractor
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.txt', '.md', '.html')
+TEXT_EXTENSIONS = ('.txt', '.md', '.html')
+
+# Processor used by pool workers, set once per worker process by _init_worker
+_worker_processor = None
+# Whether this process is a file-level pool worker (no nested page-level pools)
+_in_worker = False
+
+
+def _init_worker(processor: "DocumentProcessor", in_pool: bool = True) -> None:
+    """Store a copy of the parent's processor in a pool worker."""
+    global _worker_processor, _in_worker
+    _worker_processor = processor
+    _in_worker = in_pool
+
+
+def _load_and_split_file(file_path: str) -> Tuple[str, List[Any], Optional[str]]:
+    """
+    Load and split a single file inside a pool worker.
+    
+    Args:
+        file_path: Path to the document file
+        
+    Returns:
+        Tuple of (file_path, chunks, error message or None)
+    """
+    try:
+        return file_path, list(_worker_processor.iter_file_chunks(file_path)), None
+    except Exception as e:
+        return file_path, [], f"{type(e).__name__}: {e}"
+
+
+class FastTextSplitter:
+    """
+    Single-pass text splitter that records where each chunk sits in the source.
+    
+    Uses the same limits as RecursiveCharacterTextSplitter but not its merging:
+    each chunk is at most chunk_size long and ends at the strongest separator
+    ("\n\n", then "\n", then " ") that fits, falling back to a hard cut. The next
+    chunk repeats up to chunk_overlap of the previous one, cut at the same separator.
+    LangChain instead splits recursively and merges the pieces back up, so chunk
+    boundaries differ for many texts and switching splitters re-chunks a corpus.
+    Every chunk only depends on a bounded window of text after its start, so the
+    same spans can be produced from a stream (see split_spans with final=False).
+    """
+
+    SEPARATORS = ("\n\n", "\n", " ")
+    # Upper bound on characters per token used to size tokenizer windows
+    MAX_CHARS_PER_TOKEN = 10
+
+    def __init__(self, chunk_size: int = 250, chunk_overlap: int = 50, tokenizer_name: Optional[str] = None):
+        """
+        Initialize the FastTextSplitter.
+        
+        Args:
+            chunk_size: Maximum chunk length (characters, or tokens with a tokenizer)
+            chunk_overlap: Overlap between consecutive chunks in the same unit
+            tokenizer_name: HuggingFace tokenizer to measure length in tokens (None for characters)
+        """
+        if chunk_overlap >= chunk_size:
+            raise ValueError(f"chunk_overlap ({chunk_overlap}) must be smaller than chunk_size ({chunk_size})")
+        
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.tokenizer_name = tokenizer_name
+        self._tokenizer = None
+        
+        chars_per_unit = self.MAX_CHARS_PER_TOKEN if tokenizer_name else 1
+        # Characters after a chunk start that may influence where the chunk ends
+        self.lookahead = chunk_size * chars_per_unit + 1
+        self.overlap_lookback = chunk_overlap * chars_per_unit
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_tokenizer"] = None
+        return state
+
+    @property
+    def tokenizer(self):
+        """Tokenizer used to measure length, loaded on first use."""
+        if self._tokenizer is None and self.tokenizer_name:
+            from transformers import AutoTokenizer
+            name = self.tokenizer_name
+            if "/" not in name:
+                name = f"sentence-transformers/{name}"
+            self._tokenizer = AutoTokenizer.from_pretrained(name)
+        return self._tokenizer
+
+    def _token_offsets(self, text: str) -> List[Tuple[int, int]]:
+        return self.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)["offset_mapping"]
+
+    def _window_end(self, text: str, start: int) -> int:
+        """Largest end such that text[start:end] fits in chunk_size."""
+        if not self.tokenizer_name:
+            return min(len(text), start + self.chunk_size)
+        
+        window = text[start:start + self.lookahead]
+        offsets = self._token_offsets(window)
+        if len(offsets) <= self.chunk_size:
+            return start + len(window)
+        return start + offsets[self.chunk_size - 1][1]
+
+    def _overlap_start(self, text: str, start: int, end: int, separator: Optional[str]) -> int:
+        """
+        Start of the next chunk: the earliest separator boundary in (start, end]
+        such that text[pos:end] fits in chunk_overlap, or end if there is none.
+        """
+        if not self.tokenizer_name:
+            candidate = end - self.chunk_overlap
+        else:
+            window_start = max(start, end - self.overlap_lookback)
+            offsets = self._token_offsets(text[window_start:end])
+            if len(offsets) <= self.chunk_overlap:
+                candidate = window_start
+            else:
+                candidate = window_start + offsets[-self.chunk_overlap][0]
+        
+        if candidate <= start:
+            return end
+        if separator is None:
+            return candidate
+        
+        # Only overlap whole pieces at the level the chunk was split at
+        index = text.find(separator, candidate, end)
+        return end if index == -1 else index + len(separator)
+
+    def split_spans(self, text: str, final: bool = True) -> Tuple[List[Tuple[int, int]], int]:
+        """
+        Compute chunk boundaries as character offsets.
+        
+        Args:
+            text: Text to split
+            final: Whether text reaches the end of the source; when False, splitting
+                stops before the window would run past the available text
+            
+        Returns:
+            Tuple of (list of (start, end) spans with whitespace trimmed, position to resume from)
+        """
+        spans = []
+        start = 0
+        length = len(text)
+        
+        while start < length:
+            if not final and length - start <= self.lookahead:
+                break
+            
+            limit = self._window_end(text, start)
+            end = limit
+            separator = None
+            if limit < length:
+                for candidate in self.SEPARATORS:
+                    index = text.rfind(candidate, start + 1, limit)
+                    if index != -1:
+                        end = index
+                        separator = candidate
+                        break
+            
+            # Trim surrounding whitespace like the LangChain splitters do
+            chunk = text[start:end]
+            chunk_start = start + len(chunk) - len(chunk.lstrip())
+            chunk_end = end - len(chunk) + len(chunk.rstrip())
+            if chunk_start < chunk_end:
+                spans.append((chunk_start, chunk_end))
+            
+            if end >= length:
+                start = length
+                break
+            start = self._overlap_start(text, start, end, separator)
+        
+        return spans, start
+
+    def split_text(self, text: str) -> List[str]:
+        """
+        Split text into chunks.
+        
+        Args:
+            text: Text to split
+            
+        Returns:
+            List of chunk strings
+        """
+        spans, _ = self.split_spans(text)
+        return [text[start:end] for start, end in spans]
+
+    def split_documents(self, documents: List[Document]) -> List[Document]:
+        """
+        Split documents into chunks, adding start_index/end_index offsets to the metadata.
+        
+        Args:
+            documents: List of documents to split
+            
+        Returns:
+            List of document chunks
+        """
+        chunks = []
+        
+        for doc in documents:
+            text = doc.page_content
+            spans, _ = self.split_spans(text)
+            for start, end in spans:
+                metadata = dict(doc.metadata)
+                metadata['start_index'] = start
+                metadata['end_index'] = end
+                chunks.append(Document(page_content=text[start:end], metadata=metadata))
+        
+        return chunks
 
 
 class DocumentProcessor:
     """Class for processing documents for a RAG system."""
 
-    def __init__(self, chunk_size: int = 250, chunk_overlap: int = 50):
+    def __init__(
+        self,
+        chunk_size: int = 250,
+        chunk_overlap: int = 50,
+        splitter: str = "recursive",
+        tokenizer_name: Optional[str] = None,
+        mmap_threshold: Optional[int] = 32 * 1024 * 1024,
+        mmap_window: int = 4 * 1024 * 1024,
+        pdf_cache_dir: Optional[str] = None,
+        pdf_workers: Optional[int] = None
+    ):
         """
         Initialize the DocumentProcessor.
         
         Args:
             chunk_size: Size of text chunks for splitting documents
             chunk_overlap: Overlap between chunks to maintain context
+            splitter: "recursive" for LangChain's splitter, or "fast" for the built-in
+                offset-tracking splitter, which is faster, can stream large text files and
+                count tokens, but cuts different chunks (changing it re-chunks an index on sync)
+            tokenizer_name: Embedding model tokenizer to measure chunk size in tokens (fast splitter only)
+            mmap_threshold: With the fast splitter, text files larger than this many bytes are split
+                through a memory-mapped window instead of being read whole (None to disable)
+            mmap_window: Number of bytes decoded per window when memory-mapping
+            pdf_cache_dir: Directory to cache extracted PDF page text in (None to disable)
+            pdf_workers: Worker processes for extracting the pages of one PDF (None for all CPUs)
         """
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.chunk_size,
-            chunk_overlap=self.chunk_overlap,
-            length_function=len,
-        )
+        self.mmap_threshold = mmap_threshold
+        self.mmap_window = mmap_window
+        self.pdf_extractor = PDFExtractor(cache_dir=pdf_cache_dir, num_workers=pdf_workers)
+        if splitter == "fast":
+            self.text_splitter = FastTextSplitter(
+                chunk_size=self.chunk_size,
+                chunk_overlap=self.chunk_overlap,
+                tokenizer_name=tokenizer_name,
+            )
+        elif splitter == "recursive":
+            self.text_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=self.chunk_size,
+                chunk_overlap=self.chunk_overlap,
+                length_function=len,
+            )
+        else:
+            raise ValueError(f"Unsupported splitter: {splitter}")
 
     def load_document(self, file_path: str) -> List[Dict[str, Any]]:
         """
@@ -38,21 +284,89 @@ class DocumentProcessor:
         
         # Select appropriate loader based on file extension
         if file_extension.lower() == '.pdf':
-            loader = PyPDFLoader(file_path)
-        elif file_extension.lower() in ['.txt', '.md', '.html']:
-            loader = TextLoader(file_path)
+            # Pages are extracted in parallel unless we already are a file-level pool worker
+            documents = self.pdf_extractor.load(file_path, parallel=not _in_worker)
+        elif file_extension.lower() in TEXT_EXTENSIONS:
+            documents = TextLoader(file_path).load()
         else:
             raise ValueError(f"Unsupported file type: {file_extension}")
         
-        # Load the document
-        documents = loader.load()
-        
-        # Add source information to metadata
+        # Add source information to metadata; "modified" (epoch seconds) supports date-range filters
+        modified = int(os.path.getmtime(file_path))
         for doc in documents:
             doc.metadata['source'] = file_path
+            doc.metadata['modified'] = modified
             
         return documents
 
+    def iter_file_chunks(self, file_path: str) -> Iterator[Dict[str, Any]]:
+        """
+        Load and split a single file, yielding its chunks.
+        
+        Text files above mmap_threshold are streamed through a memory-mapped
+        window when the fast splitter is in use; this yields exactly the same
+        chunks as loading the whole file without holding it in memory.
+        
+        Args:
+            file_path: Path to the document file
+            
+        Yields:
+            Document chunks with text and metadata
+        """
+        _, file_extension = os.path.splitext(file_path)
+        
+        if (
+            self.mmap_threshold is not None
+            and isinstance(self.text_splitter, FastTextSplitter)
+            and file_extension.lower() in TEXT_EXTENSIONS
+            and os.path.getsize(file_path) > self.mmap_threshold
+        ):
+            yield from self._iter_mmap_chunks(file_path)
+        else:
+            yield from self.split_documents(self.load_document(file_path))
+
+    def _iter_mmap_chunks(self, file_path: str) -> Iterator[Document]:
+        """
+        Split a text file by decoding it window by window from a memory map.
+        
+        Decoding matches TextLoader (locale encoding, universal newlines) and
+        chunk offsets refer to the decoded text of the whole file.
+        
+        Args:
+            file_path: Path to the text file
+            
+        Yields:
+            Document chunks with text and metadata
+        """
+        decoder = io.IncrementalNewlineDecoder(
+            codecs.getincrementaldecoder(locale.getpreferredencoding(False))(),
+            translate=True
+        )
+        buffer = ""
+        # Character offset of buffer[0] in the decoded file
+        base = 0
+        modified = int(os.path.getmtime(file_path))
+        
+        try:
+            with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                size = len(mm)
+                for position in range(0, size, self.mmap_window):
+                    final = position + self.mmap_window >= size
+                    buffer += decoder.decode(mm[position:position + self.mmap_window], final=final)
+                    spans, resume = self.text_splitter.split_spans(buffer, final=final)
+                    for start, end in spans:
+                        yield Document(
+                            page_content=buffer[start:end],
+                            metadata={
+                                'source': file_path, 'modified': modified,
+                                'start_index': base + start, 'end_index': base + end
+                            }
+                        )
+                    buffer = buffer[resume:]
+                    base += resume
+        except UnicodeDecodeError as e:
+            raise RuntimeError(f"Error loading {file_path}") from e
+
     def load_documents(self, directory: str) -> List[Dict[str, Any]]:
         """
         Load all supported documents from a directory.
@@ -88,6 +402,157 @@ class DocumentProcessor:
         """
         return self.text_splitter.split_documents(documents)
 
+    def find_files(
+        self,
+        directory: str,
+        recursive: bool = False,
+        include: Optional[List[str]] = None,
+        exclude: Optional[List[str]] = None
+    ) -> List[str]:
+        """
+        Find supported document files in a directory.
+        
+        Glob patterns are matched against the path relative to the directory,
+        e.g. "*.pdf" or "archive/*".
+        
+        Args:
+            directory: Directory to search
+            recursive: Whether to descend into subdirectories
+            include: Glob patterns a file must match (None to include all)
+            exclude: Glob patterns of files to skip
+            
+        Returns:
+            Sorted list of file paths
+        """
+        file_paths = []
+        
+        for root, dirs, filenames in os.walk(directory):
+            if not recursive:
+                dirs.clear()
+            for filename in filenames:
+                file_path = os.path.join(root, filename)
+                if os.path.splitext(filename)[1].lower() not in SUPPORTED_EXTENSIONS:
+                    continue
+                relative_path = os.path.relpath(file_path, directory).replace(os.sep, '/')
+                if include and not any(fnmatch.fnmatch(relative_path, p) for p in include):
+                    continue
+                if exclude and any(fnmatch.fnmatch(relative_path, p) for p in exclude):
+                    continue
+                file_paths.append(file_path)
+        
+        return sorted(file_paths)
+
+    def process_directory(
+        self,
+        directory: str,
+        recursive: bool = True,
+        include: Optional[List[str]] = None,
+        exclude: Optional[List[str]] = None,
+        num_workers: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Load and split all matching documents using a pool of worker processes.
+        
+        Chunks are returned in sorted file order regardless of which worker
+        finishes first, so repeated runs produce identical output.
+        
+        Args:
+            directory: Directory containing documents
+            recursive: Whether to descend into subdirectories
+            include: Glob patterns a file must match (None to include all)
+            exclude: Glob patterns of files to skip
+            num_workers: Number of worker processes (None for all CPUs, 1 to run in-process)
+            
+        Returns:
+            Dictionary with the chunks, the files processed and a mapping of failed files to errors
+        """
+        file_paths = self.find_files(directory, recursive=recursive, include=include, exclude=exclude)
+        return self.process_files(file_paths, num_workers=num_workers)
+
+    def process_files(self, file_paths: List[str], num_workers: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Load and split a list of files using a pool of worker processes.
+        
+        Args:
+            file_paths: Paths of the files to process
+            num_workers: Number of worker processes (None for all CPUs, 1 to run in-process)
+            
+        Returns:
+            Dictionary with the chunks, the files processed and a mapping of failed files to errors
+        """
+        num_workers = num_workers or os.cpu_count() or 1
+        
+        if num_workers == 1 or len(file_paths) <= 1:
+            _init_worker(self, in_pool=False)
+            results = [_load_and_split_file(path) for path in file_paths]
+        else:
+            num_workers = min(num_workers, len(file_paths))
+            chunksize = max(1, min(16, len(file_paths) // (num_workers * 4)))
+            with ProcessPoolExecutor(
+                max_workers=num_workers,
+                initializer=_init_worker,
+                initargs=(self,)
+            ) as executor:
+                results = list(executor.map(_load_and_split_file, file_paths, chunksize=chunksize))
+        
+        chunks = []
+        failures = {}
+        for file_path, file_chunks, error in results:
+            if error is not None:
+                failures[file_path] = error
+            else:
+                chunks.extend(file_chunks)
+        
+        print(f"Processed {len(file_paths) - len(failures)} files into {len(chunks)} chunks ({len(failures)} failed)")
+        return {
+            "chunks": chunks,
+            "files": file_paths,
+            "failures": failures
+        }
+
+    def iter_chunks(
+        self,
+        directory: str,
+        batch_size: int = 256,
+        recursive: bool = False,
+        include: Optional[List[str]] = None,
+        exclude: Optional[List[str]] = None
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Lazily load and split documents, yielding chunks in batches.
+        
+        Only one file's chunks and one batch are held in memory at a time,
+        so peak memory does not grow with the size of the corpus. A file's
+        chunks join the batches only once the whole file has been split, so
+        a file that fails partway is skipped entirely with a message.
+        
+        Args:
+            directory: Directory containing documents
+            batch_size: Maximum number of chunks per yielded batch
+            recursive: Whether to descend into subdirectories
+            include: Glob patterns a file must match (None to include all)
+            exclude: Glob patterns of files to skip
+            
+        Yields:
+            Lists of at most batch_size document chunks
+        """
+        batch = []
+        
+        for file_path in self.find_files(directory, recursive=recursive, include=include, exclude=exclude):
+            try:
+                file_chunks = list(self.iter_file_chunks(file_path))
+            except Exception as e:
+                print(f"Error loading {file_path}: {e}")
+                continue
+            
+            batch.extend(file_chunks)
+            while len(batch) >= batch_size:
+                yield batch[:batch_size]
+                batch = batch[batch_size:]
+        
+        if batch:
+            yield batch
+
     def process_documents(self, directory: str) -> List[Dict[str, Any]]:
         """
         Process all documents in a directory (load and split).
@@ -0,0 +1,298 @@
+# rag/embedding_cache.py
+import os
+import re
+import json
+import hashlib
+import unicodedata
+from typing import List, Dict, Any, Optional
+import numpy as np
+from langchain.embeddings.base import Embeddings
+from rag.embedding_models import embed_queries
+
+
+class EmbeddingCache:
+    """On-disk cache of embedding vectors keyed by model name and normalized text hash."""
+
+    KEY_SIZE = 16
+
+    def __init__(self, cache_dir: str, model_name: str, max_entries: int = 500_000, initial_capacity: int = 4096):
+        """
+        Initialize the EmbeddingCache.
+
+        Vectors live in a memory-mapped float32 matrix, their keys and last-use
+        clock in memory-mapped arrays next to it. When max_entries is reached
+        the least recently used tenth of the entries is evicted.
+
+        Args:
+            cache_dir: Root directory of the cache (one subdirectory per model)
+            model_name: Name of the embedding model the vectors come from
+            max_entries: Maximum number of cached vectors
+            initial_capacity: Number of slots allocated before the files are first grown
+        """
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.initial_capacity = min(initial_capacity, max_entries)
+        self.directory = os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name))
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.dim = None
+        self.capacity = 0
+        self.clock = 0
+        self._index: Dict[bytes, int] = {}
+        self._free: List[int] = []
+        self._size = 0
+        self._vectors = self._keys = self._last_used = None
+        self.load()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def load(self) -> None:
+        """Open an existing cache for this model, if any."""
+        meta_path = self._path("meta.json")
+        if not os.path.exists(meta_path):
+            return
+
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.dim = meta["dim"]
+        self.capacity = meta["capacity"]
+        self._size = meta["size"]
+        self.clock = meta["clock"]
+
+        self._vectors = np.lib.format.open_memmap(self._path("vectors.npy"), mode="r+")
+        self._keys = np.lib.format.open_memmap(self._path("keys.npy"), mode="r+")
+        self._last_used = np.lib.format.open_memmap(self._path("last_used.npy"), mode="r+")
+
+        used = self._keys[:self._size].any(axis=1)
+        for slot in np.flatnonzero(used):
+            self._index[self._keys[slot].tobytes()] = int(slot)
+        self._free = [int(slot) for slot in np.flatnonzero(~used)]
+
+    def _allocate(self, capacity: int) -> None:
+        """Create or grow the backing files to hold capacity vectors."""
+        os.makedirs(self.directory, exist_ok=True)
+        old = (self._vectors, self._keys, self._last_used)
+        arrays = []
+
+        for name, dtype, shape in [
+            ("vectors", np.float32, (capacity, self.dim)),
+            ("keys", np.uint8, (capacity, self.KEY_SIZE)),
+            ("last_used", np.int64, (capacity,)),
+        ]:
+            tmp_path = self._path(f"{name}.tmp.npy")
+            array = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=dtype, shape=shape)
+            arrays.append((name, tmp_path, array))
+
+        for (name, tmp_path, array), previous in zip(arrays, old):
+            if previous is not None:
+                array[:self.capacity] = previous[:self.capacity]
+            array.flush()
+
+        # Release the old maps before replacing their files
+        self._vectors = self._keys = self._last_used = None
+        old = previous = None
+        for name, tmp_path, array in arrays:
+            os.replace(tmp_path, self._path(f"{name}.npy"))
+
+        self._vectors, self._keys, self._last_used = (
+            np.lib.format.open_memmap(self._path(f"{name}.npy"), mode="r+") for name in ("vectors", "keys", "last_used")
+        )
+        self.capacity = capacity
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """
+        Normalize text before hashing.
+
+        Args:
+            text: Text to normalize
+
+        Returns:
+            NFC-normalized text without surrounding whitespace
+        """
+        return unicodedata.normalize("NFC", text).strip()
+
+    def key(self, text: str) -> bytes:
+        """
+        Compute the cache key of a text.
+
+        Args:
+            text: Text to embed
+
+        Returns:
+            Hash of the model name and normalized text
+        """
+        data = f"{self.model_name}\0{self.normalize(text)}".encode("utf-8")
+        return hashlib.blake2b(data, digest_size=self.KEY_SIZE).digest()
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up cached vectors.
+
+        Args:
+            texts: Texts to look up
+
+        Returns:
+            List with a vector for every hit and None for every miss
+        """
+        results = []
+        for text in texts:
+            slot = self._index.get(self.key(text))
+            if slot is None:
+                self.misses += 1
+                results.append(None)
+            else:
+                self.hits += 1
+                self.clock += 1
+                self._last_used[slot] = self.clock
+                results.append(np.array(self._vectors[slot]))
+        return results
+
+    def _evict(self) -> None:
+        """Free the least recently used tenth of the entries."""
+        used = np.array(sorted(self._index.values()))
+        count = max(1, len(used) // 10)
+        oldest = used[np.argpartition(self._last_used[used], count - 1)[:count]]
+
+        for slot in oldest:
+            del self._index[self._keys[slot].tobytes()]
+            self._keys[slot] = 0
+        self._free.extend(int(slot) for slot in oldest)
+        self.evictions += count
+
+    def put_many(self, texts: List[str], vectors: List[List[float]]) -> None:
+        """
+        Store vectors in the cache.
+
+        Args:
+            texts: Texts that were embedded
+            vectors: Their embedding vectors
+        """
+        if not texts:
+            return
+        if self.dim is None:
+            self.dim = len(vectors[0])
+            self._allocate(self.initial_capacity)
+
+        for text, vector in zip(texts, vectors):
+            key = self.key(text)
+            if key in self._index:
+                continue
+
+            if not self._free:
+                if self._size == self.capacity and self.capacity < self.max_entries:
+                    self._allocate(min(self.capacity * 2, self.max_entries))
+                if self._size < self.capacity:
+                    self._free.append(self._size)
+                    self._size += 1
+                else:
+                    self._evict()
+
+            slot = self._free.pop()
+            self.clock += 1
+            self._vectors[slot] = vector
+            self._keys[slot] = np.frombuffer(key, dtype=np.uint8)
+            self._last_used[slot] = self.clock
+            self._index[key] = slot
+
+    def flush(self) -> None:
+        """Write pending changes to disk."""
+        if self._vectors is None:
+            return
+
+        for array in (self._vectors, self._keys, self._last_used):
+            array.flush()
+
+        meta_path = self._path("meta.json")
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({
+                "model_name": self.model_name,
+                "dim": self.dim,
+                "capacity": self.capacity,
+                "size": self._size,
+                "clock": self.clock
+            }, f)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with hit/miss counters, hit rate, evictions and entry count
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self._index)
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that serves document embeddings from an EmbeddingCache."""
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache):
+        """
+        Initialize the CachedEmbeddings.
+
+        Args:
+            embeddings: Underlying embedding model
+            cache: Cache of previously computed vectors
+        """
+        self.embeddings = embeddings
+        self.cache = cache
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed documents, computing only the vectors missing from the cache.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            List of embedding vectors
+        """
+        cached = self.cache.get_many(texts)
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+
+        if missing:
+            # Embed each distinct missing text once
+            unique_texts = list(dict.fromkeys(texts[i] for i in missing))
+            computed = dict(zip(unique_texts, self.embeddings.embed_documents(unique_texts)))
+            self.cache.put_many(unique_texts, [computed[text] for text in unique_texts])
+            self.cache.flush()
+            for i in missing:
+                cached[i] = computed[texts[i]]
+
+        return [vector.tolist() if isinstance(vector, np.ndarray) else vector for vector in cached]
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embed a query (not cached).
+
+        Args:
+            text: Query text
+
+        Returns:
+            Embedding vector
+        """
+        return self.embeddings.embed_query(text)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed many queries in one batch (not cached).
+
+        Args:
+            texts: Query texts
+
+        Returns:
+            List of embedding vectors
+        """
+        return embed_queries(self.embeddings, texts)
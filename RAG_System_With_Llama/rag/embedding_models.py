@@ -0,0 +1,348 @@
+# rag/embedding_models.py
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Callable
+import numpy as np
+from langchain.embeddings.base import Embeddings
+
+# Model loaded by each MultiProcessEmbeddings worker
+_worker_model = None
+
+
+def _init_embedding_worker(model_name: str, batch_size: int, num_threads: int, core_sets) -> None:
+    """
+    Load the model in a worker process and pin its threads.
+
+    Args:
+        model_name: Name of the sentence-transformers model
+        batch_size: Number of texts encoded per forward pass
+        num_threads: Torch intra-op threads for this worker
+        core_sets: Queue of CPU sets to pin workers to (None to leave affinity alone)
+    """
+    global _worker_model
+    import torch
+
+    if core_sets is not None and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, core_sets.get())
+    torch.set_num_threads(num_threads)
+    _worker_model = BucketedEmbeddings(model_name, batch_size=batch_size, device="cpu")
+
+
+def embed_queries(embeddings: Embeddings, texts: List[str]) -> List[List[float]]:
+    """
+    Embed many queries in one batch.
+
+    Embeddings classes here encode queries and documents the same way, so
+    models without an embed_queries method fall back to embed_documents.
+
+    Args:
+        embeddings: Embedding model
+        texts: Query texts
+
+    Returns:
+        List of embedding vectors
+    """
+    if hasattr(embeddings, "embed_queries"):
+        return embeddings.embed_queries(texts)
+    return embeddings.embed_documents(texts)
+
+
+def _encode_shard(texts: List[str]) -> np.ndarray:
+    """Encode a shard of texts with the worker's model."""
+    return _worker_model.encode(texts)
+
+
+class BucketedEmbeddings(Embeddings):
+    """
+    Sentence-transformers embeddings that batch texts of similar token length together.
+
+    Texts are sorted by token count and encoded in batches of batch_size, so
+    each batch is padded only to the length of its own longest text; the
+    vectors are then put back in input order. Newlines are replaced with
+    spaces first, as HuggingFaceEmbeddings does, so vectors match those of
+    stores and caches built with it.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        batch_size: int = 64,
+        sort_by_length: bool = True,
+        normalize_embeddings: bool = False,
+        device: Optional[str] = None
+    ):
+        """
+        Initialize the BucketedEmbeddings.
+
+        Args:
+            model_name: Name of the sentence-transformers model
+            batch_size: Number of texts encoded per forward pass
+            sort_by_length: Whether to group texts of similar length into the same batch
+            normalize_embeddings: Whether to L2-normalize the vectors
+            device: Torch device to run on (None for the library default)
+        """
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.sort_by_length = sort_by_length
+        self.normalize_embeddings = normalize_embeddings
+        self.model = SentenceTransformer(model_name, device=device)
+
+    def token_lengths(self, texts: List[str]) -> np.ndarray:
+        """
+        Count the tokens the model will see for each text.
+
+        Args:
+            texts: Texts to measure
+
+        Returns:
+            Array of token counts (capped at the model's maximum sequence length)
+        """
+        encoded = self.model.tokenizer(
+            texts,
+            truncation=True,
+            max_length=self.model.max_seq_length,
+            return_attention_mask=False,
+            return_token_type_ids=False
+        )
+        return np.fromiter((len(ids) for ids in encoded["input_ids"]), dtype=np.int64, count=len(texts))
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode texts in length-bucketed batches.
+
+        Args:
+            texts: Texts to encode
+
+        Returns:
+            Matrix of embeddings in input order
+        """
+        if not texts:
+            return np.zeros((0, self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+
+        texts = [text.replace("\n", " ") for text in texts]
+        if self.sort_by_length:
+            order = np.argsort(self.token_lengths(texts), kind="stable")
+        else:
+            order = np.arange(len(texts))
+
+        embeddings = None
+        for start in range(0, len(texts), self.batch_size):
+            indices = order[start:start + self.batch_size]
+            batch = self.model.encode(
+                [texts[i] for i in indices],
+                batch_size=len(indices),
+                convert_to_numpy=True,
+                normalize_embeddings=self.normalize_embeddings,
+                show_progress_bar=False
+            )
+            if embeddings is None:
+                embeddings = np.empty((len(texts), batch.shape[1]), dtype=batch.dtype)
+            embeddings[indices] = batch
+
+        return embeddings
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed documents.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            List of embedding vectors
+        """
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embed a query.
+
+        Args:
+            text: Query text
+
+        Returns:
+            Embedding vector
+        """
+        return self.encode([text])[0].tolist()
+
+
+class MultiProcessEmbeddings(Embeddings):
+    """
+    CPU embeddings spread over worker processes, each with its own model copy.
+
+    Texts are cut into shards that are encoded by whichever worker is free and
+    gathered back in input order. Each worker runs a fixed number of torch
+    threads, pinned to its own cores where the platform allows. Workers are
+    started with the "spawn" method, so scripts using this class need an
+    `if __name__ == "__main__":` guard.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        num_workers: Optional[int] = None,
+        batch_size: int = 64,
+        shard_size: Optional[int] = None,
+        pin_cores: bool = True
+    ):
+        """
+        Initialize the MultiProcessEmbeddings.
+
+        Args:
+            model_name: Name of the sentence-transformers model
+            num_workers: Number of worker processes (None for one per available core)
+            batch_size: Number of texts encoded per forward pass in a worker
+            shard_size: Number of texts sent to a worker at a time (defaults to 4 batches)
+            pin_cores: Whether to pin each worker to its own set of cores (Linux only)
+        """
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.shard_size = shard_size or batch_size * 4
+
+        cores = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+        self.num_workers = min(num_workers or len(cores), len(cores))
+        threads_per_worker = max(1, len(cores) // self.num_workers)
+
+        context = multiprocessing.get_context("spawn")
+        core_sets = None
+        if pin_cores and hasattr(os, "sched_setaffinity"):
+            core_sets = context.Queue()
+            for i in range(self.num_workers):
+                core_sets.put(set(cores[i * threads_per_worker:(i + 1) * threads_per_worker]))
+
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.num_workers,
+            mp_context=context,
+            initializer=_init_embedding_worker,
+            initargs=(model_name, batch_size, threads_per_worker, core_sets)
+        )
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode texts across the worker processes.
+
+        Args:
+            texts: Texts to encode
+
+        Returns:
+            Matrix of embeddings in input order
+        """
+        shards = [texts[i:i + self.shard_size] for i in range(0, len(texts), self.shard_size)]
+        results = list(self.executor.map(_encode_shard, shards))
+        if not results:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.concatenate(results)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed documents.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            List of embedding vectors
+        """
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embed a query.
+
+        Args:
+            text: Query text
+
+        Returns:
+            Embedding vector
+        """
+        return self.encode([text])[0].tolist()
+
+    def close(self) -> None:
+        """Shut down the worker processes; safe to call more than once."""
+        self.executor.shutdown()
+
+    def __enter__(self) -> "MultiProcessEmbeddings":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class LazyEmbeddings(Embeddings):
+    """
+    Embeddings that build the underlying model on the first embed call.
+
+    Constructing a sentence-transformers model imports torch and loads the
+    weights, which dominates startup; wrapping the constructor defers that
+    cost until a text actually has to be embedded.
+    """
+
+    def __init__(self, factory: Callable[[], Embeddings]):
+        """
+        Initialize the LazyEmbeddings.
+
+        Args:
+            factory: Callable returning the embedding model
+        """
+        self.factory = factory
+        self._model: Optional[Embeddings] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    @property
+    def model(self) -> Embeddings:
+        """The underlying embedding model, built on first access."""
+        if self._model is None:
+            # Concurrent first queries (e.g. from async serving threads) build the model once
+            with self._lock:
+                if self._model is None:
+                    self._model = self.factory()
+        return self._model
+
+    def close(self) -> None:
+        """Release the underlying model's resources (e.g. worker processes) if it was built."""
+        if self._model is not None and hasattr(self._model, "close"):
+            self._model.close()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed documents.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            List of embedding vectors
+        """
+        return self.model.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embed a query.
+
+        Args:
+            text: Query text
+
+        Returns:
+            Embedding vector
+        """
+        return self.model.embed_query(text)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed many queries in one batch.
+
+        Args:
+            texts: Query texts
+
+        Returns:
+            List of embedding vectors
+        """
+        return embed_queries(self.model, texts)
@@ -1,90 +1,764 @@
 # rag/embeddings.py
-from typing import List, Dict, Any, Optional
-from langchain.embeddings import HuggingFaceEmbeddings
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
+from contextlib import contextmanager
 from langchain.vectorstores import Chroma
+from langchain.schema import Document
+from rag.embedding_cache import EmbeddingCache, CachedEmbeddings
+from rag.embedding_models import BucketedEmbeddings, MultiProcessEmbeddings, LazyEmbeddings
+from rag.quantization import QuantizedIndex
+from rag.numpy_store import NumpyVectorStore
+from rag.sharded_store import ShardedVectorStore
+from rag.ann_index import hnsw_collection_metadata
+from rag.reduction import EmbeddingProjection, ProjectedEmbeddings, evaluate_projections
+from rag.bm25 import BM25Index
+import numpy as np
+import itertools
+import random
+import uuid
 import os
 
+# Vector store backends selectable by name
+VECTORSTORE_BACKENDS = {
+    "chroma": Chroma,
+    "numpy": NumpyVectorStore,
+}
+
+
 class EmbeddingManager:
     """Class for managing embeddings and vector database operations."""
 
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2", persist_directory: Optional[str] = None):
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        persist_directory: Optional[str] = None,
+        cache_dir: Optional[str] = None,
+        cache_max_entries: int = 500_000,
+        batch_size: Optional[int] = 64,
+        num_workers: Optional[int] = None,
+        quantization: Optional[str] = None,
+        backend: str = "chroma",
+        index_params: Optional[Dict[str, Any]] = None,
+        read_only: bool = False,
+        reduce_dim: Optional[int] = None,
+        reduction: str = "pca",
+        keyword_index: bool = True,
+        num_shards: int = 1,
+        shard_workers: Optional[int] = None
+    ):
         """
         Initialize the EmbeddingManager.
         
         Args:
             model_name: Name of the HuggingFace embedding model to use
             persist_directory: Directory to persist the vector store (None for in-memory)
+            cache_dir: Directory for the persistent embedding cache (None to disable)
+            cache_max_entries: Maximum number of vectors kept in the embedding cache
+            batch_size: Texts per forward pass, encoded in length-sorted buckets
+                (None to use LangChain's HuggingFaceEmbeddings defaults)
+            num_workers: Number of embedding worker processes, each with its own
+                model copy and pinned threads (None or 1 to embed in this process)
+            quantization: "int8" or "binary" to serve quantized_search from compact
+                codes, rescoring candidates with memory-mapped full-precision
+                vectors (None to disable)
+            backend: Vector store backend, "chroma" or "numpy" (flat exact search)
+            index_params: ANN index parameters; for Chroma any of space, M,
+                ef_construction, ef_search (applied when the collection is created),
+                for NumPy {"type": "ivf", "nlist": ..., "nprobe": ...}
+            read_only: Open the store for searching and stats only, rejecting writes
+            reduce_dim: Store vectors with this many dimensions, fitting the
+                projection when the store is created (None to keep full vectors)
+            reduction: "pca" or "truncate" (Matryoshka-style prefix)
+            keyword_index: Whether to keep a BM25 index of the chunk texts in sync
+                with the vector store, for hybrid search
+            num_shards: Split the store into this many shards by chunk ID hash,
+                each persisted in its own directory and searched in parallel
+                (1 for one store; an existing sharded store keeps its own count)
+            shard_workers: Processes searching the shards of a persisted store
+                (None for one per core up to num_shards, 0 or 1 to search in this process)
+        
+        The embedding model is not loaded until the first text is embedded, so
+        opening a store to inspect it never pays for importing torch.
         """
+        if backend not in VECTORSTORE_BACKENDS:
+            raise ValueError(f"Unsupported vector store backend: {backend}")
+        
         self.model_name = model_name
         self.persist_directory = persist_directory
+        self.backend = backend
+        self.num_shards = num_shards
+        self.shard_workers = shard_workers
+        self.store_class = ShardedVectorStore if num_shards > 1 else VECTORSTORE_BACKENDS[backend]
+        self.index_params = index_params
+        self.read_only = read_only
+        
+        self.batch_size = batch_size
+        self.num_workers = num_workers
+        
+        # Build the embedding model (using lightweight model suitable for local use) on first use
+        self.model = LazyEmbeddings(self._build_embeddings)
+        self.embeddings = self.model
         
-        # Initialize the embedding model (using lightweight model suitable for local use)
-        self.embeddings = HuggingFaceEmbeddings(model_name=model_name)
+        # Serve previously computed chunk embeddings from disk
+        self.cache = None
+        if cache_dir:
+            self.cache = EmbeddingCache(cache_dir, model_name, max_entries=cache_max_entries)
+            self.embeddings = CachedEmbeddings(self.embeddings, self.cache)
+        
+        # Full-dimension embeddings; self.embeddings projects them once a projection is set
+        self.base_embeddings = self.embeddings
+        self.reduce_dim = reduce_dim
+        self.reduction = reduction
+        self.projection = None
         
         self.vectorstore = None
+        
+        # Compact search codes over the vectors in the store, updated as chunks are added and deleted
+        self.quantization = quantization
+        self.quantized_index = None
+        self._quantized_changed = False
+        
+        # Bumped whenever the store's contents change, so dependent caches can invalidate
+        self.index_version = 0
+        
+        # Keyword index over the same chunk IDs as the vector store
+        self.keyword_index = None
+        if keyword_index:
+            self.keyword_index = BM25Index(
+                os.path.join(persist_directory, BM25Index.DIRECTORY) if persist_directory else None
+            )
+        
+        # Pending writes while inside bulk()
+        self._bulk = None
+
+    def _build_embeddings(self):
+        """Construct the configured embedding model."""
+        if self.num_workers and self.num_workers > 1:
+            return MultiProcessEmbeddings(
+                model_name=self.model_name,
+                num_workers=self.num_workers,
+                batch_size=self.batch_size or 64
+            )
+        if self.batch_size:
+            return BucketedEmbeddings(model_name=self.model_name, batch_size=self.batch_size)
+        
+        from langchain.embeddings import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(model_name=self.model_name)
+
+    def _index_changed(self) -> None:
+        """Bump the index version so caches derived from the store's contents invalidate."""
+        self.index_version += 1
+
+    def _update_quantized_index(self, added: Optional[List[str]] = None, removed: Optional[List[str]] = None) -> None:
+        """Apply chunk additions and deletions to the loaded quantized index, if any."""
+        index = self.quantized_index
+        if index is None or not (added or removed):
+            return
+        index.remove(removed or [])
+        for vectors, ids in self._iter_store_embeddings(added or []):
+            index.add(vectors, ids)
+        self._quantized_changed = True
+        # A persisted index is compacted when saved
+        if not self.persist_directory and index.needs_compaction:
+            index.compact()
+
+    def _add_to_store(self, documents: List[Any], ids: Optional[List[str]] = None) -> List[str]:
+        """Add chunks to the vector store and the keyword index."""
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in documents]
+        self.vectorstore.add_documents(documents, ids=ids)
+        if self.keyword_index is not None:
+            self.keyword_index.add(ids, [document.page_content for document in documents])
+        self._update_quantized_index(added=ids)
+        return ids
+
+    def _restore_to_store(self, data: Dict[str, Any]) -> None:
+        """Put chunks fetched with their embeddings back into the vector store and the keyword index."""
+        vectors = np.asarray(data["embeddings"], dtype=np.float32)
+        if hasattr(self.vectorstore, "add_vectors"):
+            self.vectorstore.add_vectors(vectors, data["documents"], data["metadatas"], data["ids"])
+        else:
+            self.vectorstore._collection.upsert(
+                ids=data["ids"], embeddings=vectors.tolist(), documents=data["documents"], metadatas=data["metadatas"]
+            )
+        if self.keyword_index is not None:
+            self.keyword_index.add(data["ids"], data["documents"])
+        self._update_quantized_index(added=data["ids"])
+
+    def _snapshot(self, ids: List[str]) -> None:
+        """Keep what IDs hold before the current bulk write first changes them, for a rollback."""
+        state = self._bulk
+        ids = [doc_id for doc_id in dict.fromkeys(ids) if doc_id not in state["snapshotted"]]
+        if not ids:
+            return
+        state["snapshotted"].update(ids)
+        data = self.vectorstore.get(ids=ids, include=["embeddings", "documents", "metadatas"])
+        if data["ids"]:
+            state["previous"].append(data)
+
+    def _delete_from_store(self, ids: List[str]) -> None:
+        """Delete chunks from the vector store and the keyword index."""
+        self.vectorstore.delete(ids=ids)
+        if self.keyword_index is not None:
+            self.keyword_index.delete(ids)
+        self._update_quantized_index(removed=ids)
 
-    def create_vectorstore(self, documents: List[Dict[str, Any]]) -> None:
+    def _persist(self) -> None:
+        """Persist the vector store, keyword index and quantized index if a directory is specified."""
+        if self.persist_directory:
+            self.vectorstore.persist()
+        if self.keyword_index is not None:
+            self.keyword_index.persist()
+        self._persist_quantized_index()
+
+    def _persist_quantized_index(self) -> None:
+        """Save the quantized index if it has changed since it was built or last saved."""
+        if self._quantized_changed and self.quantized_index is not None and self.persist_directory:
+            self.quantized_index.save(self._quantized_directory(self.quantized_index.mode))
+        self._quantized_changed = False
+
+    def _sync_keyword_index(self) -> None:
+        """Rebuild the keyword index from the stored chunks if it does not match the vector store."""
+        if self.keyword_index is None:
+            return
+        if len(self.vectorstore.get(include=[])["ids"]) == len(self.keyword_index):
+            return
+        
+        data = self.vectorstore.get(include=["documents"])
+        print(f"Rebuilding keyword index over {len(data['ids'])} chunks")
+        self.keyword_index.reset()
+        self.keyword_index.add(data["ids"], data["documents"])
+        if not self.read_only:
+            self.keyword_index.save()
+
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise ValueError("Vector store was opened read-only")
+
+    def _projection_path(self) -> Optional[str]:
+        return os.path.join(self.persist_directory, "projection.npz") if self.persist_directory else None
+
+    def _set_projection(self, projection: Optional[EmbeddingProjection]) -> None:
+        """Project documents and queries with a projection (None for full vectors)."""
+        self.projection = projection
+        self.embeddings = ProjectedEmbeddings(self.base_embeddings, projection) if projection else self.base_embeddings
+
+    def _fit_projection(self, texts: List[str]) -> None:
+        """Fit the configured projection on a sample of document texts and persist it."""
+        path = self._projection_path()
+        if path and os.path.exists(path):
+            os.remove(path)
+        if not self.reduce_dim or not texts:
+            self._set_projection(None)
+            return
+        
+        projection = EmbeddingProjection(method=self.reduction, dim=self.reduce_dim)
+        if len(texts) > projection.fit_size:
+            texts = random.Random(projection.seed).sample(texts, projection.fit_size)
+        projection.fit(np.asarray(self.base_embeddings.embed_documents(texts), dtype=np.float32))
+        if path:
+            projection.save(path)
+        self._set_projection(projection)
+        
+        detail = f", {projection.explained_variance:.1%} variance kept" if projection.method == "pca" else ""
+        print(f"Fitted {projection.method} projection to {projection.dim} dimensions{detail}")
+
+    def _store_kwargs(self) -> Dict[str, Any]:
+        """Backend-specific keyword arguments carrying the ANN index parameters and sharding."""
+        kwargs = {}
+        if self.index_params and self.backend == "chroma":
+            kwargs = {"collection_metadata": hnsw_collection_metadata(self.index_params)}
+        elif self.index_params:
+            kwargs = {"index_params": self.index_params}
+        if self.store_class is ShardedVectorStore:
+            return {
+                "shard_class": VECTORSTORE_BACKENDS[self.backend],
+                "num_shards": self.num_shards,
+                "num_workers": self.shard_workers,
+                "shard_kwargs": kwargs
+            }
+        return kwargs
+
+    def create_vectorstore(self, documents: List[Dict[str, Any]], ids: Optional[List[str]] = None) -> None:
         """
         Create a vector store from documents.
         
         Args:
             documents: List of document chunks to embed and store
+            ids: Optional vector store IDs for the chunks (random IDs if None)
         """
+        self._check_writable()
         if self.persist_directory:
             os.makedirs(self.persist_directory, exist_ok=True)
+        self._fit_projection([document.page_content for document in documents])
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in documents]
             
-        self.vectorstore = Chroma.from_documents(
+        self.vectorstore = self.store_class.from_documents(
             documents=documents,
             embedding=self.embeddings,
-            persist_directory=self.persist_directory
+            ids=ids,
+            persist_directory=self.persist_directory,
+            **self._store_kwargs()
         )
+        self.quantized_index = None
+        if self.keyword_index is not None:
+            self.keyword_index.reset()
+            self.keyword_index.add(ids, [document.page_content for document in documents])
+        self._index_changed()
         
         # Persist if a directory is specified
-        if self.persist_directory:
-            self.vectorstore.persist()
+        self._persist()
             
         print(f"Created vector store with {len(documents)} documents")
 
+    def create_vectorstore_from_batches(self, batches: Iterable[List[Dict[str, Any]]]) -> int:
+        """
+        Create a vector store by embedding and writing chunks batch by batch.
+        
+        Use with DocumentProcessor.iter_chunks to index a corpus without holding
+        all of its chunks in memory. With reduce_dim set, the projection is
+        fitted on the first batch, or for PCA on as many leading batches as
+        it takes to reach reduce_dim chunks.
+        
+        Args:
+            batches: Iterable of document chunk lists
+            
+        Returns:
+            Number of chunks stored
+        """
+        self._check_writable()
+        if self.persist_directory:
+            os.makedirs(self.persist_directory, exist_ok=True)
+        
+        batches = iter(batches)
+        leading = []
+        needed = self.reduce_dim if self.reduce_dim and self.reduction == "pca" else 1
+        for batch in batches:
+            leading.append(batch)
+            if sum(map(len, leading)) >= needed:
+                break
+        self._fit_projection([document.page_content for batch in leading for document in batch])
+        
+        self.vectorstore = self.store_class(
+            persist_directory=self.persist_directory,
+            embedding_function=self.embeddings,
+            **self._store_kwargs()
+        )
+        self.quantized_index = None
+        if self.keyword_index is not None:
+            self.keyword_index.reset()
+        
+        count = self.add_document_batches(itertools.chain(leading, batches))
+        print(f"Created vector store with {count} documents")
+        return count
+
+    def add_document_batches(self, batches: Iterable[List[Dict[str, Any]]]) -> int:
+        """
+        Add chunks to an existing vector store batch by batch, persisting once at the end.
+        
+        Args:
+            batches: Iterable of document chunk lists
+            
+        Returns:
+            Number of chunks added
+        """
+        if not self.vectorstore:
+            raise ValueError("Vector store not initialized")
+        self._check_writable()
+        
+        count = 0
+        for batch in batches:
+            if batch and self._bulk is not None:
+                self._buffer_documents(batch, None)
+                count += len(batch)
+            elif batch:
+                self._add_to_store(batch)
+                count += len(batch)
+        self._index_changed()
+        if self._bulk is not None:
+            return count
+        
+        # Persist if a directory is specified
+        self._persist()
+        
+        return count
+
     def load_vectorstore(self) -> bool:
         """
         Load a persisted vector store.
-        
+
         Returns:
             True if successfully loaded, False otherwise
+
+        Raises:
+            ValueError: If a sharded store was built with other index_params than the given ones
         """
         if not self.persist_directory or not os.path.exists(self.persist_directory):
             print("No persist directory specified or directory doesn't exist")
             return False
         
+        # A sharded store is opened as such whatever num_shards is, with the backend its shards were written by
+        manifest = ShardedVectorStore.read_manifest(self.persist_directory)
+        if manifest is not None:
+            self.store_class = ShardedVectorStore
+            backend = next(
+                (name for name, cls in VECTORSTORE_BACKENDS.items() if cls.__name__ == manifest.get("shard_class")),
+                self.backend
+            )
+            if backend != self.backend:
+                print(f"Opening {backend} shards in {self.persist_directory} instead of {self.backend}")
+                self.backend = backend
+            shard_kwargs = self._store_kwargs()["shard_kwargs"]
+            if shard_kwargs and "shard_kwargs" in manifest and shard_kwargs != manifest["shard_kwargs"]:
+                raise ValueError(
+                    f"{self.persist_directory} was built with {manifest['shard_kwargs']}, not the given index_params"
+                )
+        elif self.num_shards > 1:
+            print(f"No sharded vector store found in {self.persist_directory}")
+            return False
+        elif self.backend == "numpy" and not os.path.exists(os.path.join(self.persist_directory, NumpyVectorStore.DOCUMENTS_FILE)):
+            print(f"No NumPy vector store found in {self.persist_directory}")
+            return False
+        
+        # Queries must be projected exactly like the stored vectors were
+        path = self._projection_path()
+        self._set_projection(EmbeddingProjection.load(path) if os.path.exists(path) else None)
+        if self.reduce_dim and self.projection is None:
+            print("Warning: vector store was built without reduce_dim, keeping full-dimension vectors")
+        
         try:
-            self.vectorstore = Chroma(
+            self.vectorstore = self.store_class(
                 persist_directory=self.persist_directory,
-                embedding_function=self.embeddings
+                embedding_function=self.embeddings,
+                **self._store_kwargs()
             )
+            self.quantized_index = None
+            self._sync_keyword_index()
+            self._index_changed()
             print(f"Loaded vector store from {self.persist_directory}")
             return True
         except Exception as e:
             print(f"Error loading vector store: {e}")
             return False
 
-    def add_documents(self, documents: List[Dict[str, Any]]) -> None:
+    def add_documents(self, documents: List[Dict[str, Any]], ids: Optional[List[str]] = None) -> None:
         """
         Add documents to an existing vector store.
         
         Args:
             documents: List of document chunks to add
+            ids: Optional vector store IDs for the chunks (random IDs if None)
         """
         if not self.vectorstore:
             raise ValueError("Vector store not initialized")
+        self._check_writable()
+        
+        if not documents:
+            return
+        
+        if self._bulk is not None:
+            self._buffer_documents(documents, ids)
+            return
         
-        self.vectorstore.add_documents(documents)
+        self._add_to_store(documents, ids)
+        self._index_changed()
         
         # Persist if a directory is specified
-        if self.persist_directory:
-            self.vectorstore.persist()
+        self._persist()
             
         print(f"Added {len(documents)} documents to vector store")
 
+    def delete_documents(self, ids: List[str]) -> None:
+        """
+        Delete documents from the vector store by ID.
+        
+        Args:
+            ids: IDs of the chunks to delete
+        """
+        if not self.vectorstore:
+            raise ValueError("Vector store not initialized")
+        self._check_writable()
+        
+        if not ids:
+            return
+        
+        if self._bulk is not None:
+            self._bulk["deleted"].update(ids)
+            return
+        
+        self._delete_from_store(ids)
+        self._index_changed()
+        
+        # Persist if a directory is specified
+        self._persist()
+            
+        print(f"Deleted {len(ids)} documents from vector store")
+
+    @contextmanager
+    def bulk(self, batch_size: int = 4096) -> Iterator["EmbeddingManager"]:
+        """
+        Group writes into large batches with a single persist, rolling back on failure.
+        
+        Inside the block add_documents and add_document_batches buffer chunks
+        and write them batch_size at a time, and delete_documents is deferred
+        until the block exits. Before a chunk ID is first overwritten or
+        deleted, its stored vector, text and metadata are kept. If anything
+        raises, the chunks written so far are deleted and the kept chunks are
+        put back, so the store keeps its previous contents.
+        
+        Args:
+            batch_size: Number of chunks embedded and written per vector store call
+            
+        Yields:
+            This EmbeddingManager
+        """
+        if not self.vectorstore:
+            raise ValueError("Vector store not initialized")
+        self._check_writable()
+        if self._bulk is not None:
+            raise ValueError("bulk() blocks cannot be nested")
+        
+        state = self._bulk = {
+            "batch_size": batch_size,
+            "documents": [],
+            "ids": [],
+            "written": [],
+            "deleted": set(),
+            # IDs whose contents before the block are kept in previous
+            "snapshotted": set(),
+            "previous": []
+        }
+        try:
+            yield self
+            self._flush_bulk()
+            deleted = sorted(state["deleted"])
+            if deleted:
+                self._snapshot(deleted)
+                self._delete_from_store(deleted)
+        except BaseException:
+            if state["written"]:
+                self._delete_from_store(state["written"])
+            for data in state["previous"]:
+                self._restore_to_store(data)
+            restored = sum(len(data["ids"]) for data in state["previous"])
+            print(f"Bulk write failed, rolled back {len(state['written'])} written documents and restored {restored}")
+            raise
+        finally:
+            self._bulk = None
+            self._index_changed()
+        
+        # Persist if a directory is specified
+        self._persist()
+        
+        print(f"Bulk write: added {len(state['written'])} and deleted {len(deleted)} documents")
+
+    def _buffer_documents(self, documents: List[Any], ids: Optional[List[str]]) -> None:
+        """Queue chunks for the current bulk write, writing full batches."""
+        state = self._bulk
+        # Assign IDs up front so a rollback knows what to delete
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in documents]
+        state["documents"].extend(documents)
+        state["ids"].extend(ids)
+        state["deleted"].difference_update(ids)
+        if len(state["documents"]) >= state["batch_size"]:
+            self._flush_bulk(full_batches_only=True)
+
+    def _flush_bulk(self, full_batches_only: bool = False) -> None:
+        """Write buffered chunks to the vector store in batch_size slices."""
+        state = self._bulk
+        batch_size = state["batch_size"]
+        while state["documents"] and (len(state["documents"]) >= batch_size or not full_batches_only):
+            documents, ids = state["documents"][:batch_size], state["ids"][:batch_size]
+            del state["documents"][:batch_size], state["ids"][:batch_size]
+            # An ID added twice keeps its latest chunk
+            last = {doc_id: i for i, doc_id in enumerate(ids)}
+            if len(last) < len(ids):
+                rows = sorted(last.values())
+                documents, ids = [documents[i] for i in rows], [ids[i] for i in rows]
+            self._snapshot(ids)
+            state["written"].extend(ids)
+            self._add_to_store(documents, ids)
+
+    def _quantized_directory(self, mode: str) -> Optional[str]:
+        """Directory the quantized index for a mode is persisted in."""
+        return os.path.join(self.persist_directory, f"quantized_{mode}") if self.persist_directory else None
+
+    def _iter_store_embeddings(self, ids: List[str], batch_size: int = 4096) -> Iterator[Tuple[np.ndarray, List[str]]]:
+        """Stored vectors of the given IDs, fetched batch_size at a time."""
+        for start in range(0, len(ids), batch_size):
+            data = self.vectorstore.get(ids=ids[start:start + batch_size], include=["embeddings"])
+            yield np.asarray(data["embeddings"], dtype=np.float32), data["ids"]
+
+    def build_quantized_index(self, mode: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Quantize every vector in the store for quantized_search.
+        
+        Vectors are read from the store in batches, so building never holds
+        a second full-precision copy of the store in RAM.
+        
+        Args:
+            mode: "int8" or "binary" (defaults to the manager's quantization setting)
+            
+        Returns:
+            Dictionary with the memory used by the codes and the memory saved
+        """
+        if not self.vectorstore:
+            raise ValueError("Vector store not initialized")
+        
+        mode = mode or self.quantization or "int8"
+        ids = self.vectorstore.get(include=[])["ids"]
+        
+        index = QuantizedIndex(mode=mode)
+        directory = None if self.read_only else self._quantized_directory(mode)
+        index.build_from_batches(self._iter_store_embeddings(ids), len(ids), directory)
+        self.quantization = mode
+        self.quantized_index = index
+        self._quantized_changed = False
+        
+        usage = index.memory_usage()
+        print(f"Built {mode} index over {len(ids)} vectors ({usage['memory_saved']:.0%} memory saved)")
+        return usage
+
+    def _get_quantized_index(self) -> QuantizedIndex:
+        """Load the persisted quantized index, bringing it up to date with the store, or build one."""
+        if self.quantized_index is None:
+            directory = self._quantized_directory(self.quantization or "int8")
+            if directory and os.path.exists(os.path.join(directory, "index.json")):
+                index = QuantizedIndex.load(directory)
+                stored = self.vectorstore.get(include=[])["ids"]
+                indexed = set(index.ids) - {None}
+                missing = [doc_id for doc_id in stored if doc_id not in indexed]
+                extra = indexed.difference(stored)
+                # Catch up on chunks written while the index was not loaded, unless the store has mostly changed
+                if 2 * (len(missing) + len(extra)) <= len(stored):
+                    self.quantized_index = index
+                    self._update_quantized_index(added=missing, removed=sorted(extra))
+                    if not self.read_only:
+                        self._persist_quantized_index()
+            if self.quantized_index is None:
+                self.build_quantized_index()
+        return self.quantized_index
+
+    def quantized_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        Search the compact codes for an embedding and rescore the candidates with full-precision vectors.
+        
+        Args:
+            embedding: Query embedding
+            k: Number of documents to return
+            filter: Optional metadata filter expression, resolved to the allowed IDs before the scan
+            
+        Returns:
+            List of (document, cosine similarity) tuples, best first
+        """
+        if not self.vectorstore:
+            raise ValueError("Vector store not initialized")
+        
+        allowed = set(self.vectorstore.get(where=filter, include=[])["ids"]) if filter else None
+        hits = self._get_quantized_index().search(embedding, k=k, allowed=allowed)
+        if not hits:
+            return []
+        
+        data = self.vectorstore.get(ids=[doc_id for doc_id, _ in hits], include=["documents", "metadatas"])
+        documents = {
+            doc_id: Document(page_content=text, metadata=metadata or {})
+            for doc_id, text, metadata in zip(data["ids"], data["documents"], data["metadatas"])
+        }
+        return [(documents[doc_id], score) for doc_id, score in hits if doc_id in documents]
+
+    def quantized_search(self, query: str, k: int = 4) -> List[Tuple[Document, float]]:
+        """
+        Search the compact codes and rescore the candidates with full-precision vectors.
+        
+        Args:
+            query: Query text
+            k: Number of documents to return
+            
+        Returns:
+            List of (document, cosine similarity) tuples, best first
+        """
+        return self.quantized_search_by_vector(self.embeddings.embed_query(query), k=k)
+
+    def evaluate_quantization(self, queries: List[str], k: int = 10) -> Dict[str, Any]:
+        """
+        Report recall@k of quantized search against exact float search, and memory saved.
+        
+        Args:
+            queries: Sample query texts
+            k: Number of results per query
+            
+        Returns:
+            Dictionary of recall, latency and memory figures
+        """
+        index = self._get_quantized_index()
+        query_vectors = np.asarray([self.embeddings.embed_query(query) for query in queries], dtype=np.float32)
+        return index.evaluate(query_vectors, k=k)
+
+    def evaluate_reduction(
+        self,
+        queries: List[str],
+        dims: Iterable[int] = (64, 128, 192, 256),
+        k: int = 10
+    ) -> List[Dict[str, Any]]:
+        """
+        Report recall@k loss, search speedup and memory saved at several reduced dimensions.
+        
+        The stored documents are re-embedded at full dimension (served from the
+        embedding cache when enabled) and compared against PCA and truncation.
+        
+        Args:
+            queries: Sample query texts
+            dims: Target dimensions to evaluate
+            k: Number of results per query
+            
+        Returns:
+            One result dictionary per method and dimension
+        """
+        if not self.vectorstore:
+            raise ValueError("Vector store not initialized")
+        
+        texts = self.vectorstore.get(include=["documents"])["documents"]
+        vectors = np.asarray(self.base_embeddings.embed_documents(texts), dtype=np.float32)
+        query_vectors = np.asarray([self.base_embeddings.embed_query(query) for query in queries], dtype=np.float32)
+        return evaluate_projections(vectors, query_vectors, dims=dims, k=k)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Get embedding cache statistics.
+        
+        Returns:
+            Dictionary with hit/miss counters, hit rate, evictions and entry count (empty if caching is off)
+        """
+        return self.cache.stats() if self.cache else {}
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Describe the vector store without loading the embedding model.
+        
+        Returns:
+            Dictionary with the backend, document count, index parameters and whether the model is loaded
+        """
+        if not self.vectorstore:
+            raise ValueError("Vector store not initialized")
+        
+        return {
+            "backend": self.backend,
+            "persist_directory": self.persist_directory,
+            "documents": len(self.vectorstore.get(include=[])["ids"]),
+            "index_params": self.index_params,
+            "shards": self.vectorstore.num_shards if isinstance(self.vectorstore, ShardedVectorStore) else 1,
+            "reduction": {"method": self.projection.method, "dim": self.projection.dim} if self.projection else None,
+            "model_name": self.model_name,
+            "model_loaded": self.model.loaded,
+            "read_only": self.read_only,
+            "index_version": self.index_version,
+            "cache": self.cache_stats(),
+            "keyword_index": self.keyword_index.stats() if self.keyword_index is not None else None
+        }
+
     def get_vectorstore(self):
         """
         Get the vector store.
@@ -95,4 +769,10 @@ class EmbeddingManager:
         if not self.vectorstore:
             raise ValueError("Vector store not initialized")
         
-        return self.vectorstore
\ No newline at end of file
+        return self.vectorstore
+
+    def close(self) -> None:
+        """Shut down the embedding and search worker processes; call when the manager is no longer used."""
+        self.model.close()
+        if self.vectorstore is not None and hasattr(self.vectorstore, "close"):
+            self.vectorstore.close()
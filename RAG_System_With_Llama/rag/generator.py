@@ -1,4 +1,5 @@
 # rag/generator.py
+import asyncio
 from typing import List, Dict, Any, Optional
 import requests
 from langchain.schema import Document
@@ -8,20 +9,35 @@ from langchain_community.llms import Ollama
 class OllamaGenerator:
     """Class for generating responses using Llama 3.2 1B via Ollama and retrieved documents."""
 
-    def __init__(self, model_name: str = "llama3.2:1b", temperature: float = 0.1):
+    def __init__(
+        self,
+        model_name: str = "llama3.2:1b",
+        temperature: float = 0.1,
+        base_url: str = "http://localhost:11434",
+        max_connections: int = 256,
+        timeout: float = 300.0
+    ):
         """
         Initialize the OllamaGenerator.
         
         Args:
             model_name: Name of the Ollama model to use
             temperature: Temperature parameter for generation (0.0 = deterministic)
+            base_url: URL of the Ollama server
+            max_connections: Connections the async client keeps open to Ollama
+            timeout: Seconds to wait for an async generation
         """
         self.model_name = model_name
         self.temperature = temperature
+        self.base_url = base_url.rstrip("/")
+        self.max_connections = max_connections
+        self.timeout = timeout
+        # aiohttp sessions for agenerate, one per event loop, created on first use in it
+        self._sessions = {}
         
         # Initialize the Ollama LLM
         try:
-            self.llm = Ollama(model=model_name, temperature=temperature)
+            self.llm = Ollama(model=model_name, temperature=temperature, base_url=self.base_url)
             print(f"Connected to Ollama with model: {model_name}")
         except Exception as e:
             print(f"Error connecting to Ollama: {e}")
@@ -33,6 +49,12 @@ class OllamaGenerator:
         Include citations from the context in your answer using [Document X] notation where X is the document number.
         Keep your responses concise and focused."""
         
+        # Source-citing system prompt used by generate_response_with_sources
+        self.source_system_template = """You are a helpful AI assistant. Answer the user's question based on the provided information.
+        If the answer cannot be determined from the context, say "I don't know based on the provided information" but still offer any pertinent insights you might have.
+        Include citations from the context in your answer using [Document X] notation where X is the document number.
+        Keep your responses concise and focused."""
+        
         self.user_template = """Context information:
     {context}
     Question: {question}
@@ -96,17 +118,11 @@ class OllamaGenerator:
         Returns:
             Dictionary containing response with sources and metadata
         """
-        # Create a source-citing system prompt
-        source_system_template = """You are a helpful AI assistant. Answer the user's question based on the provided information.
-        If the answer cannot be determined from the context, say "I don't know based on the provided information" but still offer any pertinent insights you might have.
-        Include citations from the context in your answer using [Document X] notation where X is the document number.
-        Keep your responses concise and focused."""
-        
         # Format the documents into a context string with clear document markers
         context = self.format_documents(documents)
         
         # Create the prompt
-        prompt = f"{source_system_template}\n\n{self.user_template.format(context=context, question=query)}"
+        prompt = f"{self.source_system_template}\n\n{self.user_template.format(context=context, question=query)}"
         
         # Generate response using Ollama
         response = self.llm.invoke(prompt)
@@ -134,7 +150,7 @@ class OllamaGenerator:
         
         try:
             response = requests.post(
-                "http://localhost:11434/api/generate",
+                f"{self.base_url}/api/generate",
                 json={
                     "model": self.model_name,
                     "prompt": prompt,
@@ -146,4 +162,82 @@ class OllamaGenerator:
             return result["response"]
         except Exception as e:
             print(f"Error in direct Ollama call: {e}")
-            return "Error generating response: " + str(e)
\ No newline at end of file
+            return "Error generating response: " + str(e)
+
+    def _async_session(self):
+        """
+        Shared non-blocking HTTP session for the running event loop, so
+        concurrent agenerate calls reuse pooled connections.
+        """
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            import aiohttp
+            # Sessions of loops that have since closed can no longer be used or awaited
+            self._sessions = {other: s for other, s in self._sessions.items() if not other.is_closed()}
+            session = aiohttp.ClientSession(
+                base_url=self.base_url,
+                timeout=aiohttp.ClientTimeout(total=self.timeout, connect=10.0),
+                connector=aiohttp.TCPConnector(limit=self.max_connections)
+            )
+            self._sessions[loop] = session
+        return session
+
+    async def agenerate(self, query: str, documents: List[Document], with_sources: bool = False) -> Dict[str, Any]:
+        """
+        Generate a response without blocking the event loop.
+        
+        Builds the same prompt as generate_response (or
+        generate_response_with_sources) and sends it to Ollama's /api/generate
+        endpoint with a non-blocking HTTP client, so one process can keep many
+        generations in flight.
+        
+        Args:
+            query: User query
+            documents: List of retrieved documents
+            with_sources: Whether to use the source-citing system prompt
+            
+        Returns:
+            Dictionary containing response and metadata
+        """
+        context = self.format_documents(documents)
+        system_template = self.source_system_template if with_sources else self.system_template
+        prompt = f"{system_template}\n\n{self.user_template.format(context=context, question=query)}"
+        
+        async with self._async_session().post(
+            "/api/generate",
+            json={
+                "model": self.model_name,
+                "prompt": prompt,
+                "stream": False,
+                "options": {"temperature": self.temperature}
+            }
+        ) as response:
+            response.raise_for_status()
+            result = await response.json()
+        
+        return {
+            "query": query,
+            "response": result["response"],
+            "context_documents": documents,
+            "model": self.model_name
+        }
+
+    async def aclose(self) -> None:
+        """
+        Close the async HTTP sessions of every event loop agenerate ran in.
+
+        A session is closed on its own loop: the running one directly, and a
+        loop running in another thread through run_coroutine_threadsafe.
+        Sessions of loops that are stopped or closed are dropped, so each loop
+        should call aclose before it stops.
+        """
+        current = asyncio.get_running_loop()
+        sessions, self._sessions = self._sessions, {}
+        for loop, session in sessions.items():
+            if session.closed or loop.is_closed():
+                continue
+            if loop is current:
+                await session.close()
+            elif loop.is_running():
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(session.close(), loop))
@@ -0,0 +1,187 @@
+# rag/manifest.py
+import os
+import json
+import hashlib
+from typing import List, Dict, Any, Optional
+
+
+class IndexManifest:
+    """Persisted record of which files are indexed, their content hashes and chunk IDs."""
+
+    FILENAME = "index_manifest.json"
+
+    def __init__(self, persist_directory: Optional[str] = None):
+        """
+        Initialize the IndexManifest.
+
+        Args:
+            persist_directory: Vector store directory to keep the manifest in (None for in-memory)
+        """
+        self.persist_directory = persist_directory
+        self.path = os.path.join(persist_directory, self.FILENAME) if persist_directory else None
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.load()
+
+    def exists(self) -> bool:
+        """
+        Check whether a manifest has been persisted.
+
+        Returns:
+            True if the manifest file exists on disk
+        """
+        return bool(self.path) and os.path.exists(self.path)
+
+    def load(self) -> None:
+        """Load the manifest from disk if it exists."""
+        if self.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f).get("files", {})
+
+    def save(self) -> None:
+        """Write the manifest to disk atomically."""
+        if not self.path:
+            return
+
+        os.makedirs(self.persist_directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "files": self.entries}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def reset(self) -> None:
+        """Forget all indexed files."""
+        self.entries = {}
+
+    @staticmethod
+    def file_hash(file_path: str, block_size: int = 1 << 20) -> str:
+        """
+        Compute the SHA-256 hash of a file's content.
+
+        Args:
+            file_path: Path to the file
+            block_size: Number of bytes to read at a time
+
+        Returns:
+            Hex digest of the file content
+        """
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def chunk_ids(file_path: str, content_hash: str, num_chunks: int) -> List[str]:
+        """
+        Build deterministic vector store IDs for the chunks of a file.
+
+        Args:
+            file_path: Path to the file
+            content_hash: Hash of the file content
+            num_chunks: Number of chunks the file was split into
+
+        Returns:
+            List of chunk IDs
+        """
+        prefix = hashlib.sha1(f"{file_path}:{content_hash}".encode("utf-8")).hexdigest()[:20]
+        return [f"{prefix}-{i}" for i in range(num_chunks)]
+
+    def diff(self, file_paths: List[str], scope: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Compare files on disk with the manifest.
+
+        Args:
+            file_paths: Files currently present
+            scope: Indexed files that should be considered for removal (None for all)
+
+        Returns:
+            Dictionary with added, changed, unchanged and removed paths plus the new content hashes
+        """
+        current = {os.path.normpath(path) for path in file_paths}
+        hashes = {}
+        added, changed, unchanged = [], [], []
+
+        for file_path in file_paths:
+            key = os.path.normpath(file_path)
+            hashes[file_path] = self.file_hash(file_path)
+            entry = self.entries.get(key)
+            if entry is None:
+                added.append(file_path)
+            elif entry["hash"] != hashes[file_path]:
+                changed.append(file_path)
+            else:
+                unchanged.append(file_path)
+
+        candidates = self.entries.keys() if scope is None else scope
+        removed = sorted(path for path in candidates if path not in current)
+
+        return {
+            "added": added,
+            "changed": changed,
+            "unchanged": unchanged,
+            "removed": removed,
+            "hashes": hashes
+        }
+
+    def fingerprint(self) -> str:
+        """
+        Hash of the indexed files and their content, identifying the state of the index across runs.
+
+        Returns:
+            Hex digest that changes whenever a file is added, changed or removed
+        """
+        digest = hashlib.sha256()
+        for file_path in sorted(self.entries):
+            entry = self.entries[file_path]
+            digest.update(f"{file_path}\0{entry['hash']}\0{len(entry['chunk_ids'])}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+    def get_chunk_ids(self, file_path: str) -> List[str]:
+        """
+        Get the chunk IDs stored for a file.
+
+        Args:
+            file_path: Path to the file
+
+        Returns:
+            List of chunk IDs (empty if the file is not indexed)
+        """
+        entry = self.entries.get(os.path.normpath(file_path))
+        return list(entry["chunk_ids"]) if entry else []
+
+    def set_file(self, file_path: str, content_hash: str, chunk_ids: List[str]) -> None:
+        """
+        Record a file as indexed.
+
+        Args:
+            file_path: Path to the file
+            content_hash: Hash of the file content
+            chunk_ids: IDs of the file's chunks in the vector store
+        """
+        self.entries[os.path.normpath(file_path)] = {"hash": content_hash, "chunk_ids": list(chunk_ids)}
+
+    def remove_file(self, file_path: str) -> None:
+        """
+        Forget an indexed file.
+
+        Args:
+            file_path: Path to the file
+        """
+        self.entries.pop(os.path.normpath(file_path), None)
+
+    def files_under(self, directory: str, recursive: bool = True) -> List[str]:
+        """
+        List indexed files located in a directory.
+
+        Args:
+            directory: Directory to look in
+            recursive: Whether to include files in subdirectories
+
+        Returns:
+            List of indexed file paths
+        """
+        directory = os.path.normpath(directory)
+        if recursive:
+            prefix = directory + os.sep if directory != "." else ""
+            return [path for path in self.entries if path.startswith(prefix) and not path.startswith("..")]
+        return [path for path in self.entries if os.path.dirname(path) == ("" if directory == "." else directory)]
@@ -0,0 +1,211 @@
+# rag/metadata_index.py
+import bisect
+import datetime
+from functools import reduce
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+
+RANGE_OPERATORS = ("$gt", "$gte", "$lt", "$lte")
+
+
+def _timestamp(value: Any) -> Any:
+    """Epoch seconds for dates and datetimes, other values unchanged."""
+    if isinstance(value, datetime.datetime):
+        return value.timestamp()
+    if isinstance(value, datetime.date):
+        return datetime.datetime.combine(value, datetime.time()).timestamp()
+    return value
+
+
+def normalize_filter(where: Optional[Dict[str, Any]], allow_prefix: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    Prepare a filter expression for any backend.
+
+    Filters use Chroma's where syntax: {"field": value} or
+    {"field": {"$op": value}} with the operators $eq, $ne, $in, $nin, $gt,
+    $gte, $lt, $lte, combined with {"$and": [...]} and {"$or": [...]}.
+    Several fields in one dictionary, or several operators on one field,
+    must all match; they are rewritten as an explicit $and, since Chroma
+    accepts only one of each per dictionary. The NumPy store also supports
+    {"field": {"$prefix": "..."}} for string prefixes such as a folder of
+    sources. Dates and datetimes become epoch seconds, the unit of the
+    "modified" metadata field.
+
+    Args:
+        where: Filter expression (None for no filter)
+        allow_prefix: Whether the target store supports $prefix (False rejects it)
+
+    Returns:
+        The filter with dates converted and one condition per dictionary, or None if it is empty
+
+    Raises:
+        ValueError: If the filter uses $prefix and allow_prefix is False
+    """
+    if not where:
+        return None
+
+    def convert(node: Any) -> Any:
+        if isinstance(node, dict):
+            return {key: convert(value) for key, value in node.items()}
+        if isinstance(node, (list, tuple)):
+            return [convert(value) for value in node]
+        return _timestamp(node)
+
+    def split(node: Dict[str, Any]) -> Dict[str, Any]:
+        clauses = []
+        for key, value in node.items():
+            if key in ("$and", "$or"):
+                children = [split(child) for child in value]
+                # Chroma rejects $and and $or with fewer than two expressions
+                clauses.append(children[0] if len(children) == 1 else {key: children})
+            elif isinstance(value, dict):
+                if "$prefix" in value and not allow_prefix:
+                    raise ValueError("$prefix filters are only supported by the NumPy vector store")
+                clauses.extend({key: {operator: operand}} for operator, operand in value.items())
+            else:
+                clauses.append({key: value})
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+    return split(convert(where))
+
+
+def _key(value: Any) -> Tuple[bool, Any]:
+    # Keep True and 1 apart, which are equal as dictionary keys
+    return isinstance(value, bool), value
+
+
+def _union(arrays: List[np.ndarray]) -> np.ndarray:
+    arrays = [array for array in arrays if len(array)]
+    if not arrays:
+        return np.zeros(0, dtype=np.int64)
+    if len(arrays) == 1:
+        return arrays[0]
+    return np.unique(np.concatenate(arrays))
+
+
+def _intersection(arrays: List[np.ndarray]) -> np.ndarray:
+    # Smallest first, so every step costs at most the size of the running result
+    arrays = sorted(arrays, key=len)
+    return reduce(lambda a, b: np.intersect1d(a, b, assume_unique=True), arrays[1:], arrays[0])
+
+
+class MetadataIndex:
+    """
+    Inverted index from metadata values to store rows, used to pre-filter searches.
+
+    Each (field, value) pair keeps an ascending posting list of rows, so
+    equality and $in filters cost the size of their matches rather than of
+    the store. Numeric fields are additionally kept as one array sorted by
+    value for range filters, and string values in sorted order for $prefix.
+    Both are rebuilt on first use after rows are added.
+    """
+
+    def __init__(self):
+        """Initialize an empty MetadataIndex."""
+        self.num_rows = 0
+        self._postings: Dict[str, Dict[Tuple[bool, Any], List[int]]] = {}
+        self._arrays: Dict[Tuple[str, Tuple[bool, Any]], np.ndarray] = {}
+        self._present: Dict[str, np.ndarray] = {}
+        self._ranges: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._strings: Dict[str, List[str]] = {}
+
+    def add(self, metadatas: List[Dict[str, Any]]) -> None:
+        """
+        Index the metadata of rows appended to the store.
+
+        Args:
+            metadatas: Metadata of the new rows, in row order
+        """
+        for row, metadata in enumerate(metadatas, start=self.num_rows):
+            for field, value in metadata.items():
+                if isinstance(value, (str, int, float, bool)):
+                    self._postings.setdefault(field, {}).setdefault(_key(value), []).append(row)
+        self.num_rows += len(metadatas)
+        self._arrays.clear()
+        self._present.clear()
+        self._ranges.clear()
+        self._strings.clear()
+
+    def _posting(self, field: str, value: Any) -> np.ndarray:
+        key = _key(value)
+        array = self._arrays.get((field, key))
+        if array is None:
+            array = np.asarray(self._postings.get(field, {}).get(key, []), dtype=np.int64)
+            self._arrays[(field, key)] = array
+        return array
+
+    def _rows_with(self, field: str) -> np.ndarray:
+        """Rows that have any indexed value for a field."""
+        if field not in self._present:
+            self._present[field] = _union([self._posting(field, value) for _, value in self._postings.get(field, {})])
+        return self._present[field]
+
+    def _range(self, field: str, operator: str, bound: float) -> np.ndarray:
+        if field not in self._ranges:
+            numeric = [
+                (value, self._posting(field, value))
+                for is_bool, value in self._postings.get(field, {}) if not is_bool and not isinstance(value, str)
+            ]
+            values = np.concatenate([np.full(len(rows), value, dtype=np.float64) for value, rows in numeric] or [np.zeros(0)])
+            rows = np.concatenate([rows for _, rows in numeric] or [np.zeros(0, dtype=np.int64)])
+            order = np.argsort(values, kind="stable")
+            self._ranges[field] = (values[order], rows[order])
+
+        values, rows = self._ranges[field]
+        if operator in ("$gt", "$gte"):
+            start = np.searchsorted(values, bound, side="right" if operator == "$gt" else "left")
+            return np.sort(rows[start:])
+        end = np.searchsorted(values, bound, side="left" if operator == "$lt" else "right")
+        return np.sort(rows[:end])
+
+    def _prefix(self, field: str, prefix: str) -> np.ndarray:
+        if field not in self._strings:
+            self._strings[field] = sorted(value for _, value in self._postings.get(field, {}) if isinstance(value, str))
+        strings = self._strings[field]
+        matches = []
+        for i in range(bisect.bisect_left(strings, prefix), len(strings)):
+            if not strings[i].startswith(prefix):
+                break
+            matches.append(self._posting(field, strings[i]))
+        return _union(matches)
+
+    def _condition(self, field: str, operator: str, operand: Any) -> np.ndarray:
+        if operator == "$eq":
+            return self._posting(field, operand)
+        if operator == "$in":
+            return _union([self._posting(field, value) for value in operand])
+        if operator == "$ne":
+            return np.setdiff1d(self._rows_with(field), self._posting(field, operand), assume_unique=True)
+        if operator == "$nin":
+            return np.setdiff1d(self._rows_with(field), self._condition(field, "$in", operand), assume_unique=True)
+        if operator == "$prefix":
+            return self._prefix(field, operand)
+        if operator in RANGE_OPERATORS:
+            if isinstance(operand, bool) or not isinstance(operand, (int, float)):
+                raise ValueError(f"{operator} on {field!r} needs a number, got {operand!r}")
+            return self._range(field, operator, operand)
+        raise ValueError(f"Unsupported filter operator: {operator}")
+
+    def rows(self, where: Dict[str, Any]) -> np.ndarray:
+        """
+        Rows matching a filter expression (see normalize_filter for the syntax).
+
+        Args:
+            where: Filter expression
+
+        Returns:
+            Ascending array of matching row indices
+        """
+        clauses = []
+        for field, condition in where.items():
+            if field == "$and":
+                clauses.extend(self.rows(clause) for clause in condition)
+            elif field == "$or":
+                clauses.append(_union([self.rows(clause) for clause in condition]))
+            elif isinstance(condition, dict):
+                clauses.extend(self._condition(field, operator, operand) for operator, operand in condition.items())
+            else:
+                clauses.append(self._condition(field, "$eq", condition))
+        if not clauses:
+            return np.arange(self.num_rows, dtype=np.int64)
+        return _intersection(clauses)
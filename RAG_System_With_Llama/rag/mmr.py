@@ -0,0 +1,56 @@
+# rag/mmr.py
+from typing import List
+import numpy as np
+
+
+def _unit_rows(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length, leaving zero rows at zero (cosine similarity 0, as in LangChain)."""
+    norms = np.sqrt(np.einsum("...i,...i->...", vectors, vectors))[..., None]
+    return vectors * np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+
+
+def maximal_marginal_relevance(
+    query_embedding: np.ndarray,
+    candidates: np.ndarray,
+    lambda_mult: float = 0.5,
+    k: int = 4
+) -> List[int]:
+    """
+    Greedily select candidates by maximal marginal relevance.
+
+    Same selection as LangChain's maximal_marginal_relevance, but the
+    candidates are normalized once and each step is a single matrix-vector
+    product plus vector operations: every pick contributes one column of the
+    pairwise cosine similarity matrix, folded into a running maximum
+    similarity to the selected set. Ties go to the lower candidate index;
+    only near-ties within float32 rounding can resolve differently.
+
+    Args:
+        query_embedding: Query embedding
+        candidates: Matrix of candidate embeddings, one per row
+        lambda_mult: 1 for pure relevance, 0 for maximum diversity
+        k: Number of candidates to select
+
+    Returns:
+        Indices of the selected candidates, in selection order
+    """
+    candidates = np.asarray(candidates, dtype=np.float32)
+    k = min(k, len(candidates))
+    if k <= 0:
+        return []
+
+    unit = _unit_rows(candidates)
+    relevance = unit @ _unit_rows(np.asarray(query_embedding, dtype=np.float32).reshape(-1))
+
+    # The first pick is the most similar candidate whatever lambda_mult is
+    selected = [int(np.argmax(relevance))]
+    relevance *= lambda_mult
+    redundancy = np.full(len(candidates), -np.inf, dtype=np.float32)
+    scores = np.empty_like(relevance)
+    while len(selected) < k:
+        np.maximum(redundancy, unit @ unit[selected[-1]], out=redundancy)
+        np.multiply(redundancy, lambda_mult - 1.0, out=scores)
+        scores += relevance
+        scores[selected] = -np.inf
+        selected.append(int(np.argmax(scores)))
+    return selected
@@ -0,0 +1,629 @@
+# rag/numpy_store.py
+import os
+import json
+import uuid
+from typing import List, Dict, Any, Optional, Iterable, Tuple, Callable
+import numpy as np
+from langchain.schema import Document
+from langchain.embeddings.base import Embeddings
+from langchain.vectorstores.base import VectorStore
+from rag.ann_index import IVFIndex
+from rag.mmr import maximal_marginal_relevance
+from rag.metadata_index import MetadataIndex
+
+
+def rowwise_top_k(distances: np.ndarray, k: int, group_size: int = 64) -> np.ndarray:
+    """
+    Columns of the k smallest values in every row, in no particular order.
+
+    Each row is cut into groups of group_size columns. The k smallest values
+    always lie in the k groups with the smallest minima, so only those
+    groups are partitioned, which is much cheaper than partitioning whole rows.
+    """
+    num_rows, num_cols = distances.shape
+    num_groups = num_cols // group_size
+    if num_groups <= 4 * k:
+        return np.argpartition(distances, k - 1, axis=1)[:, :k]
+
+    # Whole groups are a strided view; the ragged tail forms one extra group
+    full = num_groups * group_size
+    minima = distances[:, :full].reshape(num_rows, num_groups, group_size).min(axis=2)
+    tail = num_cols - full
+    if tail:
+        minima = np.concatenate([minima, distances[:, full:].min(axis=1, keepdims=True)], axis=1)
+
+    groups = np.argpartition(minima, k - 1, axis=1)[:, :k]
+    columns = (groups[:, :, None] * group_size + np.arange(group_size)).reshape(num_rows, -1)
+    # Positions past the end of the tail group are clamped and then ruled out
+    overflow = columns >= num_cols
+    columns = np.minimum(columns, num_cols - 1)
+    candidates = np.take_along_axis(distances, columns, axis=1)
+    candidates[overflow] = np.inf
+    selected = np.argpartition(candidates, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(columns, selected, axis=1)
+
+
+def _contains(sorted_rows: np.ndarray, rows: Any) -> Any:
+    """Whether each of rows is in an ascending array of rows."""
+    positions = np.minimum(np.searchsorted(sorted_rows, rows), max(len(sorted_rows) - 1, 0))
+    return (sorted_rows[positions] == rows) if len(sorted_rows) else np.zeros(np.shape(rows), dtype=bool)
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    Flat vector store backed by a contiguous float32 matrix with exact top-k search.
+
+    Vectors persist as vectors.npy (memory-mapped on load) and ids, texts and
+    metadata as documents.json. Scores are squared L2 distances like Chroma's
+    default, so lower is better and results are fully deterministic. With
+    index_params={"type": "ivf", ...} single-query searches scan only the
+    nearest IVF lists instead of every row.
+
+    Rows are appended to a buffer that doubles its capacity when full, so an
+    add costs time proportional to the rows added. Deleted rows are masked
+    out of searches and only removed once they make up half the buffer, or
+    when the store is persisted.
+    """
+
+    VECTORS_FILE = "vectors.npy"
+    DOCUMENTS_FILE = "documents.json"
+    IVF_FILE = "ivf.npz"
+    # Filters may use {"field": {"$prefix": ...}} (see rag.metadata_index)
+    supports_prefix_filters = True
+
+    def __init__(
+        self,
+        embedding_function: Optional[Embeddings] = None,
+        persist_directory: Optional[str] = None,
+        relevance_score_fn: Optional[Callable[[float], float]] = None,
+        index_params: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Initialize the NumpyVectorStore, loading persisted data if present.
+
+        Args:
+            embedding_function: Embedding model used for texts and queries
+            persist_directory: Directory to persist the store (None for in-memory)
+            relevance_score_fn: Optional function mapping distances to relevance scores
+            index_params: {"type": "flat"} (default) or {"type": "ivf", "nlist": ..., "nprobe": ...}
+        """
+        self._embedding_function = embedding_function
+        self.persist_directory = persist_directory
+        self.override_relevance_score_fn = relevance_score_fn
+
+        params = dict(index_params or {})
+        index_type = params.pop("type", "flat")
+        if index_type == "ivf":
+            self.ann_index = IVFIndex(**params)
+        elif index_type == "flat":
+            self.ann_index = None
+        else:
+            raise ValueError(f"Unsupported index type for the NumPy store: {index_type}")
+
+        # One entry per row; deleted rows hold None until the next compaction
+        self.ids: List[Optional[str]] = []
+        self.texts: List[Optional[str]] = []
+        self.metadatas: List[Optional[Dict[str, Any]]] = []
+        # Row buffers with spare capacity past len(self.ids)
+        self._vectors: Optional[np.ndarray] = None
+        self._norms: Optional[np.ndarray] = None
+        self._live = np.zeros(0, dtype=bool)
+        self._num_deleted = 0
+        self._id_to_row: Dict[str, int] = {}
+        # Built on the first filtered search, then kept up to date on add
+        self._metadata_index: Optional[MetadataIndex] = None
+
+        if persist_directory and os.path.exists(os.path.join(persist_directory, self.DOCUMENTS_FILE)):
+            self._load()
+
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return self._embedding_function
+
+    @property
+    def vectors(self) -> Optional[np.ndarray]:
+        """Stored rows, including deleted rows not yet compacted away."""
+        return self._vectors[:len(self.ids)] if self._vectors is not None else None
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        if self.override_relevance_score_fn:
+            return self.override_relevance_score_fn
+        return self._euclidean_relevance_score_fn
+
+    def _load(self) -> None:
+        """Load the persisted store, memory-mapping the vectors."""
+        with open(os.path.join(self.persist_directory, self.DOCUMENTS_FILE), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.ids = data["ids"]
+        self.texts = data["texts"]
+        self.metadatas = data["metadatas"]
+        self._id_to_row = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        self._live = np.ones(len(self.ids), dtype=bool)
+
+        if self.ids:
+            # Norms are computed on the first search, so stores only read through get() stay on disk;
+            # the first add copies the read-only map into a growable buffer
+            self._vectors = np.load(os.path.join(self.persist_directory, self.VECTORS_FILE), mmap_mode="r")
+            if self.ann_index is not None:
+                ivf_path = os.path.join(self.persist_directory, self.IVF_FILE)
+                if not self.ann_index.load(ivf_path, len(self.ids)):
+                    self.ann_index.add(self.vectors, len(self.ids))
+
+    def _row_norms(self) -> np.ndarray:
+        """Squared norms of the stored rows, infinite for deleted rows so searches never pick them."""
+        num_rows = len(self.ids)
+        if self._norms is None:
+            self._norms = np.empty(len(self._vectors), dtype=np.float32)
+            self._norms[:num_rows] = np.einsum("ij,ij->i", self.vectors, self.vectors)
+            self._norms[:num_rows][~self._live[:num_rows]] = np.inf
+        return self._norms[:num_rows]
+
+    def _reserve(self, num_new: int, dim: int) -> None:
+        """Grow the row buffers, doubling their capacity, until num_new more rows fit."""
+        num_rows = len(self.ids)
+        capacity = len(self._vectors) if self._vectors is not None else 0
+        if num_rows + num_new <= capacity and isinstance(self._vectors, np.ndarray) and self._vectors.flags.writeable:
+            return
+
+        capacity = max(num_rows + num_new, 2 * capacity, 64)
+        vectors = np.empty((capacity, dim), dtype=np.float32)
+        live = np.zeros(capacity, dtype=bool)
+        if num_rows:
+            vectors[:num_rows] = self.vectors
+            live[:num_rows] = self._live[:num_rows]
+        self._vectors, self._live = vectors, live
+        if self._norms is not None:
+            norms = np.empty(capacity, dtype=np.float32)
+            norms[:num_rows] = self._norms[:num_rows]
+            self._norms = norms
+
+    def _compact(self) -> None:
+        """Drop deleted rows, shifting the remaining rows down in order."""
+        keep = np.flatnonzero(self._live[:len(self.ids)])
+        self._vectors = np.ascontiguousarray(self.vectors[keep])
+        self._norms = self._norms[keep] if self._norms is not None else None
+        self._live = np.ones(len(keep), dtype=bool)
+        self.ids = [self.ids[row] for row in keep]
+        self.texts = [self.texts[row] for row in keep]
+        self.metadatas = [self.metadatas[row] for row in keep]
+        self._id_to_row = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        self._num_deleted = 0
+        # Rows shifted, so the metadata index is rebuilt when next needed
+        self._metadata_index = None
+        if self.ann_index is not None:
+            self.ann_index.keep(keep)
+
+    def _live_rows(self) -> np.ndarray:
+        """Rows of documents that have not been deleted, in order."""
+        if not self._num_deleted:
+            return np.arange(len(self.ids))
+        return np.flatnonzero(self._live[:len(self.ids)])
+
+    def train_index(self) -> None:
+        """Refit the IVF centroids to the current rows (new rows are otherwise assigned to the existing ones)."""
+        if self.ann_index is None:
+            return
+        if self._num_deleted:
+            self._compact()
+        if len(self.ids) >= self.ann_index.min_rows:
+            self.ann_index.train(self.vectors)
+
+    def persist(self) -> None:
+        """Write the vectors and documents to the persist directory."""
+        if not self.persist_directory:
+            return
+
+        if self._num_deleted:
+            self._compact()
+        os.makedirs(self.persist_directory, exist_ok=True)
+        vectors_path = os.path.join(self.persist_directory, self.VECTORS_FILE)
+        documents_path = os.path.join(self.persist_directory, self.DOCUMENTS_FILE)
+
+        vectors = self.vectors if self.vectors is not None else np.zeros((0, 0), dtype=np.float32)
+        with open(vectors_path + ".tmp", "wb") as f:
+            np.save(f, np.asarray(vectors))
+        with open(documents_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"ids": self.ids, "texts": self.texts, "metadatas": self.metadatas}, f, separators=(",", ":"))
+
+        # The open memory map keeps reading the old file until it is reloaded
+        os.replace(vectors_path + ".tmp", vectors_path)
+        os.replace(documents_path + ".tmp", documents_path)
+        if self.ann_index is not None:
+            self.ann_index.save(os.path.join(self.persist_directory, self.IVF_FILE))
+
+    def add_vectors(
+        self,
+        vectors: np.ndarray,
+        texts: List[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None
+    ) -> List[str]:
+        """
+        Add precomputed vectors with their texts.
+
+        Args:
+            vectors: Matrix of embeddings, one row per text
+            texts: Texts of the documents
+            metadatas: Optional metadata per document
+            ids: Optional IDs (random UUIDs if None); existing IDs are replaced
+
+        Returns:
+            List of IDs of the added documents
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        metadatas = list(metadatas) if metadatas else [{} for _ in texts]
+
+        existing = [doc_id for doc_id in ids if doc_id in self._id_to_row]
+        if existing:
+            self.delete(existing)
+        if not len(vectors):
+            return ids
+
+        start = len(self.ids)
+        self._reserve(len(vectors), vectors.shape[1])
+        end = start + len(vectors)
+        self._vectors[start:end] = vectors
+        self._live[start:end] = True
+        if self._norms is not None:
+            self._norms[start:end] = np.einsum("ij,ij->i", vectors, vectors)
+
+        for doc_id in ids:
+            self._id_to_row[doc_id] = len(self.ids)
+            self.ids.append(doc_id)
+        self.texts.extend(texts)
+        self.metadatas.extend(metadatas)
+        if self._metadata_index is not None:
+            self._metadata_index.add(metadatas)
+        if self.ann_index is not None:
+            self.ann_index.add(self.vectors, len(self.ids))
+        return ids
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any
+    ) -> List[str]:
+        """
+        Embed texts and add them to the store.
+
+        Args:
+            texts: Texts to add
+            metadatas: Optional metadata per text
+            ids: Optional IDs (random UUIDs if None)
+
+        Returns:
+            List of IDs of the added texts
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+        vectors = self._embedding_function.embed_documents(texts)
+        return self.add_vectors(np.asarray(vectors, dtype=np.float32), texts, metadatas, ids)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        """
+        Delete documents by ID.
+
+        Args:
+            ids: IDs of the documents to delete
+
+        Returns:
+            True once the documents are removed
+        """
+        rows = [self._id_to_row.pop(doc_id) for doc_id in dict.fromkeys(ids or []) if doc_id in self._id_to_row]
+        if not rows:
+            return True
+
+        # Mask the rows; the metadata index and IVF lists still hold them until compaction
+        rows = np.array(rows, dtype=np.int64)
+        self._live[rows] = False
+        if self._norms is not None:
+            self._norms[rows] = np.inf
+        for row in rows:
+            self.ids[row] = self.texts[row] = self.metadatas[row] = None
+        self._num_deleted += len(rows)
+        if 2 * self._num_deleted > len(self.ids):
+            self._compact()
+        return True
+
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        include: Optional[List[str]] = None,
+        where: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Get stored documents, in the same shape as Chroma.get.
+
+        Args:
+            ids: IDs to fetch (None for all)
+            include: Any of "documents", "metadatas", "embeddings" (defaults to documents and metadatas)
+            where: Optional metadata filter expression
+
+        Returns:
+            Dictionary with "ids" and the included fields
+        """
+        include = ["documents", "metadatas"] if include is None else include
+        rows = self._live_rows().tolist() if ids is None else [self._id_to_row[i] for i in ids if i in self._id_to_row]
+        if where:
+            allowed = self._filter_rows(where)
+            rows = allowed.tolist() if ids is None else [row for row in rows if _contains(allowed, row)]
+
+        result = {"ids": [self.ids[row] for row in rows]}
+        result["documents"] = [self.texts[row] for row in rows] if "documents" in include else None
+        result["metadatas"] = [self.metadatas[row] for row in rows] if "metadatas" in include else None
+        result["embeddings"] = np.asarray(self.vectors)[rows].tolist() if "embeddings" in include else None
+        return result
+
+    def _filter_rows(self, filter: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Ascending rows matching a filter expression, from the metadata index (None without a filter)."""
+        if not filter:
+            return None
+        if self._metadata_index is None:
+            self._metadata_index = MetadataIndex()
+            self._metadata_index.add([metadata or {} for metadata in self.metadatas])
+        rows = self._metadata_index.rows(filter)
+        return rows[self._live[rows]] if self._num_deleted else rows
+
+    def _top_k(self, query: np.ndarray, k: int, filter: Optional[Dict[str, Any]] = None) -> List[Tuple[int, float]]:
+        """Nearest rows to one query as (row, squared L2 distance), via the IVF lists when trained."""
+        if self.vectors is None or not self._id_to_row:
+            return []
+
+        allowed = self._filter_rows(filter)
+        rows = None
+        # A filter matching fewer rows than the probed lists hold is cheaper (and exact) to scan directly
+        if (
+            self.ann_index is not None and self.ann_index.is_trained
+            and (allowed is None or len(allowed) * len(self.ann_index.centroids) > len(self.ids) * self.ann_index.nprobe)
+        ):
+            rows = np.sort(self.ann_index.candidates(query))
+            if self._num_deleted:
+                rows = rows[self._live[rows]]
+            if allowed is not None:
+                rows = rows[_contains(allowed, rows)]
+            # Too few candidates in the probed lists: fall back to an exact scan
+            if len(rows) < k:
+                rows = None
+
+        if rows is None:
+            rows = self._live_rows() if allowed is None else allowed
+        if not len(rows):
+            return []
+
+        if len(rows) * 4 < len(self.ids):
+            distances = self._row_norms()[rows] - 2.0 * (np.asarray(self.vectors[rows]) @ query)
+        else:
+            # Scanning every row is cheaper than gathering most of the matrix
+            distances = (self._row_norms() - 2.0 * (self.vectors @ query))[rows]
+        distances += float(query @ query)
+
+        k = min(k, len(rows))
+        top = np.argpartition(distances, k - 1)[:k]
+        # Rows tied with the kth distance are cut by row order, not by where the partition left them
+        kth = distances[top].max()
+        if np.count_nonzero(distances <= kth) > k:
+            top = np.flatnonzero(distances <= kth)
+        top = top[np.lexsort((rows[top], distances[top]))][:k]
+        return [(int(rows[i]), float(distances[i])) for i in top]
+
+    def _document(self, row: int) -> Document:
+        return Document(page_content=self.texts[row], metadata=dict(self.metadatas[row]))
+
+    def similarity_search_by_vector_with_score(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        """
+        Find the documents nearest to an embedding.
+
+        Args:
+            embedding: Query embedding
+            k: Number of documents to return
+            filter: Optional metadata filter expression (see rag.metadata_index)
+
+        Returns:
+            List of (document, squared L2 distance) tuples, nearest first
+        """
+        query = np.asarray(embedding, dtype=np.float32)
+        return [(self._document(row), distance) for row, distance in self._top_k(query, k, filter)]
+
+    def similarity_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, filter)]
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        """
+        Find the documents nearest to a query.
+
+        Args:
+            query: Query text
+            k: Number of documents to return
+            filter: Optional metadata filter expression (see rag.metadata_index)
+
+        Returns:
+            List of (document, squared L2 distance) tuples, nearest first
+        """
+        embedding = self._embedding_function.embed_query(query)
+        return self.similarity_search_by_vector_with_score(embedding, k, filter)
+
+    def similarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def _similarity_search_with_relevance_scores(
+        self,
+        query: str,
+        k: int = 4,
+        **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        relevance_score_fn = self._select_relevance_score_fn()
+        return [(doc, relevance_score_fn(score)) for doc, score in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def _batch_top_k(
+        self,
+        queries: np.ndarray,
+        k: int,
+        max_block_bytes: int = 1 << 28,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[List[Tuple[int, float]]]:
+        """Nearest rows to every query as (row, squared L2 distance), one matrix product per block of queries."""
+        if self.vectors is None or not self._id_to_row or not len(queries):
+            return [[] for _ in range(len(queries))]
+
+        vectors, norms = np.asarray(self.vectors), self._row_norms()
+        allowed = self._filter_rows(filter)
+        # Deleted rows have infinite norms, so they never reach the top k of live rows
+        k = min(k, len(self._id_to_row) if allowed is None else len(allowed))
+        if k == 0:
+            return [[] for _ in range(len(queries))]
+        if allowed is not None and len(allowed) * 4 < len(self.ids):
+            vectors, norms = np.asarray(self.vectors[allowed]), norms[allowed]
+        elif allowed is not None:
+            # Broad filters scan every row, with an infinite norm keeping the others out of the top k
+            norms = np.full(len(self.ids), np.inf, dtype=self._norms.dtype)
+            norms[allowed] = self._norms[allowed]
+            allowed = None
+        block_size = max(1, max_block_bytes // (4 * len(vectors)))
+
+        results = []
+        for start in range(0, len(queries), block_size):
+            block = queries[start:start + block_size]
+            # Query norms do not change the ranking, so they are added to the selected rows only
+            distances = block @ vectors.T
+            distances *= -2.0
+            distances += norms[None, :]
+            query_norms = np.einsum("ij,ij->i", block, block)
+            rows = rowwise_top_k(distances, k)
+            # Rows tied with the kth distance are cut by row order, not by where the partition left them
+            kth = np.take_along_axis(distances, rows, axis=1).max(axis=1)
+            for i in np.flatnonzero(np.count_nonzero(distances <= kth[:, None], axis=1) > k):
+                tied = np.flatnonzero(distances[i] <= kth[i])
+                rows[i] = tied[np.lexsort((tied, distances[i, tied]))][:k]
+            for query_rows, query_distances, query_norm in zip(rows, distances, query_norms):
+                ordered = query_rows[np.lexsort((query_rows, query_distances[query_rows]))]
+                stored = ordered if allowed is None else allowed[ordered]
+                results.append([
+                    (int(row), float(query_distances[i] + query_norm)) for i, row in zip(ordered, stored)
+                ])
+        return results
+
+    def batch_similarity_search_by_vectors_with_score(
+        self,
+        embeddings: np.ndarray,
+        k: int = 4,
+        max_block_bytes: int = 1 << 28,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Find the nearest documents for many query embeddings with one matrix product.
+
+        Args:
+            embeddings: Matrix of query embeddings
+            k: Number of documents per query
+            max_block_bytes: Upper bound on the distance matrix computed at once
+            filter: Optional metadata filter expression, applied before the scan
+
+        Returns:
+            Per-query lists of (document, squared L2 distance) tuples, nearest first
+        """
+        queries = np.asarray(embeddings, dtype=np.float32)
+        return [
+            [(self._document(row), distance) for row, distance in hits]
+            for hits in self._batch_top_k(queries, k, max_block_bytes, filter)
+        ]
+
+    def max_marginal_relevance_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> List[Document]:
+        """
+        Select documents by maximal marginal relevance among the fetch_k nearest.
+
+        Args:
+            embedding: Query embedding
+            k: Number of documents to return
+            fetch_k: Number of nearest documents to choose from
+            lambda_mult: 1 for pure relevance, 0 for maximum diversity
+            filter: Optional metadata filter expression (see rag.metadata_index)
+
+        Returns:
+            Selected documents, in candidate order like Chroma
+        """
+        query = np.asarray(embedding, dtype=np.float32)
+        candidates = [row for row, _ in self._top_k(query, fetch_k, filter)]
+        if not candidates:
+            return []
+
+        selected = set(maximal_marginal_relevance(
+            query, np.asarray(self.vectors)[candidates], k=k, lambda_mult=lambda_mult
+        ))
+        return [self._document(row) for i, row in enumerate(candidates) if i in selected]
+
+    def max_marginal_relevance_search(
+        self,
+        query: str,
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> List[Document]:
+        embedding = self._embedding_function.embed_query(query)
+        return self.max_marginal_relevance_search_by_vector(embedding, k, fetch_k, lambda_mult, filter)
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Optional[Embeddings] = None,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        persist_directory: Optional[str] = None,
+        index_params: Optional[Dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> "NumpyVectorStore":
+        """
+        Create a store from texts.
+
+        Args:
+            texts: Texts to add
+            embedding: Embedding model
+            metadatas: Optional metadata per text
+            ids: Optional IDs
+            persist_directory: Directory to persist the store (None for in-memory)
+            index_params: Optional ANN index parameters (see __init__)
+
+        Returns:
+            The new NumpyVectorStore
+        """
+        store = cls(embedding_function=embedding, persist_directory=persist_directory, index_params=index_params)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
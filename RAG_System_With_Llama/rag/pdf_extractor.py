@@ -0,0 +1,162 @@
+# rag/pdf_extractor.py
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional, Tuple
+from langchain.schema import Document
+from rag.manifest import IndexManifest
+
+# Reader kept open by a pool worker between tasks on the same file
+_open_reader: Tuple[Optional[str], object] = (None, None)
+
+
+def _extract_page_range(task: Tuple[str, List[int]]) -> List[Tuple[int, str]]:
+    """
+    Extract the text of some pages of a PDF.
+
+    Args:
+        task: Tuple of (file_path, page numbers)
+
+    Returns:
+        List of (page number, text) tuples
+    """
+    global _open_reader
+    file_path, pages = task
+
+    if _open_reader[0] != file_path:
+        import pypdf
+        _open_reader = (file_path, pypdf.PdfReader(file_path))
+    reader = _open_reader[1]
+
+    return [(page, reader.pages[page].extract_text()) for page in pages]
+
+
+def _release_reader() -> None:
+    """Drop the reader kept open by _extract_page_range."""
+    global _open_reader
+    _open_reader = (None, None)
+
+
+class PDFExtractor:
+    """Class for extracting PDF text page by page, in parallel, with an on-disk page cache."""
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        num_workers: Optional[int] = None,
+        min_parallel_pages: int = 16,
+        pages_per_task: int = 4
+    ):
+        """
+        Initialize the PDFExtractor.
+
+        Args:
+            cache_dir: Directory for the page text cache (None to disable caching)
+            num_workers: Worker processes for page extraction (None for all CPUs, 1 for sequential)
+            min_parallel_pages: Documents with fewer uncached pages are extracted sequentially
+            pages_per_task: Number of pages handed to a worker at a time
+        """
+        self.cache_dir = cache_dir
+        self.num_workers = num_workers
+        self.min_parallel_pages = min_parallel_pages
+        self.pages_per_task = pages_per_task
+        self._connection = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_connection"] = None
+        return state
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        """Open the page cache, creating it if needed."""
+        if self._connection is None and self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._connection = sqlite3.connect(os.path.join(self.cache_dir, "pdf_pages.sqlite3"), timeout=60)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS files (file_hash TEXT PRIMARY KEY, num_pages INTEGER)"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS pages (file_hash TEXT, page INTEGER, text TEXT, "
+                "PRIMARY KEY (file_hash, page))"
+            )
+            self._connection.commit()
+        return self._connection
+
+    def _cached_pages(self, file_hash: str) -> Tuple[Optional[int], Dict[int, str]]:
+        """Look up the page count and cached page texts of a file."""
+        connection = self._connect()
+        if connection is None:
+            return None, {}
+
+        row = connection.execute("SELECT num_pages FROM files WHERE file_hash = ?", (file_hash,)).fetchone()
+        pages = dict(connection.execute("SELECT page, text FROM pages WHERE file_hash = ?", (file_hash,)))
+        return (row[0] if row else None), pages
+
+    def _store_pages(self, file_hash: str, num_pages: int, pages: List[Tuple[int, str]]) -> None:
+        """Write extracted page texts to the cache."""
+        connection = self._connect()
+        if connection is None:
+            return
+
+        with connection:
+            connection.execute("INSERT OR REPLACE INTO files VALUES (?, ?)", (file_hash, num_pages))
+            connection.executemany(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?)",
+                [(file_hash, page, text) for page, text in pages]
+            )
+
+    def extract_pages(self, file_path: str, parallel: bool = True) -> List[str]:
+        """
+        Extract the text of every page of a PDF, reusing cached pages.
+
+        Args:
+            file_path: Path to the PDF file
+            parallel: Whether pages may be spread over worker processes
+
+        Returns:
+            List of page texts in page order
+        """
+        file_hash = IndexManifest.file_hash(file_path) if self.cache_dir else None
+        num_pages, pages = self._cached_pages(file_hash) if file_hash else (None, {})
+
+        if num_pages is None:
+            import pypdf
+            num_pages = len(pypdf.PdfReader(file_path).pages)
+
+        missing = [page for page in range(num_pages) if page not in pages]
+        if missing:
+            tasks = [
+                (file_path, missing[i:i + self.pages_per_task])
+                for i in range(0, len(missing), self.pages_per_task)
+            ]
+            num_workers = self.num_workers or os.cpu_count() or 1
+
+            if parallel and num_workers > 1 and len(missing) >= self.min_parallel_pages:
+                with ProcessPoolExecutor(max_workers=min(num_workers, len(tasks))) as executor:
+                    results = [item for result in executor.map(_extract_page_range, tasks) for item in result]
+            else:
+                results = [item for task in tasks for item in _extract_page_range(task)]
+                _release_reader()
+
+            pages.update(results)
+            if file_hash:
+                self._store_pages(file_hash, num_pages, results)
+
+        return [pages[page] for page in range(num_pages)]
+
+    def load(self, file_path: str, parallel: bool = True) -> List[Document]:
+        """
+        Load a PDF as one document per page, like PyPDFLoader.
+
+        Args:
+            file_path: Path to the PDF file
+            parallel: Whether pages may be spread over worker processes
+
+        Returns:
+            List of page documents with source and page metadata
+        """
+        return [
+            Document(page_content=text, metadata={"source": file_path, "page": page})
+            for page, text in enumerate(self.extract_pages(file_path, parallel=parallel))
+        ]
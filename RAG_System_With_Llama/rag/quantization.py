@@ -0,0 +1,457 @@
+# rag/quantization.py
+import os
+import json
+import mmap
+import time
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Set
+import numpy as np
+
+# Number of set bits in every byte value, for Hamming distances on packed codes
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+class QuantizedIndex:
+    """
+    Compact int8 or 1-bit vector codes with full-precision rescoring.
+
+    Search scans the compact codes to pick rescore_factor * k candidates, then
+    rescores only those with the float32 vectors, which can stay on disk as a
+    memory-mapped .npy file. Vectors are L2-normalized, so scores are cosine
+    similarities (higher is better).
+
+    The index follows a changing store without a rebuild: added vectors are
+    encoded with the fitted quantizer and kept in RAM (and added.npy) beside
+    the base full.npy, and removed rows are masked out. Once the changes
+    outnumber half the base rows, save refits and rewrites the index from
+    its live rows.
+    """
+
+    MODES = ("int8", "binary")
+    DEFAULT_RESCORE_FACTOR = {"int8": 4, "binary": 10}
+
+    def __init__(self, mode: str = "int8", rescore_factor: Optional[int] = None, block_size: int = 4096):
+        """
+        Initialize the QuantizedIndex.
+
+        Args:
+            mode: "int8" for scalar quantization or "binary" for 1-bit codes
+            rescore_factor: Candidates rescored per requested result (None for the mode default)
+            block_size: Number of codes scored at a time, bounding temporary memory
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Unsupported quantization mode: {mode}")
+
+        self.mode = mode
+        self.rescore_factor = rescore_factor or self.DEFAULT_RESCORE_FACTOR[mode]
+        self.block_size = block_size
+        # Vector store ID of every row, None for removed rows
+        self.ids: List[Optional[str]] = []
+        self._row: Dict[str, int] = {}
+        # Row buffers with spare capacity for added vectors; codes and live are views of the used rows
+        self._codes: Optional[np.ndarray] = None
+        self._live = np.zeros(0, dtype=bool)
+        self._num_removed = 0
+        # Full-precision vectors: the first len(full) rows in full, later ones in _added
+        self.full = None
+        self._added: Optional[np.ndarray] = None
+        # int8: per-dimension offset and step; binary: per-dimension threshold
+        self.offset = None
+        self.step = None
+        self.threshold = None
+
+    @property
+    def codes(self) -> Optional[np.ndarray]:
+        return self._codes[:len(self.ids)] if self._codes is not None else None
+
+    @codes.setter
+    def codes(self, codes: Optional[np.ndarray]) -> None:
+        self._codes = codes
+
+    @property
+    def live(self) -> np.ndarray:
+        """Mask of the rows that have not been removed."""
+        return self._live[:len(self.ids)]
+
+    @property
+    def _num_base(self) -> int:
+        return len(self.full) if self.full is not None else 0
+
+    @property
+    def needs_compaction(self) -> bool:
+        """Whether added and removed rows outnumber half the base rows."""
+        return 2 * (len(self.ids) - self._num_base + self._num_removed) > self._num_base
+
+    def _reset_rows(self, ids: List[str]) -> None:
+        """Index a fresh set of rows, all live and all in the base."""
+        self.ids = list(ids)
+        self._row = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        self._live = np.ones(len(self.ids), dtype=bool)
+        self._num_removed = 0
+        self._added = None
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Quantize normalized vectors with the fitted parameters."""
+        if self.mode == "int8":
+            levels = np.rint((vectors - self.offset) / self.step) - 128
+            return np.clip(levels, -128, 127).astype(np.int8)
+        return np.packbits(vectors > self.threshold, axis=-1)
+
+    def build(self, vectors: np.ndarray, ids: List[str], directory: Optional[str] = None) -> None:
+        """
+        Fit the quantizer and encode a set of vectors.
+
+        Args:
+            vectors: Matrix of embeddings, one row per id
+            ids: Vector store IDs of the rows
+            directory: Directory to persist the index in (None to keep everything in memory)
+        """
+        self.build_from_batches([(vectors, ids)], len(ids), directory)
+
+    def build_from_batches(
+        self,
+        batches: Iterable[Tuple[np.ndarray, List[str]]],
+        count: int,
+        directory: Optional[str] = None
+    ) -> None:
+        """
+        Fit the quantizer and encode vectors streamed in batches.
+
+        The first pass writes the normalized vectors to full.npy and tracks the
+        per-dimension statistics the quantizer needs; the second encodes
+        full.npy block by block. Neither pass holds more than one batch or
+        block of float vectors in RAM when a directory is given.
+
+        Args:
+            batches: Iterable of (vectors, ids) pairs
+            count: Total number of vectors in the batches
+            directory: Directory to persist the index in (None to keep everything in memory)
+        """
+        self.ids = []
+        full = None
+        low = high = total = None
+
+        for vectors, ids in batches:
+            vectors = self._normalize(vectors)
+            if not len(vectors):
+                continue
+            if full is None:
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                    # Written beside full.npy so a previous index still mapping it stays readable
+                    full = np.lib.format.open_memmap(
+                        os.path.join(directory, "full.npy.tmp"), mode="w+", dtype=np.float32, shape=(count, vectors.shape[1])
+                    )
+                else:
+                    full = np.empty((count, vectors.shape[1]), dtype=np.float32)
+                low, high, total = vectors.min(axis=0), vectors.max(axis=0), np.zeros(vectors.shape[1], dtype=np.float64)
+            if len(self.ids) + len(vectors) > count:
+                raise ValueError(f"Got more than the {count} vectors expected")
+            full[len(self.ids):len(self.ids) + len(vectors)] = vectors
+            self.ids.extend(ids)
+            np.minimum(low, vectors.min(axis=0), out=low)
+            np.maximum(high, vectors.max(axis=0), out=high)
+            total += vectors.sum(axis=0)
+
+        if len(self.ids) != count:
+            raise ValueError(f"Expected {count} vectors, got {len(self.ids)}")
+        self._reset_rows(self.ids)
+        if full is None:
+            self.codes, self.full = None, None
+            return
+
+        if self.mode == "int8":
+            self.offset = low
+            self.step = np.maximum(high - low, 1e-12) / 255.0
+        else:
+            self.threshold = (total / count).astype(np.float32)
+
+        self.codes = np.concatenate([
+            self._encode(np.asarray(full[start:start + self.block_size]))
+            for start in range(0, count, self.block_size)
+        ])
+        self.full = full
+
+        if directory:
+            full.flush()
+            del full
+            os.replace(os.path.join(directory, "full.npy.tmp"), os.path.join(directory, "full.npy"))
+            # Keep only the compact codes in RAM; rescoring reads rows from disk
+            self.full = self._open_full(os.path.join(directory, "full.npy"))
+            self.save(directory)
+
+    @staticmethod
+    def _open_full(path: str) -> np.ndarray:
+        """Memory-map full-precision vectors for rescoring."""
+        full = np.load(path, mmap_mode="r")
+        # Rescoring reads a few scattered rows per query; readahead would page in their whole neighbourhood
+        if isinstance(full, np.memmap) and hasattr(mmap, "MADV_RANDOM"):
+            full._mmap.madvise(mmap.MADV_RANDOM)
+        return full
+
+    def _full_rows(self, rows: np.ndarray) -> np.ndarray:
+        """Full-precision vectors of the given rows, from full.npy or the added rows."""
+        in_base = rows < self._num_base
+        if in_base.all():
+            return np.asarray(self.full[rows])
+        vectors = np.empty((len(rows), self._added.shape[1]), dtype=np.float32)
+        vectors[in_base] = self.full[rows[in_base]]
+        vectors[~in_base] = self._added[rows[~in_base] - self._num_base]
+        return vectors
+
+    def _reserve(self, num_new: int, dim: int) -> None:
+        """Grow the code and added-vector buffers, doubling their capacity, until num_new more rows fit."""
+        num_rows, num_added = len(self.ids), len(self.ids) - self._num_base
+        if num_rows + num_new <= len(self._codes) and self._added is not None and num_added + num_new <= len(self._added):
+            return
+
+        codes = np.empty((max(num_rows + num_new, 2 * len(self._codes)),) + self._codes.shape[1:], dtype=self._codes.dtype)
+        codes[:num_rows] = self.codes
+        live = np.zeros(len(codes), dtype=bool)
+        live[:num_rows] = self.live
+        added = np.empty((max(num_added + num_new, 2 * num_added, 64), dim), dtype=np.float32)
+        if num_added:
+            added[:num_added] = self._added[:num_added]
+        self._codes, self._live, self._added = codes, live, added
+
+    def add(self, vectors: np.ndarray, ids: List[str]) -> None:
+        """
+        Encode vectors with the fitted quantizer and add them, replacing rows with the same IDs.
+
+        An index with nothing encoded yet is fitted to these vectors instead.
+
+        Args:
+            vectors: Matrix of embeddings, one row per id
+            ids: Vector store IDs of the rows
+        """
+        self.remove(ids)
+        vectors = self._normalize(vectors)
+        if not len(ids):
+            return
+        if self.codes is None:
+            self.build(vectors, ids)
+            return
+
+        self._reserve(len(ids), vectors.shape[1])
+        start, num_added = len(self.ids), len(self.ids) - self._num_base
+        self._codes[start:start + len(ids)] = self._encode(vectors)
+        self._added[num_added:num_added + len(ids)] = vectors
+        self._live[start:start + len(ids)] = True
+        self.ids.extend(ids)
+        for row, doc_id in enumerate(ids, start):
+            # An ID repeated within the batch keeps its last row
+            if doc_id in self._row:
+                self.remove([doc_id])
+            self._row[doc_id] = row
+
+    def remove(self, ids: Iterable[str]) -> None:
+        """
+        Mask out the rows of the given IDs (IDs not in the index are ignored).
+
+        Args:
+            ids: Vector store IDs to remove
+        """
+        for doc_id in ids:
+            row = self._row.pop(doc_id, None)
+            if row is not None:
+                self._live[row] = False
+                self.ids[row] = None
+                self._num_removed += 1
+
+    def compact(self, directory: Optional[str] = None) -> None:
+        """
+        Refit the quantizer to the live rows and re-encode them as one base.
+
+        Args:
+            directory: Directory to persist the index in (None to keep everything in memory)
+        """
+        rows = np.flatnonzero(self.live)
+        ids = [self.ids[row] for row in rows]
+        batches = (
+            (self._full_rows(rows[start:start + self.block_size]), ids[start:start + self.block_size])
+            for start in range(0, len(rows), self.block_size)
+        )
+        self.build_from_batches(batches, len(rows), directory)
+
+    def save(self, directory: str) -> None:
+        """
+        Persist the index, compacting it first once it has changed enough.
+
+        Only the rows added since the base was written are saved in
+        full precision (as added.npy); full.npy is rewritten on compaction.
+
+        Args:
+            directory: Directory to write the index files to
+        """
+        if self.needs_compaction:
+            self.compact(directory)
+            return
+
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "codes.npy"), self.codes)
+        full_path = os.path.join(directory, "full.npy")
+        # Vectors streamed into full.npy by build_from_batches are already on disk
+        if getattr(self.full, "filename", None) != os.path.abspath(full_path):
+            np.save(full_path, np.asarray(self.full))
+        added_path = os.path.join(directory, "added.npy")
+        num_added = len(self.ids) - self._num_base
+        if num_added:
+            np.save(added_path, self._added[:num_added])
+        elif os.path.exists(added_path):
+            os.remove(added_path)
+        params = {"offset": self.offset, "step": self.step} if self.mode == "int8" else {"threshold": self.threshold}
+        np.savez(os.path.join(directory, "params.npz"), **params)
+        with open(os.path.join(directory, "index.json"), "w", encoding="utf-8") as f:
+            json.dump({"mode": self.mode, "rescore_factor": self.rescore_factor, "ids": self.ids}, f)
+
+    @classmethod
+    def load(cls, directory: str) -> "QuantizedIndex":
+        """
+        Load a persisted index, memory-mapping the full-precision vectors.
+
+        Args:
+            directory: Directory containing the index files
+
+        Returns:
+            The loaded QuantizedIndex
+        """
+        with open(os.path.join(directory, "index.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        index = cls(mode=meta["mode"], rescore_factor=meta["rescore_factor"])
+        index.ids = meta["ids"]
+        index.codes = np.load(os.path.join(directory, "codes.npy"))
+        index.full = cls._open_full(os.path.join(directory, "full.npy"))
+        added_path = os.path.join(directory, "added.npy")
+        if os.path.exists(added_path):
+            index._added = np.load(added_path)
+        index._row = {doc_id: row for row, doc_id in enumerate(index.ids) if doc_id is not None}
+        index._live = np.array([doc_id is not None for doc_id in index.ids], dtype=bool)
+        index._num_removed = len(index.ids) - len(index._row)
+        params = np.load(os.path.join(directory, "params.npz"))
+        for name in params.files:
+            setattr(index, name, params[name])
+        return index
+
+    def _approximate_scores(self, query: np.ndarray) -> np.ndarray:
+        """Score every code against a normalized query (higher is better)."""
+        scores = np.empty(len(self.codes), dtype=np.float32)
+
+        if self.mode == "int8":
+            # q . (offset + (code + 128) * step) = q . offset + 128 * (q * step).sum() + code . (q * step)
+            weights = query * self.step
+            constant = float(query @ self.offset) + 128.0 * float(weights.sum())
+            for start in range(0, len(self.codes), self.block_size):
+                block = self.codes[start:start + self.block_size]
+                scores[start:start + len(block)] = block.astype(np.float32) @ weights + constant
+        else:
+            query_bits = np.packbits(query > self.threshold)
+            for start in range(0, len(self.codes), self.block_size):
+                block = self.codes[start:start + self.block_size]
+                distances = _POPCOUNT[np.bitwise_xor(block, query_bits)].sum(axis=1, dtype=np.int32)
+                scores[start:start + len(block)] = -distances
+
+        return scores
+
+    def search(
+        self,
+        query_vector: List[float],
+        k: int = 4,
+        rescore: bool = True,
+        allowed: Optional[Set[str]] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Find the nearest vectors to a query.
+
+        Args:
+            query_vector: Query embedding
+            k: Number of results
+            rescore: Whether to rescore candidates with the full-precision vectors
+            allowed: Optional set of IDs to restrict the results to
+
+        Returns:
+            List of (id, score) tuples, best first
+        """
+        if self.codes is None or not len(self.codes):
+            return []
+
+        query = self._normalize(query_vector)
+        scores = self._approximate_scores(query)
+        num_allowed = len(scores)
+        mask = self.live if self._num_removed else None
+        if allowed is not None:
+            # Removed rows have no ID, so they are never allowed
+            mask = np.fromiter((doc_id in allowed for doc_id in self.ids), dtype=bool, count=len(self.ids))
+        if mask is not None:
+            scores[~mask] = -np.inf
+            num_allowed = int(mask.sum())
+        num_candidates = min(num_allowed, k * self.rescore_factor if rescore else k)
+        if num_candidates == 0:
+            return []
+        candidates = np.argpartition(-scores, num_candidates - 1)[:num_candidates]
+
+        if rescore:
+            # Sorted row order keeps memory-mapped reads sequential
+            candidates = np.sort(candidates)
+            scores = self._full_rows(candidates) @ query
+        else:
+            scores = scores[candidates]
+
+        top = np.argsort(-scores, kind="stable")[:k]
+        return [(self.ids[candidates[i]], float(scores[i])) for i in top]
+
+    def memory_usage(self) -> Dict[str, Any]:
+        """
+        Compare the in-memory size of the codes with float32 vectors.
+
+        Returns:
+            Dictionary with code bytes, float32 bytes and the fraction saved
+        """
+        full_bytes = len(self.ids) * self.full.shape[1] * 4 if self.full is not None else 0
+        code_bytes = int(self.codes.nbytes) if self.codes is not None else 0
+        return {
+            "code_bytes": code_bytes,
+            "float32_bytes": full_bytes,
+            "bytes_per_vector": code_bytes / len(self.ids) if self.ids else 0,
+            "memory_saved": 1 - code_bytes / full_bytes if full_bytes else 0.0
+        }
+
+    def evaluate(self, query_vectors: np.ndarray, k: int = 10) -> Dict[str, Any]:
+        """
+        Measure recall@k against exact float32 search.
+
+        Args:
+            query_vectors: Matrix of query embeddings
+            k: Number of results per query
+
+        Returns:
+            Dictionary with recall@k with and without rescoring, latencies and memory usage
+        """
+        queries = self._normalize(query_vectors)
+        rows = np.flatnonzero(self.live)
+        full = self._full_rows(rows)
+        recall = {"rescored": [], "codes_only": []}
+        latency = {"rescored": [], "codes_only": []}
+
+        for query in queries:
+            exact = set(np.argsort(-(full @ query), kind="stable")[:k].tolist())
+            exact_ids = {self.ids[rows[i]] for i in exact}
+            for name, rescore in (("rescored", True), ("codes_only", False)):
+                start = time.perf_counter()
+                found = {doc_id for doc_id, _ in self.search(query, k=k, rescore=rescore)}
+                latency[name].append(time.perf_counter() - start)
+                recall[name].append(len(found & exact_ids) / len(exact_ids))
+
+        return {
+            "mode": self.mode,
+            "k": k,
+            f"recall@{k}": float(np.mean(recall["rescored"])),
+            f"recall@{k}_codes_only": float(np.mean(recall["codes_only"])),
+            "mean_latency_ms": 1000 * float(np.mean(latency["rescored"])),
+            **self.memory_usage()
+        }
@@ -0,0 +1,129 @@
+# rag/query_cache.py
+import time
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+
+def normalize_query(query: str) -> str:
+    """
+    Canonical form of a query used as a cache key.
+
+    Args:
+        query: Query text
+
+    Returns:
+        NFC-normalized query with runs of whitespace collapsed to single spaces
+    """
+    return " ".join(unicodedata.normalize("NFC", query).split())
+
+
+class LRUCache:
+    """
+    Thread-safe in-memory LRU cache that tracks hits and the compute time they saved.
+
+    Each entry remembers how long it took to compute, so every hit adds that
+    duration to the saved latency.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        """
+        Initialize the LRUCache.
+
+        Args:
+            max_entries: Maximum number of entries before the least recently used is evicted
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for a key, computing and storing it on a miss.
+
+        Args:
+            key: Cache key
+            compute: Callable producing the value
+
+        Returns:
+            The cached or freshly computed value
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.saved_seconds += entry[1]
+                return entry[0]
+            self.misses += 1
+
+        # Compute outside the lock so slow misses do not serialize other lookups
+        start = time.perf_counter()
+        value = compute()
+        cost = time.perf_counter() - start
+
+        self.put(key, value, cost)
+        return value
+
+    def get(self, key: Hashable) -> Any:
+        """
+        Look up a value, counting a hit or a miss.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The cached value, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.saved_seconds += entry[1]
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, cost: float = 0.0) -> None:
+        """
+        Store a value computed outside the cache.
+
+        Args:
+            key: Cache key
+            value: Value to store
+            cost: Seconds it took to compute, credited to later hits
+        """
+        with self._lock:
+            self._entries[key] = (value, cost)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every entry, keeping the counters."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with hits, misses, hit rate, entry count and latency saved
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "saved_ms": 1000 * self.saved_seconds
+        }
@@ -0,0 +1,246 @@
+# rag/reduction.py
+import os
+import time
+from typing import List, Dict, Any, Optional, Iterable
+import numpy as np
+from langchain.embeddings.base import Embeddings
+from rag.embedding_models import embed_queries
+
+
+class EmbeddingProjection:
+    """
+    Linear map from full embeddings to fewer dimensions.
+
+    "pca" projects onto the top principal components of a sample of document
+    vectors, which preserves L2 distances as well as any linear map of that
+    size can. "truncate" keeps the first dim coordinates and re-normalizes,
+    which is only accurate for Matryoshka-trained models.
+    """
+
+    METHODS = ("pca", "truncate")
+
+    def __init__(self, method: str = "pca", dim: int = 128, fit_size: int = 20000, seed: int = 0):
+        """
+        Initialize the EmbeddingProjection.
+
+        Args:
+            method: "pca" or "truncate"
+            dim: Number of output dimensions
+            fit_size: Maximum number of vectors sampled to fit the PCA
+            seed: Random seed for sampling
+        """
+        if method not in self.METHODS:
+            raise ValueError(f"Unsupported reduction method: {method}")
+
+        self.method = method
+        self.dim = dim
+        self.fit_size = fit_size
+        self.seed = seed
+        self.mean: Optional[np.ndarray] = None
+        self.components: Optional[np.ndarray] = None
+        self.explained_variance = None
+
+    @property
+    def is_fitted(self) -> bool:
+        return self.method == "truncate" or self.components is not None
+
+    def fit(self, vectors: np.ndarray) -> "EmbeddingProjection":
+        """
+        Fit the projection to a set of document vectors.
+
+        Args:
+            vectors: Matrix of full-dimension embeddings
+
+        Returns:
+            This projection
+
+        Raises:
+            ValueError: If dim exceeds the vector dimension, or for PCA the number of vectors
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.dim > vectors.shape[1]:
+            raise ValueError(f"Cannot reduce {vectors.shape[1]} dimensions to {self.dim}")
+        if self.method == "truncate":
+            return self
+        # n vectors span at most n principal axes
+        if len(vectors) < self.dim:
+            raise ValueError(f"PCA to {self.dim} dimensions needs at least {self.dim} vectors, got {len(vectors)}")
+
+        if len(vectors) > self.fit_size:
+            rows = np.random.RandomState(self.seed).choice(len(vectors), size=self.fit_size, replace=False)
+            vectors = vectors[np.sort(rows)]
+        self.mean = vectors.mean(axis=0)
+        # Right singular vectors of the centered sample are the principal axes
+        _, singular_values, vt = np.linalg.svd(vectors - self.mean, full_matrices=False)
+        self.components = np.ascontiguousarray(vt[:self.dim].T, dtype=np.float32)
+        variance = singular_values ** 2
+        self.explained_variance = float(variance[:self.dim].sum() / max(variance.sum(), 1e-12))
+        return self
+
+    def transform(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Project vectors to the reduced dimension.
+
+        Args:
+            vectors: Matrix (or single vector) of full-dimension embeddings
+
+        Returns:
+            float32 array of reduced embeddings
+        """
+        if not self.is_fitted:
+            raise ValueError("Projection has not been fitted")
+
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.method == "truncate":
+            reduced = vectors[..., :self.dim]
+            return reduced / np.maximum(np.linalg.norm(reduced, axis=-1, keepdims=True), 1e-12)
+        return (vectors - self.mean) @ self.components
+
+    def save(self, path: str) -> None:
+        """
+        Persist the projection.
+
+        Args:
+            path: Path of the .npz file to write
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        arrays = {"mean": self.mean, "components": self.components} if self.method == "pca" else {}
+        np.savez(path, method=self.method, dim=self.dim, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "EmbeddingProjection":
+        """
+        Load a persisted projection.
+
+        Args:
+            path: Path of the .npz file
+
+        Returns:
+            The loaded EmbeddingProjection
+        """
+        data = np.load(path)
+        projection = cls(method=str(data["method"]), dim=int(data["dim"]))
+        if projection.method == "pca":
+            projection.mean = data["mean"]
+            projection.components = data["components"]
+        return projection
+
+
+class ProjectedEmbeddings(Embeddings):
+    """Embeddings wrapper that projects documents and queries with the same EmbeddingProjection."""
+
+    def __init__(self, embeddings: Embeddings, projection: EmbeddingProjection):
+        """
+        Initialize the ProjectedEmbeddings.
+
+        Args:
+            embeddings: Underlying full-dimension embedding model
+            projection: Fitted projection
+        """
+        self.embeddings = embeddings
+        self.projection = projection
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed and project documents.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            List of reduced embedding vectors
+        """
+        if not texts:
+            return []
+        return self.projection.transform(self.embeddings.embed_documents(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embed and project a query.
+
+        Args:
+            text: Query text
+
+        Returns:
+            Reduced embedding vector
+        """
+        return self.projection.transform(self.embeddings.embed_query(text)).tolist()
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed and project many queries in one batch.
+
+        Args:
+            texts: Query texts
+
+        Returns:
+            List of reduced embedding vectors
+        """
+        if not texts:
+            return []
+        return self.projection.transform(embed_queries(self.embeddings, texts)).tolist()
+
+
+def _top_k(vectors: np.ndarray, norms: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    distances = norms - 2.0 * (vectors @ query)
+    return np.argpartition(distances, k - 1)[:k]
+
+
+def evaluate_projections(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    dims: Iterable[int] = (64, 128, 192, 256),
+    methods: Iterable[str] = ("pca", "truncate"),
+    k: int = 10
+) -> List[Dict[str, Any]]:
+    """
+    Measure recall@k, search latency and memory of reduced embeddings against the full ones.
+
+    Args:
+        vectors: Matrix of full-dimension document embeddings
+        queries: Matrix of full-dimension query embeddings
+        dims: Target dimensions to evaluate
+        methods: Reduction methods to evaluate
+        k: Number of results per query
+
+    Returns:
+        One result dictionary per method and dimension, after a full-dimension baseline row
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    k = min(k, len(vectors))
+
+    def run(reduced: np.ndarray, reduced_queries: np.ndarray):
+        norms = np.einsum("ij,ij->i", reduced, reduced)
+        found, latencies = [], []
+        for query in reduced_queries:
+            start = time.perf_counter()
+            found.append(set(_top_k(reduced, norms, query, k).tolist()))
+            latencies.append(time.perf_counter() - start)
+        return found, 1000 * float(np.median(latencies))
+
+    exact, full_latency = run(vectors, queries)
+    full_dim = vectors.shape[1]
+    results = [{
+        "method": "full", "dim": full_dim, f"recall@{k}": 1.0,
+        "p50_ms": full_latency, "speedup": 1.0, "bytes": int(vectors.nbytes), "memory_saved": 0.0
+    }]
+
+    for method in methods:
+        for dim in dims:
+            if dim >= full_dim:
+                continue
+            projection = EmbeddingProjection(method=method, dim=dim).fit(vectors)
+            reduced = np.ascontiguousarray(projection.transform(vectors))
+            found, latency = run(reduced, projection.transform(queries))
+            results.append({
+                "method": method,
+                "dim": dim,
+                f"recall@{k}": float(np.mean([len(f & e) / len(e) for f, e in zip(found, exact)])),
+                "p50_ms": latency,
+                "speedup": full_latency / latency if latency else 0.0,
+                "bytes": int(reduced.nbytes),
+                "memory_saved": 1 - reduced.nbytes / vectors.nbytes
+            })
+
+    return results
@@ -0,0 +1,192 @@
+# rag/reranker.py
+import time
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+from langchain.schema import Document
+from rag.query_cache import LRUCache, normalize_query
+
+
+class CrossEncoderReranker:
+    """
+    Second-stage ranking of retrieved chunks with a sentence-transformers cross-encoder.
+
+    Each (query, chunk) pair is scored jointly by the cross-encoder, which
+    ranks far better than comparing separately computed embeddings but costs
+    a forward pass per pair. Scores are cached per (query, chunk text). With a
+    latency budget, the number of candidates scored is cut to what the
+    measured cost per pair allows, and scoring stops early if a batch
+    overruns; candidates left unscored keep their first-stage order after
+    the reranked ones.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        batch_size: int = 16,
+        budget_ms: Optional[float] = None,
+        cache_size: int = 4096,
+        max_length: int = 256,
+        device: Optional[str] = None
+    ):
+        """
+        Initialize the CrossEncoderReranker. The model is loaded on first use.
+
+        Args:
+            model_name: Name or path of the sentence-transformers cross-encoder
+            batch_size: Number of pairs scored per forward pass
+            budget_ms: Default per-query scoring budget (None for no limit)
+            cache_size: Entries in the (query, chunk) score cache (0 to disable)
+            max_length: Maximum tokens of a query and chunk pair
+            device: Torch device to run on (None for the library default)
+        """
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.budget_ms = budget_ms
+        self.max_length = max_length
+        self.device = device
+        self._model = None
+        self._lock = threading.Lock()
+        self.score_cache = LRUCache(cache_size) if cache_size else None
+
+        # Running estimate of the seconds one pair costs, from measured batches
+        self.seconds_per_pair: Optional[float] = None
+        self._batches = 0
+        self.queries = 0
+        self.pairs_scored = 0
+        self.truncated_queries = 0
+
+    @property
+    def model(self):
+        """Cross-encoder, imported and loaded on first access."""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    self._model = CrossEncoder(self.model_name, max_length=self.max_length, device=self.device)
+        return self._model
+
+    def _predict(self, query: str, texts: List[str]) -> Tuple[np.ndarray, float]:
+        """Score one batch, returning the scores and seconds per pair and updating the cost estimate."""
+        start = time.perf_counter()
+        scores = np.asarray(
+            self.model.predict([(query, text) for text in texts], batch_size=self.batch_size, show_progress_bar=False),
+            dtype=np.float32
+        ).reshape(-1)
+        per_pair = (time.perf_counter() - start) / len(texts)
+        self._batches += 1
+        # The first batch pays one-off warm-up costs, so the second replaces it instead of being averaged in
+        if self._batches <= 2:
+            self.seconds_per_pair = per_pair
+        else:
+            self.seconds_per_pair = 0.8 * self.seconds_per_pair + 0.2 * per_pair
+        self.pairs_scored += len(texts)
+        return scores, per_pair
+
+    def score(self, query: str, texts: List[str], budget_ms: Optional[float] = None) -> List[Optional[float]]:
+        """
+        Score chunk texts against a query, using cached scores where possible.
+
+        Args:
+            query: Query text
+            texts: Chunk texts, best first-stage candidate first
+            budget_ms: Scoring budget for this call (None for no limit)
+
+        Returns:
+            Score per text, or None for texts left unscored by the budget
+        """
+        start = time.perf_counter()
+        query = normalize_query(query)
+        scores: List[Optional[float]] = [None] * len(texts)
+        misses = []
+        for i, text in enumerate(texts):
+            cached = self.score_cache.get((query, text)) if self.score_cache is not None else None
+            if cached is None:
+                misses.append(i)
+            else:
+                scores[i] = cached
+
+        if budget_ms is not None and self.seconds_per_pair is not None:
+            # At least one pair, so a budget too small for any scoring still returns the first-stage order
+            misses = misses[:max(int(budget_ms / 1000 / self.seconds_per_pair), 1)]
+
+        for offset in range(0, len(misses), self.batch_size):
+            if budget_ms is not None and offset:
+                elapsed = time.perf_counter() - start
+                batch = min(self.batch_size, len(misses) - offset)
+                if elapsed + batch * self.seconds_per_pair > budget_ms / 1000:
+                    break
+            batch_rows = misses[offset:offset + self.batch_size]
+            batch_scores, cost = self._predict(query, [texts[i] for i in batch_rows])
+            for i, value in zip(batch_rows, batch_scores.tolist()):
+                scores[i] = value
+                if self.score_cache is not None:
+                    self.score_cache.put((query, texts[i]), value, cost)
+        return scores
+
+    def rerank_with_scores(
+        self,
+        query: str,
+        documents: List[Document],
+        k: int,
+        budget_ms: Optional[float] = None
+    ) -> List[Tuple[Document, Optional[float]]]:
+        """
+        Reorder first-stage candidates by cross-encoder score.
+
+        Args:
+            query: Query text
+            documents: First-stage candidates, best first
+            k: Number of documents to keep
+            budget_ms: Scoring budget (defaults to the reranker's budget_ms)
+
+        Returns:
+            Up to k (document, score) tuples; documents the budget left
+            unscored follow the scored ones with a None score
+        """
+        budget_ms = self.budget_ms if budget_ms is None else budget_ms
+        scores = self.score(query, [document.page_content for document in documents], budget_ms=budget_ms)
+        self.queries += 1
+        if any(score is None for score in scores):
+            self.truncated_queries += 1
+
+        scored = sorted(
+            (i for i, score in enumerate(scores) if score is not None),
+            key=lambda i: -scores[i]
+        )
+        unscored = [i for i, score in enumerate(scores) if score is None]
+        return [(documents[i], scores[i]) for i in (scored + unscored)[:k]]
+
+    def rerank(self, query: str, documents: List[Document], k: int, budget_ms: Optional[float] = None) -> List[Document]:
+        """
+        Keep the k best first-stage candidates by cross-encoder score.
+
+        Args:
+            query: Query text
+            documents: First-stage candidates, best first
+            k: Number of documents to keep
+            budget_ms: Scoring budget (defaults to the reranker's budget_ms)
+
+        Returns:
+            List of up to k documents
+        """
+        return [document for document, _ in self.rerank_with_scores(query, documents, k, budget_ms)]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get reranking statistics.
+
+        Returns:
+            Dictionary with query and pair counts, truncated queries, the
+            per-pair cost estimate and score cache statistics
+        """
+        stats = {
+            "model_loaded": self._model is not None,
+            "queries": self.queries,
+            "pairs_scored": self.pairs_scored,
+            "truncated_queries": self.truncated_queries,
+            "ms_per_pair": 1000 * self.seconds_per_pair if self.seconds_per_pair is not None else None
+        }
+        if self.score_cache is not None:
+            stats["score_cache"] = self.score_cache.stats()
+        return stats
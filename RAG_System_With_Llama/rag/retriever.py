@@ -1,83 +1,463 @@
 # rag/retriever.py
-from typing import List, Dict, Any, Optional
+import json
+import asyncio
+import functools
+import threading
+import numpy as np
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+from typing import List, Dict, Any, Optional, Tuple, Callable
 from langchain.vectorstores.base import VectorStore
 from langchain.schema import Document
+from rag.embedding_models import embed_queries
+from rag.mmr import maximal_marginal_relevance
+from rag.query_cache import LRUCache, normalize_query
+from rag.metadata_index import normalize_filter
+from rag.bm25 import BM25Index
+from rag.reranker import CrossEncoderReranker
+
+
+def _start_thread(function: Callable, *args: Any) -> Future:
+    """Run a call on a thread of its own, so a call abandoned past its budget never delays later ones."""
+    future = Future()
+
+    def run():
+        future.set_running_or_notify_cancel()
+        try:
+            future.set_result(function(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
  
 class Retriever:
     """Class for retrieving relevant documents based on queries."""
 
-    def __init__(self, vectorstore: VectorStore, top_k: int = 3):
+    def __init__(
+        self,
+        vectorstore: VectorStore,
+        top_k: int = 3,
+        cache_size: int = 0,
+        index_version: Optional[Callable[[], int]] = None,
+        keyword_index: Optional[BM25Index] = None,
+        reranker: Optional[CrossEncoderReranker] = None,
+        rerank_fetch_k: int = 20,
+        quantized_search: Optional[Callable[..., List[Tuple[Document, float]]]] = None
+    ):
         """
         Initialize the Retriever.
         
         Args:
             vectorstore: Vector store containing document embeddings
             top_k: Number of documents to retrieve
+            cache_size: Entries in the LRU caches of query embeddings and
+                retrieval results (0 to disable caching)
+            index_version: Callable returning a counter that changes whenever the
+                index changes; cached results are dropped when it moves. Results
+                are only cached when this is given.
+            keyword_index: BM25 index over the same chunk IDs as the vector store,
+                used by hybrid_search
+            reranker: Optional cross-encoder; retrieve and hybrid_search then
+                fetch rerank_fetch_k candidates and keep the top_k it ranks best
+            rerank_fetch_k: First-stage candidates passed to the reranker
+            quantized_search: Optional search(embedding, k, filter) over compact
+                codes (e.g. EmbeddingManager.quantized_search_by_vector); when
+                given, similarity and hybrid retrieval use it instead of the
+                store's float search, and scores are cosine similarities
         """
         self.vectorstore = vectorstore
         self.top_k = top_k
         # Create a retriever from the vector store
         self.retriever = vectorstore.as_retriever(search_kwargs={"k": top_k})
+        
+        self.index_version = index_version
+        self.embedding_cache = LRUCache(cache_size) if cache_size else None
+        self.result_cache = LRUCache(cache_size) if cache_size and index_version else None
+        self._cached_version = None
+        
+        self.keyword_index = keyword_index
+        
+        self.reranker = reranker
+        self.rerank_fetch_k = rerank_fetch_k
+        
+        self.quantized_search = quantized_search
+        # Chroma has no string prefix operator, so $prefix is rejected up front rather than by the backend
+        self._prefix_filters = getattr(vectorstore, "supports_prefix_filters", False)
+
+    def _embed_query(self, query: str) -> List[float]:
+        """Embed a normalized query, reusing cached embeddings."""
+        query = normalize_query(query)
+        return self.embedding_cache.get_or_compute(query, lambda: self.vectorstore.embeddings.embed_query(query))
+
+    def embed_query(self, query: str) -> List[float]:
+        """
+        Embed a normalized query, through the query embedding cache when enabled.
+
+        Args:
+            query: Query text
+
+        Returns:
+            Query embedding
+        """
+        if self.embedding_cache is None:
+            return self.vectorstore.embeddings.embed_query(normalize_query(query))
+        return self._embed_query(query)
+
+    def _search_by_vector(
+        self,
+        vector: List[float],
+        k: int,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, float]]:
+        """Nearest documents to an embedding with the store's native scores."""
+        if hasattr(self.vectorstore, "similarity_search_by_vector_with_score"):
+            return self.vectorstore.similarity_search_by_vector_with_score(vector, k=k, filter=filter)
+        return self.vectorstore.similarity_search_by_vector_with_relevance_scores(vector, k=k, filter=filter)
+
+    def _rerank(self, query: str, documents: List[Document]) -> List[Document]:
+        """Keep the top_k candidates by reranker score (or the first top_k without a reranker)."""
+        if self.reranker is None:
+            return documents[:self.top_k]
+        return self.reranker.rerank(query, documents, k=self.top_k)
 
-    def retrieve(self, query: str) -> List[Document]:
+    @staticmethod
+    def _filter_key(filter: Optional[Dict[str, Any]]) -> Optional[str]:
+        """Hashable form of a filter for cache keys."""
+        return json.dumps(filter, sort_keys=True, default=str) if filter else None
+
+    def _cached(self, mode: Tuple, query: str, compute: Callable[[], List[Any]]) -> List[Any]:
+        """Serve retrieval results from the result cache while the index is unchanged."""
+        if self.result_cache is None:
+            return compute()
+        
+        version = self.index_version()
+        if version != self._cached_version:
+            self.result_cache.clear()
+            self._cached_version = version
+        # A search still running when the index changes stores its results under the old version, where no lookup finds them
+        return list(self.result_cache.get_or_compute((version, mode, normalize_query(query)), compute))
+
+    def retrieve(self, query: str, filter: Optional[Dict[str, Any]] = None) -> List[Document]:
         """
         Retrieve relevant documents for a query.
         
         Args:
             query: Query text
+            filter: Optional metadata filter expression, applied before the
+                vector search (see rag.metadata_index.normalize_filter)
+            
+        Returns:
+            List of retrieved documents
+        """
+        filter = normalize_filter(filter, allow_prefix=self._prefix_filters)
+        k = self.top_k if self.reranker is None else max(self.rerank_fetch_k, self.top_k)
+        if self.quantized_search is not None:
+            documents = self._cached(
+                ("similarity", k, self._filter_key(filter)),
+                query,
+                lambda: [doc for doc, _ in self.quantized_search(self.embed_query(query), k, filter)]
+            )
+        elif self.embedding_cache is None:
+            documents = self.vectorstore.similarity_search_by_vector(self.embed_query(query), k=k, filter=filter)
+        else:
+            documents = self._cached(
+                ("similarity", k, self._filter_key(filter)),
+                query,
+                lambda: self.vectorstore.similarity_search_by_vector(self._embed_query(query), k=k, filter=filter)
+            )
+        return self._rerank(query, documents)
+
+    async def aretrieve(self, query: str, filter: Optional[Dict[str, Any]] = None) -> List[Document]:
+        """
+        Retrieve relevant documents without blocking the event loop.
+        
+        Embedding, search and reranking run in the event loop's default
+        thread pool; the model and NumPy work release the GIL, so other
+        coroutines keep running meanwhile.
+        
+        Args:
+            query: Query text
+            filter: Optional metadata filter expression
             
         Returns:
             List of retrieved documents
         """
-        documents = self.retriever.get_relevant_documents(query)
-        return documents
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(self.retrieve, query, filter=filter))
 
-    def retrieve_with_scores(self, query: str) -> List[tuple]:
+    def retrieve_with_scores(self, query: str, filter: Optional[Dict[str, Any]] = None) -> List[tuple]:
         """
         Retrieve relevant documents with similarity scores.
         
         Args:
             query: Query text
+            filter: Optional metadata filter expression
             
         Returns:
             List of (document, score) tuples
         """
-        docs_and_scores = self.vectorstore.similarity_search_with_score(query, k=self.top_k)
-        return docs_and_scores
+        filter = normalize_filter(filter, allow_prefix=self._prefix_filters)
+        if self.quantized_search is not None:
+            return self._cached(
+                ("scores", self.top_k, self._filter_key(filter)),
+                query,
+                lambda: self.quantized_search(self.embed_query(query), self.top_k, filter)
+            )
+        if self.embedding_cache is None:
+            return self._search_by_vector(self.embed_query(query), self.top_k, filter)
+        
+        return self._cached(
+            ("scores", self.top_k, self._filter_key(filter)),
+            query,
+            lambda: self._search_by_vector(self._embed_query(query), self.top_k, filter)
+        )
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Get query cache statistics.
+        
+        Returns:
+            Dictionary with hit rates and latency saved for the query embedding
+            and retrieval result caches (empty if caching is off)
+        """
+        stats = {}
+        if self.embedding_cache is not None:
+            stats["query_embeddings"] = self.embedding_cache.stats()
+        if self.result_cache is not None:
+            stats["results"] = self.result_cache.stats()
+        return stats
+
+    def retrieve_many(
+        self,
+        queries: List[str],
+        k: Optional[int] = None,
+        with_scores: bool = False,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[List[Any]]:
+        """
+        Retrieve documents for many queries at once.
+        
+        All queries are embedded in one batch, then searched with a single
+        matrix product (NumPy store) or a single multi-query call (Chroma).
+        Other vector stores, and the quantized codes, are searched one
+        embedding at a time.
+        
+        Args:
+            queries: Query texts
+            k: Number of documents per query (defaults to top_k)
+            with_scores: Whether to return (document, score) tuples
+            filter: Optional metadata filter expression shared by all queries
+            
+        Returns:
+            Per-query lists of documents, or of (document, score) tuples, in query order
+        """
+        if not queries:
+            return []
+        k = k or self.top_k
+        filter = normalize_filter(filter, allow_prefix=self._prefix_filters)
+        
+        vectors = embed_queries(self.vectorstore.embeddings, [normalize_query(query) for query in queries])
+        if self.quantized_search is not None:
+            results = [self.quantized_search(vector, k, filter) for vector in vectors]
+        elif hasattr(self.vectorstore, "batch_similarity_search_by_vectors_with_score"):
+            results = self.vectorstore.batch_similarity_search_by_vectors_with_score(vectors, k=k, filter=filter)
+        elif hasattr(self.vectorstore, "_collection"):
+            results = self._chroma_batch_search(vectors, k, filter)
+        else:
+            results = [
+                self.vectorstore.similarity_search_by_vector_with_score(vector, k=k, filter=filter) for vector in vectors
+            ]
+        
+        if with_scores:
+            return results
+        return [[doc for doc, _ in docs_and_scores] for docs_and_scores in results]
+
+    def _chroma_batch_search(
+        self,
+        vectors: List[List[float]],
+        k: int,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """Query a Chroma collection with many embeddings in one call."""
+        response = self.vectorstore._collection.query(
+            query_embeddings=[list(map(float, vector)) for vector in vectors],
+            n_results=k,
+            where=filter,
+            include=["documents", "metadatas", "distances"]
+        )
+        return [
+            [
+                (Document(page_content=text, metadata=metadata or {}), distance)
+                for text, metadata, distance in zip(texts, metadatas, distances)
+            ]
+            for texts, metadatas, distances in zip(response["documents"], response["metadatas"], response["distances"])
+        ]
+
+    def _chroma_mmr_search(
+        self,
+        vector: List[float],
+        k: int,
+        fetch_k: int,
+        lambda_mult: float,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        """Select MMR documents from one Chroma query that also returns the candidate embeddings."""
+        response = self.vectorstore._collection.query(
+            query_embeddings=[list(map(float, vector))],
+            n_results=fetch_k,
+            where=filter,
+            include=["documents", "metadatas", "embeddings"]
+        )
+        if not response["ids"][0]:
+            return []
+        selected = set(maximal_marginal_relevance(
+            np.asarray(vector, dtype=np.float32), np.asarray(response["embeddings"][0], dtype=np.float32),
+            lambda_mult=lambda_mult, k=k
+        ))
+        # Candidate order, as Chroma's own max_marginal_relevance_search returns
+        return [
+            Document(page_content=text, metadata=metadata or {})
+            for i, (text, metadata) in enumerate(zip(response["documents"][0], response["metadatas"][0]))
+            if i in selected
+        ]
 
-    def retrieve_with_mmr(self, query: str, diversity: float = 0.3) -> List[Document]:
+    def _mmr_by_vector(
+        self,
+        vector: List[float],
+        k: int,
+        fetch_k: int,
+        lambda_mult: float,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        """MMR selection around a query embedding."""
+        if hasattr(self.vectorstore, "_collection"):
+            return self._chroma_mmr_search(vector, k, fetch_k, lambda_mult, filter)
+        return self.vectorstore.max_marginal_relevance_search_by_vector(
+            vector, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult, filter=filter
+        )
+
+    def retrieve_with_mmr(
+        self,
+        query: str,
+        diversity: float = 0.3,
+        fetch_k: Optional[int] = None,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
         """
         Retrieve documents using Maximum Marginal Relevance for diversity.
         
+        Candidates are selected with the vectorized MMR in rag.mmr, so fetch_k
+        can be in the hundreds at sub-millisecond selection cost.
+        
         Args:
             query: Query text
             diversity: Diversity parameter (0-1, higher means more diverse results)
+            fetch_k: Number of nearest documents to choose from (defaults to 3 * top_k)
+            filter: Optional metadata filter expression
             
         Returns:
             List of retrieved documents
         """
-        if hasattr(self.vectorstore, "max_marginal_relevance_search"):
+        fetch_k = fetch_k or self.top_k*3
+        filter = normalize_filter(filter, allow_prefix=self._prefix_filters)
+        if hasattr(self.vectorstore, "max_marginal_relevance_search_by_vector"):
+            if self.embedding_cache is None:
+                return self._mmr_by_vector(self.embed_query(query), self.top_k, fetch_k, diversity, filter)
+            return self._cached(
+                ("mmr", self.top_k, fetch_k, diversity, self._filter_key(filter)),
+                query,
+                lambda: self._mmr_by_vector(self._embed_query(query), self.top_k, fetch_k, diversity, filter)
+            )
+        elif hasattr(self.vectorstore, "max_marginal_relevance_search"):
             documents = self.vectorstore.max_marginal_relevance_search(
-                query, k=self.top_k, fetch_k=self.top_k*3, lambda_mult=diversity
+                query, k=self.top_k, fetch_k=fetch_k, lambda_mult=diversity, filter=filter
             )
             return documents
         else:
             print("Vector store doesn't support MMR, falling back to standard retrieval")
-            return self.retrieve(query)
+            return self.retrieve(query, filter=filter)
+
+    def _vector_candidates(self, query: str, k: int, filter: Optional[Dict[str, Any]] = None) -> List[Document]:
+        """Nearest documents to a query, through the query embedding cache when enabled."""
+        if self.quantized_search is not None:
+            return [doc for doc, _ in self.quantized_search(self.embed_query(query), k, filter)]
+        return self.vectorstore.similarity_search_by_vector(self.embed_query(query), k=k, filter=filter)
 
-    def hybrid_search(self, query: str) -> List[Document]:
+    def _keyword_candidates(self, query: str, k: int, filter: Optional[Dict[str, Any]] = None) -> List[Document]:
+        """Best BM25 matches for a query, fetched from the vector store in rank order."""
+        # The filter is resolved to chunk IDs up front, so BM25 only ranks matching chunks
+        allowed = self.vectorstore.get(where=filter, include=[])["ids"] if filter else None
+        hits = self.keyword_index.search(query, k=k, ids=allowed)
+        if not hits:
+            return []
+        data = self.vectorstore.get(ids=[doc_id for doc_id, _ in hits], include=["documents", "metadatas"])
+        documents = {
+            doc_id: Document(page_content=text, metadata=metadata or {})
+            for doc_id, text, metadata in zip(data["ids"], data["documents"], data["metadatas"])
+        }
+        return [documents[doc_id] for doc_id, _ in hits if doc_id in documents]
+
+    def hybrid_search(
+        self,
+        query: str,
+        k: Optional[int] = None,
+        fetch_k: Optional[int] = None,
+        rrf_k: int = 60,
+        budget_ms: Optional[float] = None,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
         """
         Perform hybrid search combining vector search with keyword search if available.
         
+        With a keyword index, the vector and BM25 searches run concurrently and
+        their rankings are merged with reciprocal rank fusion: each document
+        scores the sum of 1 / (rrf_k + rank) over the rankings it appears in.
+        With budget_ms, a search still running when the budget expires is left
+        out of the fusion (at least one ranking is always used) and finishes
+        on its own thread, so it never holds up later queries. With a
+        reranker, the head of the fused ranking is reranked down to k.
+        
         Args:
             query: Query text
+            k: Number of documents to return (defaults to top_k)
+            fetch_k: Candidates taken from each search (defaults to 4 * k, at least 20)
+            rrf_k: Rank offset damping the weight of top ranks
+            budget_ms: Optional latency budget for the two searches
+            filter: Optional metadata filter expression, applied to both searches
             
         Returns:
             List of retrieved documents
         """
+        k = k or self.top_k
+        filter = normalize_filter(filter, allow_prefix=self._prefix_filters)
+        if self.keyword_index is not None:
+            fetch_k = fetch_k or max(4 * k, 20, self.rerank_fetch_k if self.reranker else 0)
+            futures = [
+                _start_thread(self._vector_candidates, query, fetch_k, filter),
+                _start_thread(self._keyword_candidates, query, fetch_k, filter)
+            ]
+            done, _ = wait(futures, timeout=budget_ms / 1000 if budget_ms is not None else None)
+            if not done:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            
+            fused: Dict[str, Tuple[float, Document]] = {}
+            for future in futures:
+                if future not in done:
+                    continue
+                for rank, document in enumerate(future.result()):
+                    # Vector results carry no IDs, so chunks are matched on text and metadata
+                    key = json.dumps([document.page_content, document.metadata], sort_keys=True, default=str)
+                    score, _ = fused.get(key, (0.0, document))
+                    fused[key] = (score + 1.0 / (rrf_k + rank + 1), document)
+            ranked = [document for _, document in sorted(fused.values(), key=lambda item: -item[0])]
+            if self.reranker is not None:
+                return self.reranker.rerank(query, ranked[:max(self.rerank_fetch_k, k)], k=k)
+            return ranked[:k]
+        
         if hasattr(self.vectorstore, "hybrid_search"):
-            documents = self.vectorstore.hybrid_search(query, k=self.top_k)
+            documents = self.vectorstore.hybrid_search(query, k=k, filter=filter)
             return documents
         else:
             print("Vector store doesn't support hybrid search, falling back to standard retrieval")
-            return self.retrieve(query)
\ No newline at end of file
+            return self.retrieve(query, filter=filter)
\ No newline at end of file
@@ -0,0 +1,633 @@
+# rag/sharded_store.py
+import os
+import json
+import uuid
+import zlib
+import heapq
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Iterable, Tuple, Callable, Type
+import numpy as np
+from langchain.schema import Document
+from langchain.embeddings.base import Embeddings
+from langchain.vectorstores.base import VectorStore
+from rag.mmr import maximal_marginal_relevance
+from rag.numpy_store import NumpyVectorStore
+
+# Shard stores opened by each search worker: directory -> (version, store)
+_worker_shards: Dict[str, Tuple[int, VectorStore]] = {}
+
+# A search hit: (ID, squared L2 distance, text, metadata, vector or None)
+Hit = Tuple[str, float, str, Optional[dict], Optional[np.ndarray]]
+
+
+def shard_of(doc_id: str, num_shards: int) -> int:
+    """Shard holding a chunk ID, from a hash that is stable across processes and runs."""
+    return zlib.crc32(doc_id.encode("utf-8")) % num_shards
+
+
+def _shard_top_k(
+    store: VectorStore,
+    queries: np.ndarray,
+    k: int,
+    filter: Optional[Dict[str, Any]],
+    batch: bool,
+    vectors: bool = False
+) -> List[List[Hit]]:
+    """
+    Per-query hits from one shard, nearest first.
+
+    Each hit is (ID, squared L2 distance, text, metadata, vector), the vector
+    being None unless requested, so a search needs nothing else from the shard.
+    """
+    if isinstance(store, NumpyVectorStore):
+        if batch:
+            hits = store._batch_top_k(queries, k, filter=filter)
+        else:
+            hits = [store._top_k(query, k, filter) for query in queries]
+        return [
+            [
+                (store.ids[row], distance, store.texts[row], store.metadatas[row],
+                 np.array(store.vectors[row]) if vectors else None)
+                for row, distance in query_hits
+            ]
+            for query_hits in hits
+        ]
+
+    count = store._collection.count()
+    if not count:
+        return [[] for _ in range(len(queries))]
+    response = store._collection.query(
+        query_embeddings=queries.tolist(),
+        n_results=min(k, count),
+        where=filter,
+        include=["documents", "metadatas", "distances"] + (["embeddings"] if vectors else [])
+    )
+    results = []
+    for q, ids in enumerate(response["ids"]):
+        embeddings = response["embeddings"][q] if vectors else [None] * len(ids)
+        results.append(list(zip(
+            ids, response["distances"][q], response["documents"][q], response["metadatas"][q],
+            [np.asarray(vector, dtype=np.float32) if vector is not None else None for vector in embeddings]
+        )))
+    return results
+
+
+def _search_shard(
+    shard_class: Type[VectorStore],
+    directory: str,
+    version: int,
+    shard_kwargs: Dict[str, Any],
+    queries: np.ndarray,
+    k: int,
+    filter: Optional[Dict[str, Any]],
+    batch: bool,
+    vectors: bool
+) -> List[List[Hit]]:
+    """Search a persisted shard in a worker, reopening it when the parent has persisted a newer version."""
+    cached = _worker_shards.get(directory)
+    if cached is None or cached[0] != version:
+        cached = (version, shard_class(persist_directory=directory, embedding_function=None, **shard_kwargs))
+        _worker_shards[directory] = cached
+    return _shard_top_k(cached[1], queries, k, filter, batch, vectors)
+
+
+class ShardedVectorStore(VectorStore):
+    """
+    Vector store split into shards by a hash of the chunk ID, searched scatter-gather.
+
+    Each shard is a complete store of shard_class persisted in its own
+    shard-NNN directory. A search asks every shard for its own top k and
+    merges the hits by distance; ties go to the chunk added first, tracked
+    by a global insertion order in shards.json, so with flat NumPy shards
+    the results are identical to one unsharded store. Persisted NumPy shards
+    are searched by worker processes that memory-map them, so shards are
+    scanned in parallel and hits come back with their texts; this process
+    opens a shard only to change or read it directly, and closes it again
+    once persisted. Shards with unpersisted changes, in-memory stores and
+    Chroma shards (whose clients must not share a directory across
+    processes) are searched in this process. Workers are started with the
+    "spawn" method, so scripts need an `if __name__ == "__main__":` guard.
+
+    shards.json records the shard class and shard_kwargs, and a persisted
+    store refuses to open with different ones.
+    """
+
+    MANIFEST_FILE = "shards.json"
+
+    def __init__(
+        self,
+        embedding_function: Optional[Embeddings] = None,
+        persist_directory: Optional[str] = None,
+        shard_class: Type[VectorStore] = NumpyVectorStore,
+        num_shards: int = 4,
+        num_workers: Optional[int] = None,
+        shard_kwargs: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Initialize the ShardedVectorStore, reading the manifest of a persisted store if present.
+
+        Args:
+            embedding_function: Embedding model used for texts and queries
+            persist_directory: Directory holding the manifest and shard directories (None for in-memory)
+            shard_class: Store class of each shard (NumpyVectorStore or Chroma)
+            num_shards: Number of shards for a new store; a persisted store keeps its own
+            num_workers: Search worker processes (None for one per core up to num_shards,
+                0 or 1 to search every shard in this process; Chroma shards always are)
+            shard_kwargs: Extra keyword arguments for each shard, such as index_params
+        """
+        self._embedding_function = embedding_function
+        self.persist_directory = persist_directory
+        self.shard_class = shard_class
+        self.shard_kwargs = dict(shard_kwargs or {})
+
+        # Insertion order of every chunk ID, kept in dictionary order and used to break distance ties
+        self._sequence: Dict[str, int] = {}
+        self._next_sequence = 0
+
+        manifest = self.read_manifest(persist_directory) if persist_directory else None
+        if manifest is not None:
+            # Stores written before the shard class was recorded keep whatever they are opened with
+            persisted_class = manifest.get("shard_class", shard_class.__name__)
+            if persisted_class != shard_class.__name__:
+                raise ValueError(f"{persist_directory} holds {persisted_class} shards, not {shard_class.__name__}")
+            persisted_kwargs = manifest.get("shard_kwargs", self.shard_kwargs)
+            if self.shard_kwargs and self.shard_kwargs != persisted_kwargs:
+                raise ValueError(
+                    f"{persist_directory} was written with shard_kwargs {persisted_kwargs}, not {self.shard_kwargs}"
+                )
+            self.shard_kwargs = persisted_kwargs
+            num_shards = manifest["num_shards"]
+            self._sequence = {doc_id: i for i, doc_id in enumerate(manifest["ids"])}
+            self._next_sequence = len(self._sequence)
+
+        if num_shards < 1:
+            raise ValueError(f"num_shards must be at least 1, got {num_shards}")
+        self.num_shards = num_shards
+        # Shards are opened on first use (see _shard)
+        self._shards: List[Optional[VectorStore]] = [None] * num_shards
+
+        cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+        self.num_workers = min(num_shards, cores) if num_workers is None else num_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # A shard is searched by the workers only once its latest changes are persisted
+        self._versions = [0] * num_shards
+        self._dirty = [False] * num_shards
+
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return self._embedding_function
+
+    @property
+    def supports_prefix_filters(self) -> bool:
+        return getattr(self.shard_class, "supports_prefix_filters", False)
+
+    @classmethod
+    def read_manifest(cls, persist_directory: str) -> Optional[Dict[str, Any]]:
+        """
+        Read the manifest of a persisted sharded store.
+
+        Args:
+            persist_directory: Directory of the store
+
+        Returns:
+            The manifest (num_shards, shard_class, shard_kwargs, ids), or None if there is none
+        """
+        manifest_path = os.path.join(persist_directory, cls.MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        return self._shard(0)._select_relevance_score_fn()
+
+    def _shard_directory(self, shard: int) -> Optional[str]:
+        return os.path.join(self.persist_directory, f"shard-{shard:03d}") if self.persist_directory else None
+
+    def _shard(self, shard: int) -> VectorStore:
+        """A shard's store in this process, opened on first use."""
+        if self._shards[shard] is None:
+            self._shards[shard] = self.shard_class(
+                persist_directory=self._shard_directory(shard),
+                embedding_function=self._embedding_function,
+                **self.shard_kwargs
+            )
+        return self._shards[shard]
+
+    @property
+    def _parallel(self) -> bool:
+        """Whether persisted shards are searched by worker processes."""
+        # Each worker opens shards on its own; only NumPy shards are safe to open from several processes
+        return bool(self.persist_directory) and self.num_workers > 1 and issubclass(self.shard_class, NumpyVectorStore)
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        """Search worker pool, started on first use (None when shards are searched in this process)."""
+        if self._executor is None and self._parallel:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.num_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def close(self) -> None:
+        """Shut down the search workers."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _group(self, ids: Iterable[str]) -> Dict[int, List[int]]:
+        """Positions of the given IDs, grouped by shard."""
+        groups: Dict[int, List[int]] = {}
+        for i, doc_id in enumerate(ids):
+            groups.setdefault(shard_of(doc_id, self.num_shards), []).append(i)
+        return groups
+
+    def persist(self) -> None:
+        """Persist the shards changed since the last persist, then the manifest."""
+        if not self.persist_directory:
+            return
+
+        os.makedirs(self.persist_directory, exist_ok=True)
+        for i, shard in enumerate(self._shards):
+            if not self._dirty[i]:
+                continue
+            if hasattr(shard, "persist"):
+                shard.persist()
+            self._versions[i] += 1
+            self._dirty[i] = False
+            # From now on the workers search this shard, so this process need not keep it
+            if self._parallel:
+                self._shards[i] = None
+
+        manifest_path = os.path.join(self.persist_directory, self.MANIFEST_FILE)
+        manifest = {
+            "num_shards": self.num_shards,
+            "shard_class": self.shard_class.__name__,
+            "shard_kwargs": self.shard_kwargs,
+            "ids": list(self._sequence)
+        }
+        with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, separators=(",", ":"))
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+    def _record(self, ids: List[str]) -> None:
+        """Give IDs the next places in the insertion order; re-added IDs move to the end like in one store."""
+        for doc_id in ids:
+            self._sequence.pop(doc_id, None)
+            self._sequence[doc_id] = self._next_sequence
+            self._next_sequence += 1
+
+    def add_vectors(
+        self,
+        vectors: np.ndarray,
+        texts: List[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None
+    ) -> List[str]:
+        """
+        Add precomputed vectors with their texts to their shards.
+
+        Args:
+            vectors: Matrix of embeddings, one row per text
+            texts: Texts of the documents
+            metadatas: Optional metadata per document
+            ids: Optional IDs (random UUIDs if None); existing IDs are replaced
+
+        Returns:
+            List of IDs of the added documents
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        for shard, positions in self._group(ids).items():
+            store = self._shard(shard)
+            shard_texts = [texts[i] for i in positions]
+            shard_metadatas = [metadatas[i] for i in positions] if metadatas else None
+            shard_ids = [ids[i] for i in positions]
+            if hasattr(store, "add_vectors"):
+                store.add_vectors(vectors[positions], shard_texts, shard_metadatas, shard_ids)
+            else:
+                store._collection.upsert(
+                    ids=shard_ids, embeddings=vectors[positions].tolist(), documents=shard_texts, metadatas=shard_metadatas
+                )
+            self._dirty[shard] = True
+        self._record(ids)
+        return ids
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any
+    ) -> List[str]:
+        """
+        Embed texts and add them to their shards.
+
+        Texts are embedded in one call before being split up, so the embedding
+        model sees the same batches as with one store.
+
+        Args:
+            texts: Texts to add
+            metadatas: Optional metadata per text
+            ids: Optional IDs (random UUIDs if None)
+
+        Returns:
+            List of IDs of the added texts
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        if hasattr(self.shard_class, "add_vectors"):
+            vectors = self._embedding_function.embed_documents(texts)
+            return self.add_vectors(np.asarray(vectors, dtype=np.float32), texts, metadatas, ids)
+
+        for shard, positions in self._group(ids).items():
+            self._shard(shard).add_texts(
+                [texts[i] for i in positions],
+                metadatas=[metadatas[i] for i in positions] if metadatas else None,
+                ids=[ids[i] for i in positions]
+            )
+            self._dirty[shard] = True
+        self._record(ids)
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        """
+        Delete documents by ID from their shards.
+
+        Args:
+            ids: IDs of the documents to delete
+
+        Returns:
+            True once the documents are removed
+        """
+        ids = [doc_id for doc_id in ids or [] if doc_id in self._sequence]
+        for shard, positions in self._group(ids).items():
+            self._shard(shard).delete(ids=[ids[i] for i in positions])
+            self._dirty[shard] = True
+        for doc_id in ids:
+            del self._sequence[doc_id]
+        return True
+
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        include: Optional[List[str]] = None,
+        where: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Get stored documents, in the same shape as Chroma.get.
+
+        Args:
+            ids: IDs to fetch (None for all, in insertion order)
+            include: Any of "documents", "metadatas", "embeddings" (defaults to documents and metadatas)
+            where: Optional metadata filter expression
+
+        Returns:
+            Dictionary with "ids" and the included fields
+        """
+        include = ["documents", "metadatas"] if include is None else include
+        fields = [field for field in ("documents", "metadatas", "embeddings") if field in include]
+
+        # Listing IDs needs only the insertion order, not the shards
+        if ids is None and not fields and not where:
+            return {"ids": list(self._sequence), "documents": None, "metadatas": None, "embeddings": None}
+
+        found: Dict[str, Dict[str, Any]] = {}
+        if ids is None:
+            parts = [
+                self._shard(shard).get(include=include, where=where) if where else self._shard(shard).get(include=include)
+                for shard in range(self.num_shards)
+            ]
+        else:
+            parts = [
+                self._shard(shard).get(ids=[ids[i] for i in positions], include=include, where=where)
+                for shard, positions in self._group(ids).items()
+            ]
+        for part in parts:
+            for j, doc_id in enumerate(part["ids"]):
+                found[doc_id] = {field: part[field][j] for field in fields}
+
+        order = [doc_id for doc_id in (self._sequence if ids is None else ids) if doc_id in found]
+        result = {"ids": order}
+        for field in ("documents", "metadatas", "embeddings"):
+            result[field] = [found[doc_id][field] for doc_id in order] if field in fields else None
+        return result
+
+    def _search(
+        self,
+        queries: np.ndarray,
+        k: int,
+        filter: Optional[Dict[str, Any]] = None,
+        batch: bool = False,
+        vectors: bool = False
+    ) -> List[List[Hit]]:
+        """Global top k hits per query (see _shard_top_k): every shard's top k, merged."""
+        if not len(queries) or k <= 0:
+            return [[] for _ in range(len(queries))]
+
+        executor = self._get_executor()
+        futures = {
+            i: executor.submit(
+                _search_shard, self.shard_class, self._shard_directory(i), self._versions[i],
+                self.shard_kwargs, queries, k, filter, batch, vectors
+            )
+            for i in range(self.num_shards) if executor is not None and not self._dirty[i]
+        }
+        # Shards the workers cannot see yet are searched here while the workers run
+        per_shard = [
+            _shard_top_k(self._shard(i), queries, k, filter, batch, vectors)
+            for i in range(self.num_shards) if i not in futures
+        ]
+        per_shard.extend(future.result() for future in futures.values())
+
+        sequence = self._sequence
+        return [
+            heapq.nsmallest(k, (hit for hits in per_shard for hit in hits[q]), key=lambda hit: (hit[1], sequence[hit[0]]))
+            for q in range(len(queries))
+        ]
+
+    @staticmethod
+    def _with_documents(hits: List[Hit]) -> List[Tuple[Document, float]]:
+        return [
+            (Document(page_content=text, metadata=dict(metadata or {})), distance)
+            for _, distance, text, metadata, _ in hits
+        ]
+
+    def similarity_search_by_vector_with_score(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        """
+        Find the documents nearest to an embedding across all shards.
+
+        Args:
+            embedding: Query embedding
+            k: Number of documents to return
+            filter: Optional metadata filter expression (see rag.metadata_index)
+
+        Returns:
+            List of (document, squared L2 distance) tuples, nearest first
+        """
+        query = np.asarray(embedding, dtype=np.float32).reshape(1, -1)
+        return self._with_documents(self._search(query, k, filter)[0])
+
+    def similarity_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, filter)]
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        """
+        Find the documents nearest to a query across all shards.
+
+        Args:
+            query: Query text
+            k: Number of documents to return
+            filter: Optional metadata filter expression (see rag.metadata_index)
+
+        Returns:
+            List of (document, squared L2 distance) tuples, nearest first
+        """
+        embedding = self._embedding_function.embed_query(query)
+        return self.similarity_search_by_vector_with_score(embedding, k, filter)
+
+    def similarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def _similarity_search_with_relevance_scores(
+        self,
+        query: str,
+        k: int = 4,
+        **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        relevance_score_fn = self._select_relevance_score_fn()
+        return [(doc, relevance_score_fn(score)) for doc, score in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def batch_similarity_search_by_vectors_with_score(
+        self,
+        embeddings: np.ndarray,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Find the nearest documents for many query embeddings, each shard answering all of them at once.
+
+        Args:
+            embeddings: Matrix of query embeddings
+            k: Number of documents per query
+            filter: Optional metadata filter expression, applied before the scan
+
+        Returns:
+            Per-query lists of (document, squared L2 distance) tuples, nearest first
+        """
+        queries = np.asarray(embeddings, dtype=np.float32)
+        return [self._with_documents(hits) for hits in self._search(queries, k, filter, batch=True)]
+
+    def max_marginal_relevance_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> List[Document]:
+        """
+        Select documents by maximal marginal relevance among the fetch_k nearest across all shards.
+
+        Args:
+            embedding: Query embedding
+            k: Number of documents to return
+            fetch_k: Number of nearest documents to choose from
+            lambda_mult: 1 for pure relevance, 0 for maximum diversity
+            filter: Optional metadata filter expression (see rag.metadata_index)
+
+        Returns:
+            Selected documents, in candidate order like Chroma
+        """
+        query = np.asarray(embedding, dtype=np.float32)
+        candidates = self._search(query.reshape(1, -1), fetch_k, filter, vectors=True)[0]
+        if not candidates:
+            return []
+
+        selected = set(maximal_marginal_relevance(
+            query, np.asarray([hit[4] for hit in candidates], dtype=np.float32), k=k, lambda_mult=lambda_mult
+        ))
+        return [doc for i, (doc, _) in enumerate(self._with_documents(candidates)) if i in selected]
+
+    def max_marginal_relevance_search(
+        self,
+        query: str,
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> List[Document]:
+        embedding = self._embedding_function.embed_query(query)
+        return self.max_marginal_relevance_search_by_vector(embedding, k, fetch_k, lambda_mult, filter)
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Optional[Embeddings] = None,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        persist_directory: Optional[str] = None,
+        shard_class: Type[VectorStore] = NumpyVectorStore,
+        num_shards: int = 4,
+        num_workers: Optional[int] = None,
+        shard_kwargs: Optional[Dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> "ShardedVectorStore":
+        """
+        Create a sharded store from texts.
+
+        Args:
+            texts: Texts to add
+            embedding: Embedding model
+            metadatas: Optional metadata per text
+            ids: Optional IDs
+            persist_directory: Directory to persist the store (None for in-memory)
+            shard_class: Store class of each shard
+            num_shards: Number of shards
+            num_workers: Search worker processes (see __init__)
+            shard_kwargs: Extra keyword arguments for each shard
+
+        Returns:
+            The new ShardedVectorStore
+        """
+        store = cls(
+            embedding_function=embedding,
+            persist_directory=persist_directory,
+            shard_class=shard_class,
+            num_shards=num_shards,
+            num_workers=num_workers,
+            shard_kwargs=shard_kwargs
+        )
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store